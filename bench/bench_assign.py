@@ -0,0 +1,88 @@
+# bench/bench_assign.py
+"""
+Bandingkan assign bulk sekuensial (assign_source_to_grid per cell) vs
+pipelined (assign_grid_pipelined, 1 page / multi-page) terhadap mock device,
+untuk layout 3x3 dan 4x4. Setiap run diverifikasi lewat read_grid_state
+dan state server mock.
+
+    python3 -m bench.bench_assign --runs 3 --pages 1 --pages 4
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+from bench.mock_device import MockDevice
+from bench.mock_device.server import PASSWORD, USERNAME
+from core.actions.grid import assign_grid_pipelined, cell_shows_source, read_grid_state
+from core.actions.layouts import select_layout
+from core.actions.sources import assign_source_to_grid
+from core.auth import ensure_logged_in
+from core.browser import launch_browser
+
+
+def _assigns(cells: int, run: int) -> Dict[int, str]:
+    # geser nama tiap run supaya setiap cell benar-benar berubah
+    return {g: f"Camera {(g + run * cells) % 50 + 1:03d}" for g in range(1, cells + 1)}
+
+
+def _verify(page, mock: MockDevice, assigns: Dict[int, str]) -> bool:
+    cells = read_grid_state(page)["cells"]
+    ui_ok = all(g <= len(cells) and cell_shows_source(cells[g - 1], n) for g, n in assigns.items())
+    st = mock.state
+    with st.lock:
+        server_ok = all(
+            (st.by_id(st.grid.get(g, "")) or {}).get("name") == n for g, n in assigns.items()
+        )
+    return ui_ok and server_ok
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--cells", type=int, action="append", help="layout (repeatable), default 9,16")
+    ap.add_argument("--pages", type=int, action="append", help="page untuk mode pipelined (repeatable), default 1,4")
+    ap.add_argument("--latency-ms", type=float, default=20.0, help="latency API mock")
+    ap.add_argument("--ui-delay-ms", type=int, default=150, help="durasi animasi UI mock")
+    ap.add_argument("--headful", action="store_true")
+    args = ap.parse_args()
+
+    layouts = args.cells or [9, 16]
+    modes = [("sequential", 0)] + [("pipelined", p) for p in (args.pages or [1, 4])]
+
+    mock = MockDevice(port=0, sources=50, latency_ms=args.latency_ms, ui_delay_ms=args.ui_delay_ms).start()
+    with tempfile.TemporaryDirectory() as tmp:
+        pw, browser, context, page = launch_browser(headless=not args.headful, record_video=False, out_dir=Path(tmp))
+        try:
+            ensure_logged_in(page, mock.base_url, USERNAME, PASSWORD)
+            print(f"{'cells':>5} {'mode':<12} {'pages':>5} {'median ms':>9} {'min ms':>7} {'speedup':>7} {'ok':>3}")
+            for cells in layouts:
+                select_layout(page, cells, confirm=True)
+                base, seq = None, 0
+                for mode, pages in modes:
+                    times, ok = [], True
+                    for _ in range(args.runs):
+                        seq += 1
+                        assigns = _assigns(cells, seq)
+                        t0 = time.perf_counter()
+                        if mode == "sequential":
+                            for g, n in sorted(assigns.items()):
+                                assign_source_to_grid(page, g, n)
+                        else:
+                            assign_grid_pipelined(page, assigns, pages=pages)
+                        times.append((time.perf_counter() - t0) * 1000.0)
+                        ok = ok and _verify(page, mock, assigns)
+                    med = statistics.median(times)
+                    base = base or med
+                    print(f"{cells:>5} {mode:<12} {pages or 1:>5} {med:>9.0f} {min(times):>7.0f} "
+                          f"{base / med:>6.2f}x {'yes' if ok else 'NO':>3}")
+        finally:
+            browser.close()
+            pw.stop()
+            mock.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# bench/bench_browser_profile.py
+"""
+Bandingkan profil browser "full" vs "lean" terhadap device (atau mock device):
+waktu launch -> dashboard siap, jumlah request, serta proses/RSS/CPU Chromium
+setelah dashboard dibiarkan idle beberapa detik (preview video tetap jalan di "full").
+
+    python3 -m bench.bench_browser_profile --scenario scenarios/login_only.yaml --runs 3
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+from core.auth import ensure_logged_in
+from core.browser import launch_browser
+from core.procstats import chromium_stats
+
+
+def _one_run(scn: dict, profile: str, idle_sec: float) -> dict:
+    counts = {"requests": 0, "blocked": 0}
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        pw, browser, context, page = launch_browser(headless=True, out_dir=Path(tmp), profile=profile)
+        try:
+            context.on("request", lambda r: counts.__setitem__("requests", counts["requests"] + 1))
+            context.on(
+                "requestfailed",
+                lambda r: counts.__setitem__("blocked", counts["blocked"] + ("BLOCKED" in (r.failure or "").upper())),
+            )
+            ensure_logged_in(page, scn["base_url"], scn["login"]["username"], scn["login"]["password"])
+            ready_ms = (time.perf_counter() - t0) * 1000.0
+
+            before = chromium_stats() or {}
+            page.wait_for_timeout(idle_sec * 1000)
+            after = chromium_stats() or {}
+        finally:
+            browser.close()
+            pw.stop()
+    return {
+        "ready_ms": ready_ms,
+        "processes": after.get("processes"),
+        "rss_mb": after.get("rss_mb"),
+        "idle_cpu_sec": round(after.get("cpu_sec", 0) - before.get("cpu_sec", 0), 2) if after else None,
+        **counts,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scenario", default="scenarios/login_only.yaml")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--idle", type=float, default=5.0, help="detik idle di dashboard sebelum ukur CPU/RSS")
+    args = ap.parse_args()
+
+    with open(args.scenario, "r", encoding="utf-8") as f:
+        scn = yaml.safe_load(f)
+
+    print(f"{'profile':>7} {'ready ms':>9} {'procs':>5} {'rss MB':>7} {'idle cpu s':>10} {'req':>5} {'blocked':>7}")
+    for profile in ("full", "lean"):
+        runs = [_one_run(scn, profile, args.idle) for _ in range(args.runs)]
+
+        def med(k):
+            vals = [r[k] for r in runs if r[k] is not None]
+            return statistics.median(vals) if vals else float("nan")
+
+        print(
+            f"{profile:>7} {med('ready_ms'):>9.0f} {med('processes'):>5.0f} {med('rss_mb'):>7.1f} "
+            f"{med('idle_cpu_sec'):>10.2f} {med('requests'):>5.0f} {med('blocked'):>7.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+# bench/bench_endpoints.py
+"""
+Benchmark latency end-to-end endpoint main.py terhadap mock device lokal
+(bench/mock_device), per jumlah source & concurrency. Hasil: p50/p95/p99,
+throughput, jumlah proses & RSS Chromium, ditulis ke JSON supaya bisa
+dibandingkan antar commit.
+
+    python3 -m bench.bench_endpoints --sources 10 --sources 200 --concurrency 1 --concurrency 8
+    python3 -m bench.bench_endpoints --out out/bench_new.json --compare out/bench_old.json
+"""
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import requests
+import yaml
+from requests.adapters import HTTPAdapter
+
+from bench.mock_device import MockDevice
+from bench.mock_device.server import PASSWORD, USERNAME
+from core.procstats import chromium_stats
+
+REPO = Path(__file__).resolve().parent.parent
+
+# endpoint -> (method, path, builder body per request ke-i)
+Body = Callable[[int], Optional[dict]]
+
+
+def _src(i: int) -> str:
+    return f"Camera {i % 10 + 1:03d}"
+
+
+ENDPOINTS: Dict[str, tuple] = {
+    "/health": ("GET", "/health", lambda i: None),
+    "/sources": ("GET", "/sources", lambda i: None),
+    "/sources_cached": ("GET", "/sources_cached", lambda i: None),
+    # selang-seling supaya setiap request benar-benar mengganti layout
+    "/layout": ("POST", "/layout", lambda i: {"cells": (4, 9)[i % 2], "confirm_shift": True}),
+    "/assign": ("POST", "/assign", lambda i: {"grid": i % 4 + 1, "name": _src(i)}),
+    "/assign/bulk": ("POST", "/assign/bulk", lambda i: {
+        "assigns": [{"grid": g, "name": _src(i + g)} for g in range(1, 5)],
+    }),
+    "/set-url": ("POST", "/set-url", lambda i: {
+        "items": [{"name": _src(i), "url": f"rtsp://10.9.0.{i % 250 + 1}:554/stream/ch1"}],
+    }),
+    "/run": ("POST", "/run", lambda i: {
+        "layout_cells": 4,
+        "set_urls": [{"name": _src(i), "url": f"rtsp://10.8.0.{i % 250 + 1}:554/stream/ch1"}],
+        "assigns": [{"grid": 1, "name": _src(i)}, {"grid": 2, "name": _src(i + 1)}],
+    }),
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _pct(samples: List[float], p: float) -> Optional[float]:
+    if not samples:
+        return None
+    s = sorted(samples)
+    return round(s[min(len(s) - 1, int(p * len(s)))], 1)
+
+
+class ApiServer:
+    """main.py di subprocess uvicorn dengan scenario mock; out/ di direktori sementara."""
+
+    def __init__(self, base_url: str, workdir: Path, env_extra: Dict[str, str]):
+        scn = {"name": "mock-d350", "base_url": base_url, "login": {"username": USERNAME, "password": PASSWORD}}
+        scenario = workdir / "mock.yaml"
+        scenario.write_text(yaml.safe_dump(scn), encoding="utf-8")
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        env = {**os.environ, "PYTHONPATH": str(REPO), "SCENARIO_PATH": str(scenario), **env_extra}
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", str(REPO),
+             "--host", "127.0.0.1", "--port", str(self.port), "--log-level", "warning"],
+            cwd=workdir, env=env,
+        )
+
+    def wait_ready(self, timeout: float = 120.0) -> None:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"API berhenti (exit {self.proc.returncode})")
+            try:
+                # /sources memaksa launch + login, jadi pengukuran berikutnya warm
+                if requests.get(self.url + "/sources", timeout=timeout).ok:
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(0.5)
+        raise RuntimeError("API tidak siap dalam batas waktu")
+
+    def stop(self) -> None:
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+
+def _drive(http: requests.Session, api_url: str, endpoint: str, total: int, concurrency: int) -> dict:
+    method, path, body = ENDPOINTS[endpoint]
+
+    def _one(i: int):
+        t0 = time.perf_counter()
+        try:
+            r = http.request(method, api_url + path, json=body(i), timeout=300)
+            ok = r.ok
+        except requests.RequestException:
+            ok = False
+        return (time.perf_counter() - t0) * 1000.0, ok
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(_one, range(total)))
+    wall = time.perf_counter() - t0
+    lat = [ms for ms, ok in results if ok]
+    return {
+        "requests": total,
+        "errors": sum(1 for _, ok in results if not ok),
+        "p50_ms": _pct(lat, 0.50),
+        "p95_ms": _pct(lat, 0.95),
+        "p99_ms": _pct(lat, 0.99),
+        "max_ms": round(max(lat), 1) if lat else None,
+        "throughput_rps": round(len(lat) / wall, 2) if wall else None,
+    }
+
+
+def _compare(old_path: str, new: dict) -> None:
+    old = json.loads(Path(old_path).read_text("utf-8"))
+    key = lambda r: (r["sources"], r["endpoint"], r["concurrency"])  # noqa: E731
+    before = {key(r): r for r in old.get("results", [])}
+    print(f"\nvs {old_path} ({old.get('meta', {}).get('git_rev')})")
+    print(f"{'sources':>7} {'endpoint':<16} {'conc':>4} {'p50 old':>8} {'p50 new':>8} {'p95 old':>8} {'p95 new':>8} {'delta p95':>9}")
+    for r in new["results"]:
+        o = before.get(key(r))
+        if not o or o["p95_ms"] is None or r["p95_ms"] is None:
+            continue
+        delta = (r["p95_ms"] - o["p95_ms"]) / o["p95_ms"] * 100 if o["p95_ms"] else 0.0
+        print(f"{r['sources']:>7} {r['endpoint']:<16} {r['concurrency']:>4} {o['p50_ms']:>8} {r['p50_ms']:>8} "
+              f"{o['p95_ms']:>8} {r['p95_ms']:>8} {delta:>+8.0f}%")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sources", type=int, action="append", help="jumlah source mock (repeatable), default 10,100,500")
+    ap.add_argument("--concurrency", type=int, action="append", help="client paralel (repeatable), default 1,4,16")
+    ap.add_argument("--requests", type=int, default=20, help="request per endpoint per level concurrency")
+    ap.add_argument("--endpoint", action="append", choices=sorted(ENDPOINTS), help="subset endpoint (repeatable)")
+    ap.add_argument("--latency-ms", type=float, default=20.0, help="latency API mock")
+    ap.add_argument("--ui-delay-ms", type=int, default=150, help="durasi animasi UI mock")
+    ap.add_argument("--env", action="append", default=[], help="env tambahan untuk API, mis. BROWSER_PROFILE=lean")
+    ap.add_argument("--out", default="out/bench_endpoints.json")
+    ap.add_argument("--compare", help="report JSON sebelumnya untuk dibandingkan")
+    args = ap.parse_args()
+
+    counts = args.sources or [10, 100, 500]
+    levels = args.concurrency or [1, 4, 16]
+    endpoints = args.endpoint or list(ENDPOINTS)
+    env_extra = dict(kv.split("=", 1) for kv in args.env)
+
+    report = {
+        "meta": {
+            "git_rev": _git_rev(),
+            "at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "requests_per_level": args.requests,
+            "mock_latency_ms": args.latency_ms,
+            "mock_ui_delay_ms": args.ui_delay_ms,
+            "env": env_extra,
+        },
+        "results": [],
+    }
+
+    print(f"{'sources':>7} {'endpoint':<16} {'conc':>4} {'p50':>8} {'p95':>8} {'p99':>8} {'rps':>7} {'err':>4} {'procs':>5} {'rss MB':>7}")
+    http = requests.Session()
+    http.mount("http://", HTTPAdapter(pool_maxsize=max(levels)))
+    for n in counts:
+        mock = MockDevice(port=0, sources=n, latency_ms=args.latency_ms, ui_delay_ms=args.ui_delay_ms).start()
+        with tempfile.TemporaryDirectory() as tmp:
+            api = ApiServer(mock.base_url, Path(tmp), env_extra)
+            try:
+                api.wait_ready()
+                for ep in endpoints:
+                    for c in levels:
+                        res = _drive(http, api.url, ep, args.requests, c)
+                        chrome = chromium_stats(api.proc.pid) or {}
+                        row = {"sources": n, "endpoint": ep, "concurrency": c, **res, "chromium": chrome}
+                        report["results"].append(row)
+                        print(f"{n:>7} {ep:<16} {c:>4} {res['p50_ms']!s:>8} {res['p95_ms']!s:>8} {res['p99_ms']!s:>8} "
+                              f"{res['throughput_rps']!s:>7} {res['errors']:>4} {chrome.get('processes', '-')!s:>5} "
+                              f"{chrome.get('rss_mb', '-')!s:>7}")
+            finally:
+                api.stop()
+                mock.stop()
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"[OK] report -> {out}")
+    if args.compare:
+        _compare(args.compare, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# bench/bench_list_sources.py
+"""
+Bandingkan list_sources mode "dom" (per item) vs "js" (satu round-trip)
+terhadap fixture DOM tersimpan, tanpa perlu device.
+
+    python3 -m bench.bench_list_sources --count 60 --repeat 5
+"""
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+from playwright.sync_api import sync_playwright
+
+from core.actions.sources import list_sources
+
+FIXTURE = Path(__file__).resolve().parent / "fixtures" / "discovery_list.html"
+
+# gandakan item fixture sampai `n` (nama & stream-id dibuat unik)
+_REPLICATE_JS = """
+(n) => {
+  const box = document.querySelector('.discovery-list-box');
+  const tpl = Array.from(box.querySelectorAll('.discovery-list-item'));
+  box.innerHTML = '';
+  for (let i = 0; i < n; i++) {
+    const it = tpl[i % tpl.length].cloneNode(true);
+    const nm = it.querySelector('.item-title span[title]');
+    const label = `${nm.getAttribute('title')} #${i + 1}`;
+    nm.setAttribute('title', label);
+    nm.textContent = label;
+    it.setAttribute('data-stream-id', `${it.getAttribute('data-stream-id').slice(0, 24)}${String(i).padStart(8, '0')}`);
+    box.appendChild(it);
+  }
+}
+"""
+
+
+def _time_mode(page, mode: str, repeat: int):
+    samples, data = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        data = list_sources(page, mode=mode)
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return samples, data
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--count", type=int, action="append", help="jumlah source (repeatable), default 10,60,200")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    counts = args.count or [10, 60, 200]
+
+    html = FIXTURE.read_text("utf-8")
+    with sync_playwright() as pw:
+        browser = pw.chromium.launch(headless=True)
+        page = browser.new_page()
+        print(f"{'count':>6} {'mode':>5} {'median ms':>10} {'min ms':>8}")
+        for n in counts:
+            page.set_content(html)
+            page.evaluate(_REPLICATE_JS, n)
+            results = {}
+            for mode in ("dom", "js"):
+                samples, data = _time_mode(page, mode, args.repeat)
+                results[mode] = data
+                print(f"{n:>6} {mode:>5} {statistics.median(samples):>10.1f} {min(samples):>8.1f}")
+            if results["dom"] != results["js"]:
+                raise SystemExit(f"[ERR] hasil mode dom vs js berbeda untuk count={n}")
+        browser.close()
+
+
+if __name__ == "__main__":
+    main()
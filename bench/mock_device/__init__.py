@@ -0,0 +1,3 @@
+from .server import MockDevice, MockState
+
+__all__ = ["MockDevice", "MockState"]
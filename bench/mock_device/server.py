@@ -0,0 +1,282 @@
+# bench/mock_device/server.py
+"""
+Pengganti lokal dashboard Kiloview D350 untuk benchmark tanpa device fisik.
+
+DOM meniru yang ditarget core/ui_selectors.py & core/actions/* (form login,
+dropdown `.layout-setting-box`, cell `.layout-grid-content .grid-list-item`,
+`div.discovery-list-item` + dialog gear, modal layout shift `el-message-box`),
+state disimpan di memori server dan juga tersedia lewat JSON API yang sama
+dengan scenarios/http_api.yaml.example.
+
+    python3 -m bench.mock_device --port 8350 --sources 60 --latency-ms 40
+    python3 run.py --scenario scenarios/mock_device.yaml.example --list-sources
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+INDEX_HTML = Path(__file__).resolve().parent / "index.html"
+
+LAYOUTS = {"Single": 1, "PIP": 2, "2x2": 4, "3x3": 9, "4x4": 16}
+STATUS_TEXT = {0: "Not Connected", 1: "Connected", 2: "Network Error"}
+
+_SNAPSHOT = b"\xff\xd8" + bytes(64 * 1024) + b"\xff\xd9"
+
+USERNAME = "admin"
+PASSWORD = "Admin123"
+
+
+class MockState:
+    def __init__(self, sources: int, seed: int = 350):
+        rnd = random.Random(seed)
+        self.lock = threading.Lock()
+        self.sources: List[dict] = []
+        for i in range(sources):
+            self.sources.append({
+                "id": f"{rnd.getrandbits(128):032x}",
+                "name": f"Camera {i + 1:03d}",
+                "url": f"rtsp://10.0.{i // 250}.{i % 250 + 1}:554/stream/ch1",
+                "status": rnd.choice((0, 1, 1, 1, 2)),
+            })
+        self.layout = "2x2"
+        self.grid: Dict[int, str] = {}  # cell 1-based -> source id
+        self.tokens: set = set()
+        self.revision = 0
+
+    def by_id(self, sid: str) -> Optional[dict]:
+        return next((s for s in self.sources if s["id"] == sid), None)
+
+    def snapshot(self) -> dict:
+        return {
+            "layout": self.layout,
+            "cells": LAYOUTS[self.layout],
+            "grid": {str(k): v for k, v in self.grid.items()},
+            "revision": self.revision,
+        }
+
+    def flap(self, rnd: random.Random) -> None:
+        with self.lock:
+            src = rnd.choice(self.sources)
+            src["status"] = rnd.choice([s for s in STATUS_TEXT if s != src["status"]])
+            self.revision += 1
+
+
+class MockDevice:
+    """Server mock yang bisa dipakai dari script lain (mis. harness benchmark)."""
+
+    def __init__(
+        self,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 8350,
+        sources: int = 60,
+        latency_ms: float = 0.0,
+        ui_delay_ms: int = 150,
+        flap_sec: float = 0.0,
+        spa_poll_sec: float = 5.0,
+    ):
+        self.state = MockState(sources)
+        self.latency_ms = latency_ms
+        self.ui_delay_ms = ui_delay_ms
+        self.flap_sec = flap_sec
+        self.spa_poll_sec = spa_poll_sec
+        self.requests = 0
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+        handler = type("Handler", (_Handler,), {"device": self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockDevice":
+        t = threading.Thread(target=self.httpd.serve_forever, name="mock-device", daemon=True)
+        t.start()
+        self._threads.append(t)
+        if self.flap_sec > 0:
+            f = threading.Thread(target=self._flapper, name="mock-device-flap", daemon=True)
+            f.start()
+            self._threads.append(f)
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _flapper(self) -> None:
+        rnd = random.Random(7)
+        while not self._stop.wait(self.flap_sec):
+            self.state.flap(rnd)
+
+    def page_config(self) -> dict:
+        return {"uiDelayMs": self.ui_delay_ms, "pollMs": int(self.spa_poll_sec * 1000)}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    device: MockDevice
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):  # senyap; benchmark tidak butuh access log
+        pass
+
+    # ---------- util ----------
+    def _send(self, code: int, body: bytes, ctype: str, extra: Optional[dict] = None) -> None:
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        for k, v in (extra or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, data, code: int = 200, extra: Optional[dict] = None) -> None:
+        self._send(code, json.dumps(data).encode("utf-8"), "application/json", extra)
+
+    def _body(self) -> dict:
+        n = int(self.headers.get("Content-Length") or 0)
+        if not n:
+            return {}
+        try:
+            return json.loads(self.rfile.read(n) or b"{}")
+        except ValueError:
+            return {}
+
+    def _token(self) -> Optional[str]:
+        auth = self.headers.get("Authorization") or ""
+        if auth.startswith("Bearer "):
+            return auth[7:]
+        for part in (self.headers.get("Cookie") or "").split(";"):
+            k, _, v = part.strip().partition("=")
+            if k == "mock_session":
+                return v
+        return None
+
+    def _authed(self) -> bool:
+        return self._token() in self.device.state.tokens
+
+    def _delay(self) -> None:
+        self.device.requests += 1
+        if self.device.latency_ms > 0:
+            time.sleep(self.device.latency_ms / 1000.0)
+
+    # ---------- routing ----------
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path.startswith("/snapshot/"):
+            # "frame" preview palsu (cukup besar untuk terasa di jaringan/RSS), bukan JPEG valid
+            return self._send(200, _SNAPSHOT, "image/jpeg")
+        if not path.startswith("/api/"):
+            # SPA: semua path non-API (/, /login, /dashboard) -> index.html
+            html = INDEX_HTML.read_text("utf-8").replace(
+                "/*__CONFIG__*/{}", json.dumps(self.device.page_config())
+            )
+            return self._send(200, html.encode("utf-8"), "text/html; charset=utf-8")
+
+        self._delay()
+        if not self._authed():
+            return self._json({"code": 401, "msg": "unauthorized"}, 401)
+        st = self.device.state
+        with st.lock:
+            if path == "/api/source/list":
+                return self._json({"code": 0, "data": {"list": st.sources, "revision": st.revision}})
+            if path == "/api/grid/state":
+                return self._json({"code": 0, "data": st.snapshot()})
+        return self._json({"code": 404, "msg": "not found"}, 404)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        self._delay()
+        body = self._body()
+        st = self.device.state
+
+        if path == "/api/user/login":
+            if body.get("username") != USERNAME or body.get("password") != PASSWORD:
+                return self._json({"code": 1, "msg": "bad credentials"})
+            token = secrets.token_hex(16)
+            st.tokens.add(token)
+            return self._json(
+                {"code": 0, "data": {"token": token}},
+                extra={"Set-Cookie": f"mock_session={token}; Path=/; Max-Age=43200; HttpOnly"},
+            )
+        if path == "/api/user/logout":
+            st.tokens.discard(self._token())
+            return self._json({"code": 0})
+
+        if not self._authed():
+            return self._json({"code": 401, "msg": "unauthorized"}, 401)
+
+        with st.lock:
+            if path == "/api/layout/set":
+                mode = body.get("mode")
+                if mode not in LAYOUTS:
+                    return self._json({"code": 2, "msg": f"unknown layout {mode!r}"})
+                if mode != st.layout:
+                    st.layout = mode
+                    st.grid.clear()  # ganti layout mengosongkan grid (seperti device asli)
+                    st.revision += 1
+                return self._json({"code": 0, "data": st.snapshot()})
+
+            if path == "/api/grid/assign":
+                grid, sid = int(body.get("grid") or 0), body.get("id")
+                if not 1 <= grid <= LAYOUTS[st.layout] or st.by_id(sid) is None:
+                    return self._json({"code": 2, "msg": "invalid grid/source"})
+                st.grid[grid] = sid
+                st.revision += 1
+                return self._json({"code": 0, "data": st.snapshot()})
+
+            if path == "/api/source/update":
+                src = st.by_id(body.get("id"))
+                if src is None:
+                    return self._json({"code": 2, "msg": "source not found"})
+                src["url"] = str(body.get("url") or "")
+                st.revision += 1
+                return self._json({"code": 0, "data": src})
+
+        return self._json({"code": 404, "msg": "not found"}, 404)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Mock dashboard Kiloview D350 untuk benchmark")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8350)
+    ap.add_argument("--sources", type=int, default=60, help="jumlah source (10-500)")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="delay tambahan tiap request API")
+    ap.add_argument("--ui-delay-ms", type=int, default=150, help="durasi 'animasi' dialog/modal/grid di page")
+    ap.add_argument("--flap-sec", type=float, default=0.0, help="ubah status satu source acak tiap N detik (0=off)")
+    ap.add_argument("--spa-poll-sec", type=float, default=5.0, help="interval refresh daftar source oleh page")
+    args = ap.parse_args()
+
+    dev = MockDevice(
+        host=args.host,
+        port=args.port,
+        sources=args.sources,
+        latency_ms=args.latency_ms,
+        ui_delay_ms=args.ui_delay_ms,
+        flap_sec=args.flap_sec,
+        spa_poll_sec=args.spa_poll_sec,
+    ).start()
+    print(f"[INFO] mock D350 di {dev.base_url} ({args.sources} source), login {USERNAME}/{PASSWORD}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        dev.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,10 @@ import re
 import time
 import random
 import json
-from typing import Iterable, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from threading import Condition, Event, Lock, Thread
+from typing import Dict, Iterable, List, Optional, Tuple
 from pathlib import Path
-from datetime import datetime, timedelta
 
 import requests
 from requests.adapters import HTTPAdapter
@@ -30,8 +31,17 @@ POST_TIMEOUT           = float(os.getenv("POST_TIMEOUT") or 20.0)
 POST_MAX_RETRY         = int(os.getenv("POST_MAX_RETRY") or 1)
 DRY_RUN                = (os.getenv("DRY_RUN") or "false").lower() in ("1", "true", "yes")
 
-CLIENT_BATCH_SIZE      = int(os.getenv("CLIENT_BATCH_SIZE") or 3)  # TETAP 3 sesuai requirement
-SLEEP_BETWEEN_BATCH    = float(os.getenv("SLEEP_BETWEEN_BATCH") or 0.5)
+CLIENT_BATCH_SIZE      = int(os.getenv("CLIENT_BATCH_SIZE") or 3)  # ukuran awal (tetap jika ADAPTIVE_BATCH=false)
+SLEEP_BETWEEN_BATCH    = float(os.getenv("SLEEP_BETWEEN_BATCH") or 0.5)  # hanya setelah POST gagal/lambat
+# AIMD: batch +1 tiap POST penuh yang sukses < POST_TARGET_LATENCY, /2 saat gagal atau lambat
+ADAPTIVE_BATCH         = (os.getenv("ADAPTIVE_BATCH") or "true").lower() in ("1", "true", "yes")
+CLIENT_BATCH_MAX       = int(os.getenv("CLIENT_BATCH_MAX") or 30)
+POST_TARGET_LATENCY    = float(os.getenv("POST_TARGET_LATENCY") or POST_TIMEOUT / 2)
+# keep-alive ke ENDPOINT_URL: auto = pakai, pindah ke "Connection: close" jika koneksi reuse diputus
+POST_KEEPALIVE         = (os.getenv("POST_KEEPALIVE") or "auto").lower()
+# auto: turun ke Connection: close setelah N reset beruntun, coba keep-alive lagi setelah cooldown
+POST_KEEPALIVE_MAX_RESETS = int(os.getenv("POST_KEEPALIVE_MAX_RESETS") or 3)
+POST_KEEPALIVE_COOLDOWN   = float(os.getenv("POST_KEEPALIVE_COOLDOWN") or 300.0)
 INITIAL_BACKOFF        = float(os.getenv("INITIAL_BACKOFF") or 0.8)
 BACKOFF_CAP            = float(os.getenv("BACKOFF_CAP") or 5.0)
 MAX_FALLBACK_SPLIT     = int(os.getenv("MAX_FALLBACK_SPLIT") or 1)
@@ -41,11 +51,42 @@ RESCAN_INTERVAL_SECONDS = int(os.getenv("RESCAN_INTERVAL_SECONDS") or 20)   # de
 SESSION_MAX_AGE_SECONDS = int(os.getenv("SESSION_MAX_AGE_SECONDS") or 1200) # default 20 menit
 STARTUP_GRACE_SECONDS   = int(os.getenv("STARTUP_GRACE_SECONDS") or 0)      # opsional; 0=tanpa grace
 ALWAYS_LOGIN_EACH_LOOP  = (os.getenv("ALWAYS_LOGIN_EACH_LOOP") or "false").lower() in ("1","true","yes")
+# SESSION_MODE:
+# - "keepalive": pakai jsession selama probe masih valid (juga setelah restart); rotasi
+#   proaktif sebelum umur yang teramati habis, URL baru dikirim bergelombang
+# - "login"    : login tiap loop (= ALWAYS_LOGIN_EACH_LOOP=true)
+# - "max_age"  : login ulang tiap SESSION_MAX_AGE_SECONDS
+SESSION_MODE            = (os.getenv("SESSION_MODE") or ("login" if ALWAYS_LOGIN_EACH_LOOP else "max_age")).lower()
+JSESSION_PROBE_INTERVAL = int(os.getenv("JSESSION_PROBE_INTERVAL") or RESCAN_INTERVAL_SECONDS)
+JSESSION_MAX_AGE        = int(os.getenv("JSESSION_MAX_AGE") or 0)          # 0 = tanpa batas (hanya umur teramati)
+JSESSION_ROTATE_AT      = float(os.getenv("JSESSION_ROTATE_AT") or 0.8)    # rotasi di 80% umur
+ROTATION_WAVE_SIZE      = int(os.getenv("ROTATION_WAVE_SIZE") or 10)       # URL jsession-only per scan
+# kode `result` CMSV8 untuk session tidak ada / kedaluwarsa; result lain saat probe bukan berarti expired
+JSESSION_INVALID_RESULTS = {int(x) for x in (os.getenv("JSESSION_INVALID_RESULTS") or "5").split(",") if x.strip()}
+
+# Snapshot: lookup status per key paralel (1 = serial seperti dulu)
+SNAPSHOT_WORKERS        = int(os.getenv("SNAPSHOT_WORKERS") or 16)
+# koneksi keep-alive per host; minimal sebanyak worker supaya tidak saling tunggu koneksi
+HTTP_POOL_MAXSIZE       = int(os.getenv("HTTP_POOL_MAXSIZE") or max(4, SNAPSHOT_WORKERS))
+# Satu getDeviceOlStatus untuk banyak devIdno/vehiIdno (dipisah koma), per BULK_STATUS_CHUNK key
+BULK_STATUS             = (os.getenv("BULK_STATUS") or "true").lower() in ("1", "true", "yes")
+BULK_STATUS_CHUNK       = int(os.getenv("BULK_STATUS_CHUNK") or 50)
 
 # Cache: simpan di folder yang sama dengan file .py ini
 _SCRIPT_DIR = Path(__file__).resolve().parent
 DEFAULT_CACHE = _SCRIPT_DIR / "last_sent.json"
 PERSIST_CACHE_PATH = os.getenv("PERSIST_CACHE_PATH") or str(DEFAULT_CACHE)
+# Index key -> cara lookup yang terakhir berhasil (dev / vehi / status_dev / status_vehi).
+# Entri yang tidak pernah online lagi selama LOOKUP_INDEX_TTL dipelajari ulang (urutan lengkap).
+LOOKUP_INDEX_PATH  = os.getenv("LOOKUP_INDEX_PATH") or str(_SCRIPT_DIR / "lookup_index.json")
+LOOKUP_INDEX_TTL   = int(os.getenv("LOOKUP_INDEX_TTL") or 6 * 3600)
+JSESSION_STATE_PATH = os.getenv("JSESSION_STATE_PATH") or str(_SCRIPT_DIR / "jsession.json")
+# Outbox: set_urls yang belum terkirim (append-only JSONL), dikuras thread sender
+OUTBOX_PATH          = os.getenv("OUTBOX_PATH") or str(_SCRIPT_DIR / "outbox.jsonl")
+OUTBOX_COMPACT_LINES = int(os.getenv("OUTBOX_COMPACT_LINES") or 2000)
+SEND_BACKOFF_MAX     = float(os.getenv("SEND_BACKOFF_MAX") or 60.0)
+# item tunggal yang ditolak 4xx dipindah ke sini (tidak dikirim ulang sampai URL-nya berubah)
+DEAD_LETTER_PATH     = os.getenv("DEAD_LETTER_PATH") or str(_SCRIPT_DIR / "dead_letter.jsonl")
 
 # Penamaan "name" yang dikirim ke server:
 # - "simple": pakai cam_name langsung (cocok dengan Source di server)
@@ -96,7 +137,7 @@ def make_session() -> requests.Session:
         status_forcelist=(500, 502, 503, 504),
         allowed_methods=frozenset(["GET"])
     )
-    adapter = HTTPAdapter(max_retries=retries_get_only, pool_connections=4, pool_maxsize=4)
+    adapter = HTTPAdapter(max_retries=retries_get_only, pool_connections=4, pool_maxsize=HTTP_POOL_MAXSIZE)
     s.mount("http://", adapter)
     s.mount("https://", adapter)
     return s
@@ -122,6 +163,50 @@ def _save_cache(cache: dict):
     tmp.write_text(json.dumps(cache, ensure_ascii=False, indent=2), encoding="utf-8")
     tmp.replace(p)
 
+# ===== Index strategi lookup =====
+LOOKUP_STRATEGIES = ("dev", "vehi", "status_dev", "status_vehi")
+
+def _load_lookup_index() -> dict:
+    try:
+        raw = json.loads(Path(LOOKUP_INDEX_PATH).read_text("utf-8"))
+    except Exception:
+        return {}
+    return {k: v for k, v in raw.items() if isinstance(v, dict) and v.get("strategy") in LOOKUP_STRATEGIES}
+
+def _save_lookup_index(index: dict):
+    p = Path(LOOKUP_INDEX_PATH)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_suffix(".tmp")
+    tmp.write_text(json.dumps(index, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp.replace(p)
+
+LOOKUP_INDEX = _load_lookup_index()
+_LOOKUP_INDEX_LOCK = Lock()
+_lookup_index_dirty = False
+
+def _known_strategy(key: str) -> Optional[str]:
+    ent = LOOKUP_INDEX.get(key)
+    if not ent or time.time() - float(ent.get("ok_at") or 0) > LOOKUP_INDEX_TTL:
+        return None
+    return ent["strategy"]
+
+def _remember_strategy(key: str, strategy: str):
+    global _lookup_index_dirty
+    with _LOOKUP_INDEX_LOCK:
+        LOOKUP_INDEX[key] = {"strategy": strategy, "ok_at": int(time.time())}
+        _lookup_index_dirty = True
+
+def _flush_lookup_index():
+    global _lookup_index_dirty
+    with _LOOKUP_INDEX_LOCK:
+        if not _lookup_index_dirty:
+            return
+        _lookup_index_dirty = False
+        try:
+            _save_lookup_index(LOOKUP_INDEX)
+        except Exception as e:
+            print(f"[WARN] Gagal simpan lookup index: {e}")
+
 # ===================== CORE (CMSV8) =====================
 def login(session: requests.Session) -> str:
     url = f"{BASE_URL}/StandardApiAction_login.action"
@@ -133,6 +218,22 @@ def login(session: requests.Session) -> str:
         raise RuntimeError(f"Login gagal: {data}")
     return js
 
+def probe_jsession(session: requests.Session, jsession: str) -> bool:
+    """
+    Cek jsession masih diterima server (sekaligus memperpanjang idle timeout-nya):
+    satu getDeviceOlStatus ringan untuk key pertama CAMERA_MAP. Hanya result di
+    JSESSION_INVALID_RESULTS yang berarti session tidak valid; error lain (device
+    dihapus, tanpa izin, dll.) tidak ada hubungannya dengan session.
+    """
+    url = f"{BASE_URL}/StandardApiAction_getDeviceOlStatus.action"
+    key = next(iter(CAMERA_MAP), "")
+    r = session.get(url, params={"jsession": jsession, "devIdno": key, "status": 1}, timeout=8)
+    r.raise_for_status()
+    result = r.json().get("result")
+    if result != 0 and result not in JSESSION_INVALID_RESULTS:
+        print(f"[WARN] Probe jsession: result={result} untuk '{key}', session dianggap masih valid.")
+    return result not in JSESSION_INVALID_RESULTS
+
 def query_online_by(session: requests.Session, jsession: str, *, dev: str = None, vehi: str = None) -> List[str]:
     url = f"{BASE_URL}/StandardApiAction_getDeviceOlStatus.action"
     params = {"jsession": jsession, "status": 1}
@@ -148,29 +249,72 @@ def query_online_by(session: requests.Session, jsession: str, *, dev: str = None
     onlines = data.get("onlines", []) or []
     return [it["did"] for it in onlines if str(it.get("online", 0)) == "1" and it.get("did")]
 
-def fallback_status(session: requests.Session, jsession: str, key: str) -> List[str]:
+def query_online_bulk(session: requests.Session, jsession: str, keys: List[str], *, by: str) -> Dict[str, List[str]]:
+    """
+    Satu getDeviceOlStatus untuk banyak key sekaligus (per BULK_STATUS_CHUNK).
+    by="dev": key = devIdno, dicocokkan ke `did`; by="vehi": key = vehiIdno, dicocokkan ke `vid`.
+    Return {key: [did online]} untuk SEMUA key (list kosong = offline).
+    """
+    url = f"{BASE_URL}/StandardApiAction_getDeviceOlStatus.action"
+    param, field = ("devIdno", "did") if by == "dev" else ("vehiIdno", "vid")
+    out: Dict[str, List[str]] = {k: [] for k in keys}
+    for part in chunked(keys, BULK_STATUS_CHUNK):
+        r = session.get(url, params={"jsession": jsession, "status": 1, param: ",".join(part)}, timeout=8)
+        r.raise_for_status()
+        data = r.json()
+        if data.get("result") != 0:
+            raise RuntimeError(f"getDeviceOlStatus bulk ditolak: result={data.get('result')}")
+        for it in data.get("onlines", []) or []:
+            if field not in it:
+                raise RuntimeError(f"respons bulk tanpa field '{field}', tidak bisa dipetakan ke key")
+            k = str(it[field])
+            if k in out and str(it.get("online", 0)) == "1" and it.get("did"):
+                out[k].append(it["did"])
+    return out
+
+def _device_status(session: requests.Session, jsession: str, param_name: str, key: str) -> List[str]:
     url = f"{BASE_URL}/StandardApiAction_getDeviceStatus.action"
+    r = session.get(url, params={"jsession": jsession, param_name: key}, timeout=8)
+    r.raise_for_status()
+    d = r.json()
+    if d.get("result") == 0 and d.get("status"):
+        return [it["id"] for it in d["status"] if it.get("id") and it.get("ol", 0) == 1]
+    return []
+
+def fallback_status(session: requests.Session, jsession: str, key: str) -> List[str]:
     for param_name in ("devIdno", "vehiIdno"):
-        r = session.get(url, params={"jsession": jsession, param_name: key}, timeout=8)
-        r.raise_for_status()
-        d = r.json()
-        if d.get("result") == 0 and d.get("status"):
-            dids = []
-            for it in d["status"]:
-                if it.get("id") and it.get("ol", 0) == 1:
-                    dids.append(it["id"])
-            if dids:
-                return dids
+        dids = _device_status(session, jsession, param_name, key)
+        if dids:
+            return dids
     return []
 
+def lookup_online(session: requests.Session, jsession: str, key: str, strategy: str) -> List[str]:
+    """Satu request sesuai strategi (lihat LOOKUP_STRATEGIES)."""
+    if strategy == "dev":
+        return query_online_by(session, jsession, dev=key)
+    if strategy == "vehi":
+        return query_online_by(session, jsession, vehi=key)
+    if strategy == "status_dev":
+        return _device_status(session, jsession, "devIdno", key)
+    return _device_status(session, jsession, "vehiIdno", key)
+
 def get_online_devices(session: requests.Session, jsession: str, key: str) -> List[str]:
-    dids = query_online_by(session, jsession, dev=key)
-    if dids:
-        return dids
-    dids = query_online_by(session, jsession, vehi=key)
-    if dids:
+    """
+    Key yang strateginya sudah dikenal (LOOKUP_INDEX): satu request.
+    Selain itu coba berurutan devIdno, vehiIdno, getDeviceStatus (2x) dan simpan yang berhasil.
+    """
+    known = _known_strategy(key)
+    if known:
+        dids = lookup_online(session, jsession, key, known)
+        if dids:
+            _remember_strategy(key, known)
         return dids
-    return fallback_status(session, jsession, key)
+    for strategy in LOOKUP_STRATEGIES:
+        dids = lookup_online(session, jsession, key, strategy)
+        if dids:
+            _remember_strategy(key, strategy)
+            return dids
+    return []
 
 def build_rtsp(jsession: str, devidno: str, channel: int, stream: int = DEFAULT_STREAM) -> str:
     # path "rtmp://.../3/3" sesuai pola yang kamu pakai
@@ -185,81 +329,353 @@ def choose_display_name(cam_name: str, key: str, did: str, ch: int) -> str:
         return safe_name(f"{key}/{did} - {cam_name} (ch{ch})")
     return safe_name(cam_name)
 
+# ===================== SESSION =====================
+class JSessionManager:
+    """
+    Siklus hidup JSESSIONID sesuai SESSION_MODE.
+
+    Mode keepalive: jsession dipertahankan selama probe lolos (disimpan ke
+    JSESSION_STATE_PATH, jadi restart tidak memicu login & rewrite URL).
+    Saat probe gagal, umur session yang teramati dicatat (`lifetime`);
+    berikutnya rotasi dilakukan proaktif di JSESSION_ROTATE_AT x min(lifetime,
+    JSESSION_MAX_AGE), saat jsession lama masih valid, sehingga URL
+    lama tetap jalan selama URL baru dikirim bergelombang (`old_valid_until`).
+    """
+
+    def __init__(self, mode: str = SESSION_MODE, state_path: str = JSESSION_STATE_PATH):
+        self.mode = mode
+        self.state_path = Path(state_path)
+        self.jsession: Optional[str] = None
+        self.birth = 0.0          # epoch login
+        self.last_ok = 0.0        # epoch probe / login terakhir yang sukses
+        self.lifetime: Optional[float] = None  # umur session yang teramati dari server
+        self.old_valid_until = 0.0  # jsession sebelumnya masih bisa dipakai sampai (epoch)
+        self.logins = 0
+        if mode == "keepalive":
+            self._load()
+
+    def _load(self):
+        try:
+            st = json.loads(self.state_path.read_text("utf-8"))
+        except Exception:
+            return
+        self.jsession = st.get("jsession")
+        self.birth = float(st.get("birth") or 0)
+        self.lifetime = st.get("lifetime")
+
+    def _save(self):
+        if self.mode != "keepalive":
+            return
+        try:
+            tmp = self.state_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"jsession": self.jsession, "birth": self.birth, "lifetime": self.lifetime}))
+            tmp.replace(self.state_path)
+        except Exception as e:
+            print(f"[WARN] Gagal simpan state jsession: {e}")
+
+    def _expected_age(self) -> Optional[float]:
+        """Perkiraan umur jsession: yang teramati dan/atau JSESSION_MAX_AGE (ambil terkecil)."""
+        ages = [a for a in (self.lifetime, JSESSION_MAX_AGE) if a]
+        return min(ages) if ages else None
+
+    def _rotate_age(self) -> Optional[float]:
+        # rotasi sebelum umur habis -> selalu ada jendela untuk gelombang URL baru
+        age = self._expected_age()
+        return age * JSESSION_ROTATE_AT if age else None
+
+    def _login(self, session: requests.Session, old_still_valid: bool) -> str:
+        old = self.jsession
+        new = login(session)
+        now = time.time()
+        if old and new != old and old_still_valid:
+            # perkiraan kapan jsession lama habis
+            self.old_valid_until = self.birth + (self._expected_age() or 0)
+        else:
+            self.old_valid_until = 0.0
+        self.jsession, self.birth, self.last_ok = new, now, now
+        self.logins += 1
+        self._save()
+        if old is None:
+            print(f"[OK] Login. JSESSIONID={new}")
+        elif new != old:
+            print(f"[OK] Login. JSESSIONID berubah: {old} -> {new}")
+        else:
+            print("[OK] Login. JSESSIONID tetap sama.")
+        return new
+
+    def ensure(self, session: requests.Session) -> str:
+        now = time.time()
+        if self.jsession is None or self.mode == "login":
+            return self._login(session, old_still_valid=False)
+        if self.mode != "keepalive":
+            if now - self.birth > SESSION_MAX_AGE_SECONDS:
+                return self._login(session, old_still_valid=False)
+            return self.jsession
+
+        if now - self.last_ok >= JSESSION_PROBE_INTERVAL:
+            try:
+                valid = probe_jsession(session, self.jsession)
+            except Exception as e:
+                # server tidak terjangkau != session expired; pakai jsession lama dulu
+                print(f"[WARN] Probe jsession gagal: {e}")
+                return self.jsession
+            if not valid:
+                if self.last_ok > self.birth:
+                    # expired antara probe sukses terakhir & sekarang
+                    observed = self.last_ok - self.birth
+                    self.lifetime = observed if self.lifetime is None else min(self.lifetime, observed)
+                    print(f"[INFO] jsession expired setelah ~{observed / 60:.0f} menit.")
+                return self._login(session, old_still_valid=False)
+            self.last_ok = now
+
+        rotate_age = self._rotate_age()
+        if rotate_age and now - self.birth > rotate_age:
+            print(f"[INFO] Rotasi jsession proaktif (umur {(now - self.birth) / 60:.0f} menit).")
+            return self._login(session, old_still_valid=True)
+        return self.jsession
+
+    def staggering(self) -> bool:
+        """True selama URL dengan jsession lama masih jalan -> kirim URL baru bergelombang."""
+        return time.time() < self.old_valid_until
+
+    def wave_size(self, pending: int) -> int:
+        """Minimal ROTATION_WAVE_SIZE, tapi cukup besar supaya semua selesai sebelum jsession lama habis."""
+        scans_left = max(1, int((self.old_valid_until - time.time()) // RESCAN_INTERVAL_SECONDS) - 1)
+        return max(ROTATION_WAVE_SIZE, -(-pending // scans_left))
+
 # ===================== POSTER =====================
-def _post_once(session: requests.Session, url: str, payload: dict, timeout: float) -> tuple[bool, str, int]:
+class AdaptiveBatch:
+    """Ukuran batch set_urls ala AIMD, dari latency & hasil POST ke ENDPOINT_URL."""
+
+    def __init__(self, start: int, max_size: int, target_latency: float):
+        self.size = max(1, start)
+        self.max_size = max(self.size, max_size)
+        self.target_latency = target_latency
+        self.backpressure = False  # POST terakhir gagal/lambat -> beri jeda sebelum batch berikutnya
+
+    def observe(self, ok: bool, latency: float, n: int):
+        self.backpressure = not ok or latency > self.target_latency
+        if not ADAPTIVE_BATCH:
+            return
+        if self.backpressure:
+            self.size = max(1, self.size // 2)
+        elif n >= self.size:
+            # hanya batch penuh yang membuktikan endpoint sanggup lebih
+            self.size = min(self.max_size, self.size + 1)
+
+class KeepAlive:
+    """
+    Keep-alive ke ENDPOINT_URL (POST_KEEPALIVE). Mode auto: satu reset koneksi
+    (endpoint restart, socket pool basi) hanya memicu retry di koneksi baru; baru
+    setelah `max_resets` reset beruntun pindah ke Connection: close, lalu keep-alive
+    dicoba lagi setelah `cooldown` detik.
+    """
+
+    def __init__(self, mode: str, max_resets: int, cooldown: float):
+        self.mode = mode
+        self.max_resets = max(1, max_resets)
+        self.cooldown = cooldown
+        self.resets = 0           # reset koneksi reuse beruntun
+        self.off_until = 0.0      # monotonic; > 0 = sedang Connection: close
+
+    def enabled(self) -> bool:
+        if self.mode != "auto":
+            return self.mode != "false"
+        if self.off_until and time.monotonic() >= self.off_until:
+            print("[INFO] Cooldown selesai; coba keep-alive lagi.")
+            self.off_until, self.resets = 0.0, 0
+        return not self.off_until
+
+    def ok(self):
+        self.resets = 0
+
+    def reset(self, err: Exception):
+        self.resets += 1
+        if self.mode == "auto" and self.resets >= self.max_resets and not self.off_until:
+            print(
+                f"[INFO] Koneksi keep-alive diputus {self.resets}x berturut-turut ({err}); "
+                f"pakai Connection: close selama {self.cooldown:.0f}s."
+            )
+            self.off_until = time.monotonic() + self.cooldown
+
+BATCH = AdaptiveBatch(CLIENT_BATCH_SIZE, CLIENT_BATCH_MAX, POST_TARGET_LATENCY)
+KEEPALIVE = KeepAlive(POST_KEEPALIVE, POST_KEEPALIVE_MAX_RESETS, POST_KEEPALIVE_COOLDOWN)
+
+def _post_once(
+    session: requests.Session, url: str, payload: dict, timeout: float, fresh: bool = False,
+) -> tuple[bool, str, int]:
+    keepalive = KEEPALIVE.enabled()
+    headers = {
+        "Content-Type": "application/json",
+        "Connection": "keep-alive" if keepalive else "close",
+        "Accept": "*/*",
+    }
     try:
-        headers = {
-            "Content-Type": "application/json",
-            "Connection": "close",
-            "Accept": "*/*",
-        }
         r = session.post(url, json=payload, timeout=timeout, headers=headers)
-        ok = 200 <= r.status_code < 300
-        body = (r.text or "")[:1000]
-        return ok, body, r.status_code
+    except requests.ConnectionError as e:
+        if not keepalive or fresh:
+            return False, f"EXC:{e}", -1
+        # urllib3 tidak retry POST: buang pool (socket basi) lalu ulangi sekali di koneksi baru
+        KEEPALIVE.reset(e)
+        session.close()
+        return _post_once(session, url, payload, timeout, fresh=True)
     except Exception as e:
         return False, f"EXC:{e}", -1
+    if keepalive and not fresh:
+        # koneksi reuse bertahan -> hitungan reset beruntun mulai dari nol
+        KEEPALIVE.ok()
+    ok = 200 <= r.status_code < 300
+    body = (r.text or "")[:1000]
+    return ok, body, r.status_code
+
+def _post_timed(session: requests.Session, items: List[dict], observe: bool = True) -> tuple[bool, str, int]:
+    t0 = time.monotonic()
+    ok, body, code = _post_once(session, ENDPOINT_URL, {"set_urls": items}, POST_TIMEOUT)
+    if observe:
+        BATCH.observe(ok, time.monotonic() - t0, len(items))
+    return ok, body, code
+
+def _splittable(code: int, n: int) -> bool:
+    return (400 <= code < 600 or code == -1) and n > 1 and MAX_FALLBACK_SPLIT >= 1
+
+def _rejected(code: int, n: int) -> bool:
+    """Item tunggal ditolak karena isinya (4xx selain timeout / rate limit): percuma diulang."""
+    return n == 1 and 400 <= code < 500 and code not in (408, 429)
+
+def _dead_letter(items: List[dict], code: int, body: str):
+    try:
+        with open(DEAD_LETTER_PATH, "a", encoding="utf-8") as f:
+            for it in items:
+                rec = {"ts": int(time.time()), "name": it["name"], "url": it["url"], "status": code, "body": body}
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    except Exception as e:
+        print(f"[WARN] Gagal tulis dead letter: {e}")
+    names = ", ".join(str(it.get("name")) for it in items)
+    print(f"  [DEAD] {names} status={code} -> {DEAD_LETTER_PATH}")
 
-def post_set_urls(session: requests.Session, items: List[dict]) -> Tuple[bool, List[dict]]:
+def _post_bisect(session: requests.Session, items: List[dict]) -> Tuple[List[dict], List[dict]]:
+    """
+    Batch gagal dibelah dua terus sampai item bermasalah terisolasi.
+    Return (item sukses, item ditolak 4xx yang sudah masuk dead letter).
     """
-    Kirim batch kecil; kalau gagal 5xx/EXC, fallback per-item.
+    mid = len(items) // 2
+    succeeded, rejected = [], []
+    for half in (items[:mid], items[mid:]):
+        # gagal di sini karena isi item, bukan beban endpoint -> tidak mengubah ukuran batch
+        ok, body, code = _post_timed(session, half, observe=False)
+        if ok:
+            print(f"  [OK] set_urls={len(half)} status={code}")
+            succeeded += half
+        elif _splittable(code, len(half)):
+            ok_part, bad_part = _post_bisect(session, half)
+            succeeded += ok_part
+            rejected += bad_part
+        elif _rejected(code, len(half)):
+            _dead_letter(half, code, body)
+            rejected += half
+        else:
+            names = ", ".join(str(it.get("name")) for it in half)
+            print(f"  [ERR] {names} status={code} body={body!r}")
+    return succeeded, rejected
+
+def post_set_urls(session: requests.Session, items: List[dict]) -> Tuple[bool, List[dict], List[dict]]:
+    """
+    Kirim satu batch; kalau gagal 4xx/5xx/EXC, batch dibelah dua (bisection) untuk
+    mengisolasi URL bermasalah: ~2*log2(n) POST, bukan n. Item tunggal yang ditolak
+    4xx masuk dead letter. Latency & hasil setiap POST masuk ke BATCH (ukuran batch
+    berikutnya).
     RETURN:
       - all_ok: bool
       - succeeded_items: list[dict] yang sukses terkirim (untuk update cache presisi)
+      - rejected_items: list[dict] yang ditolak permanen (jangan dikirim ulang)
     """
     if DRY_RUN:
         print(f"[DRY] Akan POST {len(items)} item ke {ENDPOINT_URL}")
-        return True, list(items)
+        return True, list(items), []
 
-    payload = {"set_urls": items}
     attempt = 0
     backoff = INITIAL_BACKOFF
 
     while True:
         attempt += 1
-        ok, body, code = _post_once(session, ENDPOINT_URL, payload, POST_TIMEOUT)
+        ok, body, code = _post_timed(session, items)
         if ok:
             print(f"[OK] POST set_urls={len(items)} status={code}")
-            return True, list(items)
+            return True, list(items), []
 
         print(f"[ERR] POST batch size={len(items)} status={code} body={body!r}")
 
-        # Fallback: 5xx/EXC dan batch > 1 → kirim per-item
-        if (500 <= code < 600 or code == -1) and len(items) > 1 and MAX_FALLBACK_SPLIT >= 1:
-            print("[INFO] Fallback: kirim per-item untuk isolasi URL bermasalah...")
-            succeeded = []
-            for it in items:
-                ok1, body1, code1 = _post_once(session, ENDPOINT_URL, {"set_urls": [it]}, POST_TIMEOUT)
-                if ok1:
-                    print(f"  [OK] {it.get('name')} status={code1}")
-                    succeeded.append(it)
-                else:
-                    print(f"  [ERR] {it.get('name')} status={code1} body={body1!r}")
-                _sleep_with_jitter(0.25)
-            return (len(succeeded) == len(items)), succeeded
+        # 4xx/5xx/EXC dan batch > 1 -> bisection
+        if _splittable(code, len(items)):
+            print("[INFO] Bisection batch untuk isolasi URL bermasalah...")
+            succeeded, rejected = _post_bisect(session, items)
+            return (len(succeeded) == len(items)), succeeded, rejected
+
+        if _rejected(code, len(items)):
+            _dead_letter(items, code, body)
+            return False, [], list(items)
 
         if attempt > POST_MAX_RETRY:
             print("[ERR] Gagal POST setelah retry.")
-            return False, []
+            return False, [], []
 
         print(f"[INFO] Retry dalam {min(backoff, BACKOFF_CAP):.1f}s ...")
         _sleep_with_jitter(min(backoff, BACKOFF_CAP))
         backoff *= 2.0
 
 # ===================== SNAPSHOT & DIFF =====================
+def _online_devices_safe(session: requests.Session, jsession: str, key: str) -> List[str]:
+    try:
+        return get_online_devices(session, jsession, key)
+    except Exception as e:
+        print(f"[WARN] Gagal ambil device '{key}': {e}")
+        return []
+
 def collect_snapshot(session: requests.Session, jsession: str) -> List[dict]:
-    """Kembalikan list item {name,url} untuk SEMUA device online saat ini."""
-    items = []
-    for key, cam_list in CAMERA_MAP.items():
-        try:
-            online_devs = get_online_devices(session, jsession, key)
-        except Exception as e:
-            print(f"[WARN] Gagal ambil device '{key}': {e}")
-            online_devs = []
+    """
+    Kembalikan list item {name,url} untuk SEMUA device online saat ini.
+    Key yang strategi lookup-nya sudah dikenal (dev/vehi) ditanya lewat getDeviceOlStatus bulk;
+    sisanya per key paralel (SNAPSHOT_WORKERS thread, satu Session bersama).
+    Urutan hasil tetap mengikuti CAMERA_MAP.
+    """
+    t0 = time.monotonic()
+    keys = list(CAMERA_MAP)
+    resolved: Dict[str, List[str]] = {}
+    if BULK_STATUS:
+        # key dengan strategi dev/vehi yang sudah dikenal -> satu request per kelompok
+        for by in ("dev", "vehi"):
+            group = [k for k in keys if _known_strategy(k) == by]
+            if not group:
+                continue
+            try:
+                found = query_online_bulk(session, jsession, group, by=by)
+            except Exception as e:
+                print(f"[WARN] Bulk status ({by}, {len(group)} key) gagal: {e}. Fallback per key.")
+                continue
+            for k, dids in found.items():
+                if dids:
+                    _remember_strategy(k, by)
+            resolved.update(found)
+
+    rest = [k for k in keys if k not in resolved]
+    workers = min(SNAPSHOT_WORKERS, len(rest))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="snapshot") as ex:
+            resolved.update(zip(rest, ex.map(lambda k: _online_devices_safe(session, jsession, k), rest)))
+    else:
+        resolved.update((k, _online_devices_safe(session, jsession, k)) for k in rest)
+    _flush_lookup_index()
+    print(
+        f"[INFO] Snapshot {len(keys)} key dalam {time.monotonic() - t0:.1f}s "
+        f"(bulk={len(keys) - len(rest)}, per-key={len(rest)}, workers={max(workers, 1)})"
+    )
 
+    items = []
+    for key in keys:
+        online_devs = resolved.get(key)
         if not online_devs:
             continue
-
+        cam_list = CAMERA_MAP[key]
         for did in online_devs:
             for cam_name, ch in cam_list:
                 url = build_rtsp(jsession, devidno=did, channel=ch, stream=DEFAULT_STREAM)
@@ -276,6 +692,229 @@ def diff_delta(snapshot: List[dict], cache: dict) -> List[dict]:
             delta.append(it)
     return delta
 
+_JSESSION_RE = re.compile(r"jsession=[^&]*")
+
+def split_rotation(delta: List[dict], cache: dict) -> Tuple[List[dict], List[dict]]:
+    """Pisahkan delta: (berubah sungguhan, hanya jsession yang berbeda)."""
+    real, rotated = [], []
+    for it in delta:
+        old = cache.get(it["name"])
+        same = old is not None and _JSESSION_RE.sub("", old) == _JSESSION_RE.sub("", it["url"])
+        (rotated if same else real).append(it)
+    return real, rotated
+
+# ===================== OUTBOX =====================
+class Outbox:
+    """
+    Antrean set_urls yang tahan restart, di antara producer (scan) dan sender (POST).
+
+    File JSONL append-only: {"put": {name,url}} saat delta masuk, {"ack": {name,url}}
+    saat terkirim, {"drop": {name,url}} saat ditolak permanen (dead letter; URL yang
+    sama tidak di-put ulang, URL baru untuk name itu tetap dikirim). Isi pending = put terakhir per name yang belum di-ack; put baru untuk
+    name yang sama menggantikan URL lama. fsync sekali per put() (satu delta scan);
+    ack hanya di-flush dan ikut ter-fsync di put/compact berikutnya. Ack yang hilang
+    saat crash cuma membuat item dikirim ulang sekali (set_urls idempoten).
+    `sent` = cache {name:url} yang sudah terkirim (last_sent.json, format lama).
+    """
+
+    def __init__(self, path: str, sent: dict):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.sent = sent
+        self.pending: Dict[str, str] = {}
+        self.rejected: Dict[str, str] = {}  # name -> url yang ditolak permanen
+        self._cv = Condition()
+        self.puts = 0  # naik tiap put() yang menambah item (sender menunggu perubahan ini)
+        self._lines = 0
+        self._unsynced = False
+        self._replay()
+        self._fh = open(self.path, "a", encoding="utf-8")
+        self._compact_if_needed(force=True)
+
+    def _replay(self):
+        try:
+            raw = self.path.read_text("utf-8").splitlines()
+        except FileNotFoundError:
+            return
+        for line in raw:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # baris terakhir terpotong saat crash
+            if "put" in rec:
+                self.pending[rec["put"]["name"]] = rec["put"]["url"]
+            elif "ack" in rec:
+                nm, url = rec["ack"]["name"], rec["ack"]["url"]
+                if self.pending.get(nm) == url:
+                    del self.pending[nm]
+                self.sent[nm] = url
+                self.rejected.pop(nm, None)
+            elif "drop" in rec:
+                nm, url = rec["drop"]["name"], rec["drop"]["url"]
+                if self.pending.get(nm) == url:
+                    del self.pending[nm]
+                self.rejected[nm] = url
+        if self.pending:
+            print(f"[BOOT] Outbox: {len(self.pending)} item belum terkirim dari run sebelumnya.")
+
+    def _append(self, kind: str, items: List[dict], sync: bool):
+        for it in items:
+            self._fh.write(json.dumps({kind: {"name": it["name"], "url": it["url"]}}, ensure_ascii=False) + "\n")
+        self._fh.flush()
+        self._lines += len(items)
+        if sync:
+            os.fsync(self._fh.fileno())
+            self._unsynced = False
+        else:
+            self._unsynced = True
+
+    def _compact_if_needed(self, force: bool = False):
+        if not force and self._lines <= max(OUTBOX_COMPACT_LINES, 4 * (len(self.pending) + len(self.rejected))):
+            return
+        # ack akan hilang dari file -> simpan dulu hasilnya ke last_sent.json
+        _save_cache(self.sent)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for nm, url in self.rejected.items():
+                f.write(json.dumps({"drop": {"name": nm, "url": url}}, ensure_ascii=False) + "\n")
+            for nm, url in self.pending.items():
+                f.write(json.dumps({"put": {"name": nm, "url": url}}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._fh.close()
+        tmp.replace(self.path)
+        self._fh = open(self.path, "a", encoding="utf-8")
+        self._lines = len(self.rejected) + len(self.pending)
+        self._unsynced = False
+
+    def view(self) -> dict:
+        """{name:url} yang sudah terkirim, ditolak, ATAU sedang antre (basis diff producer)."""
+        with self._cv:
+            return {**self.sent, **self.rejected, **self.pending}
+
+    def _last(self, name: str) -> Optional[str]:
+        if name in self.pending:
+            return self.pending[name]
+        return self.rejected.get(name, self.sent.get(name))
+
+    def put(self, items: List[dict]) -> int:
+        with self._cv:
+            items = [it for it in items if self._last(it["name"]) != it["url"]]
+            if items:
+                self._append("put", items, sync=True)
+                for it in items:
+                    self.pending[it["name"]] = it["url"]
+                self.puts += 1
+                self._cv.notify_all()
+            return len(items)
+
+    def take(self, limit: int) -> List[dict]:
+        with self._cv:
+            return [{"name": nm, "url": url} for nm, url in list(self.pending.items())[:limit]]
+
+    def ack(self, items: List[dict]):
+        with self._cv:
+            # hanya URL yang sama: put lebih baru untuk name ini tetap pending
+            items = [it for it in items if self.pending.get(it["name"]) == it["url"]]
+            if not items:
+                return
+            self._append("ack", items, sync=False)
+            for it in items:
+                del self.pending[it["name"]]
+                self.sent[it["name"]] = it["url"]
+                self.rejected.pop(it["name"], None)
+            self._compact_if_needed()
+
+    def drop(self, items: List[dict]):
+        """Item ditolak permanen (sudah di dead letter): keluarkan dari antrean."""
+        with self._cv:
+            items = [it for it in items if self.pending.get(it["name"]) == it["url"]]
+            if not items:
+                return
+            self._append("drop", items, sync=False)
+            for it in items:
+                del self.pending[it["name"]]
+                self.rejected[it["name"]] = it["url"]
+            self._compact_if_needed()
+
+    def wait(self, since: int, timeout: float) -> bool:
+        """Tunggu put() baru sejak `since` (nilai `puts` sebelumnya); True jika ada."""
+        with self._cv:
+            if self.puts == since:
+                self._cv.wait(timeout)
+            return self.puts != since
+
+    def view_sent(self) -> dict:
+        with self._cv:
+            return dict(self.sent)
+
+    def sync(self):
+        with self._cv:
+            if self._unsynced:
+                os.fsync(self._fh.fileno())
+                self._unsynced = False
+
+    def __len__(self):
+        return len(self.pending)
+
+def sender_loop(outbox: Outbox, stop: Event):
+    """
+    Stage sender: kuras outbox per BATCH.size (adaptif) dengan retry/backoff sendiri.
+    Gagal kirim tidak memicu rescan; item tetap di outbox sampai terkirim.
+    Backoff per item (name+url) 2x sampai SEND_BACKOFF_MAX; item lain & put()
+    baru tetap dikirim tanpa menunggu. Jeda SLEEP_BETWEEN_BATCH hanya saat
+    endpoint gagal/lambat.
+    """
+    retry: Dict[str, Tuple[str, float, float]] = {}  # name -> (url gagal, boleh coba lagi, backoff)
+    with make_session() as s:
+        while not stop.is_set():
+            seen, now = outbox.puts, time.monotonic()
+            todo, due = [], None
+            pending = outbox.take(len(outbox))
+            retry = {it["name"]: retry[it["name"]] for it in pending if it["name"] in retry}
+            for it in pending:
+                r = retry.get(it["name"])
+                if r and r[0] == it["url"] and r[1] > now:
+                    due = r[1] if due is None else min(due, r[1])
+                else:
+                    todo.append(it)
+            if not todo:
+                # idle / semua item sedang backoff: bangun saat put() baru atau backoff jatuh tempo
+                outbox.sync()
+                outbox.wait(seen, timeout=1.0 if due is None else min(1.0, due - now))
+                continue
+
+            sent_round, failed, t0 = 0, [], time.monotonic()
+            while todo and not stop.is_set():
+                batch, todo = todo[:BATCH.size], todo[BATCH.size:]
+                _, succeeded, rejected = post_set_urls(s, batch)
+                if rejected:
+                    outbox.drop(rejected)
+                if succeeded:
+                    outbox.ack(succeeded)
+                    sent_round += len(succeeded)
+                    for it in succeeded:
+                        retry.pop(it["name"], None)
+                ok_names = {it["name"] for it in succeeded + rejected}
+                failed += [it for it in batch if it["name"] not in ok_names]
+                if BATCH.backpressure and todo:
+                    _sleep_with_jitter(SLEEP_BETWEEN_BATCH)
+
+            now = time.monotonic()
+            for it in failed:
+                r = retry.get(it["name"])
+                backoff = min(r[2] * 2.0, SEND_BACKOFF_MAX) if r and r[0] == it["url"] else INITIAL_BACKOFF
+                retry[it["name"]] = (it["url"], now + backoff, backoff)
+            if sent_round:
+                _save_cache(outbox.view_sent())
+                print(
+                    f"[OK] Sender: {sent_round} item terkirim dalam {now - t0:.1f}s, "
+                    f"sisa outbox {len(outbox)}, batch={BATCH.size}."
+                )
+            if failed:
+                wait = max(retry[it["name"]][2] for it in failed)
+                print(f"[WARN] Sender: {len(failed)} item gagal, dicoba lagi per item (backoff s/d {wait:.1f}s).")
+
 # ===================== LOOP MODE =====================
 def loop_resilient():
     ensure_env()
@@ -283,31 +922,25 @@ def loop_resilient():
         print(f"[BOOT] Grace period {STARTUP_GRACE_SECONDS}s …")
         time.sleep(STARTUP_GRACE_SECONDS)
 
-    cache = _load_cache()
+    outbox = Outbox(OUTBOX_PATH, _load_cache())
+    stop = Event()
+    sender = Thread(target=sender_loop, args=(outbox, stop), name="sender", daemon=True)
+    sender.start()
+    try:
+        _scan_loop(outbox)
+    finally:
+        stop.set()
+        sender.join(timeout=POST_TIMEOUT + 5)
+        outbox.sync()
+
+def _scan_loop(outbox: Outbox):
+    """Stage producer: login -> snapshot -> delta ke outbox, tiap RESCAN_INTERVAL_SECONDS."""
+    js = JSessionManager()
     with make_session() as s:
-        jsession = None
-        js_birth = datetime.min
-
         while True:
-            # 1) Login
+            # 1) Login / validasi jsession (SESSION_MODE)
             try:
-                if ALWAYS_LOGIN_EACH_LOOP:
-                    new_js = login(s)
-                    if jsession is None:
-                        print(f"[OK] Login (loop). JSESSIONID={new_js}")
-                    elif new_js != jsession:
-                        print(f"[OK] Login (loop). JSESSIONID berubah: {jsession} -> {new_js}")
-                    else:
-                        print("[OK] Login (loop). JSESSIONID tetap sama.")
-                    jsession = new_js
-                    js_birth = datetime.utcnow()
-                else:
-                    need_login = (jsession is None) or \
-                                 ((datetime.utcnow() - js_birth).total_seconds() > SESSION_MAX_AGE_SECONDS)
-                    if need_login:
-                        jsession = login(s)
-                        js_birth = datetime.utcnow()
-                        print(f"[OK] Login. JSESSIONID={jsession}")
+                jsession = js.ensure(s)
             except Exception as e:
                 print(f"[ERR] Login gagal: {e}. Coba lagi {RESCAN_INTERVAL_SECONDS}s.")
                 time.sleep(RESCAN_INTERVAL_SECONDS)
@@ -326,28 +959,21 @@ def loop_resilient():
                 time.sleep(RESCAN_INTERVAL_SECONDS)
                 continue
 
-            # 3) Delta vs cache
-            delta = diff_delta(snap, cache)
+            # 3) Delta vs (terkirim + antre) -> outbox; dikirim thread sender
+            view = outbox.view()
+            delta = diff_delta(snap, view)
+            if delta and js.staggering():
+                # rotasi proaktif: URL lama masih jalan, kirim yang hanya beda jsession per gelombang
+                real, rotated = split_rotation(delta, view)
+                wave = js.wave_size(len(rotated))
+                delta = real + rotated[:wave]
+                if len(rotated) > wave:
+                    print(f"[INFO] Rotasi jsession: {len(rotated) - wave} URL menunggu gelombang berikutnya.")
             if not delta:
-                print("[INFO] Tidak ada perubahan URL/name. Skip kirim.")
-                time.sleep(RESCAN_INTERVAL_SECONDS)
-                continue
-
-            # 4) Kirim delta PER 3 item (tetap batch=3)
-            sent = 0
-            for batch in chunked(delta, CLIENT_BATCH_SIZE):
-                all_ok, succeeded = post_set_urls(s, batch)
-                if succeeded:
-                    for it in succeeded:
-                        cache[it["name"]] = it["url"]  # update cache utk yang sukses
-                    sent += len(succeeded)
-                _sleep_with_jitter(SLEEP_BETWEEN_BATCH)
-
-            if sent > 0:
-                _save_cache(cache)
-                print(f"[OK] Delta terkirim: {sent}/{len(delta)} & cache updated.")
+                print(f"[INFO] Tidak ada perubahan URL/name. Outbox: {len(outbox)} item.")
             else:
-                print(f"[WARN] Tidak ada item delta yang sukses terkirim kali ini.")
+                queued = outbox.put(delta)
+                print(f"[OK] Delta {queued} item masuk outbox (total antre {len(outbox)}).")
 
             time.sleep(RESCAN_INTERVAL_SECONDS)
 
@@ -0,0 +1,216 @@
+# core/actions/grid.py
+"""
+Grid "apply state": baca kondisi grid sekali, hitung langkah minimum menuju
+layout + peta cell->source yang diminta, lalu jalankan hanya langkah itu.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+from playwright.sync_api import Error, Page
+
+from .. import tracing
+from ..utils import wait_for_dom
+
+from .layouts import JS_GRID_HAS_CELLS, LAYOUT_LABELS, select_layout
+from .sources import GRID_CELL_VISIBLE_SEL, JS_VISIBLE_CELLS, SOURCE_ITEM_SEL, assign_source_to_grid
+
+# Satu round-trip: label layout di dropdown + isi tiap cell yang terlihat
+# (penomoran sama dengan locator GRID_CELL_VISIBLE_SEL yang dipakai untuk klik).
+_READ_GRID_JS = f"""
+() => {{
+  const input = document.querySelector('.layout-setting-box .el-select .el-input__inner');
+  const visible = {JS_VISIBLE_CELLS};
+  return {{
+    layout_label: input ? (input.value || '').trim() : '',
+    active: visible.findIndex((c) => c.classList.contains('active-item')) + 1,
+    cells: visible.map((c) => ({{
+      titles: Array.from(c.querySelectorAll('[title]'))
+        .map((e) => (e.getAttribute('title') || '').trim()).filter(Boolean),
+      lines: (c.innerText || '').split('\\n').map((l) => l.trim()).filter(Boolean),
+    }})),
+  }};
+}}
+"""
+
+_CELLS_BY_LABEL = {label.lower(): cells for cells, label in LAYOUT_LABELS.items()}
+
+
+def read_grid_state(page: Page) -> dict:
+    """
+    Return:
+      {
+        "layout_cells": 4,          # dari label dropdown, fallback jumlah cell terlihat
+        "layout_label": "2x2",
+        "active": 1,                # cell aktif (1-based), 0 jika tidak ada
+        "cells": [{"titles": [...], "lines": [...]}, ...],
+      }
+    """
+    raw = page.evaluate(_READ_GRID_JS)
+    raw["layout_cells"] = _CELLS_BY_LABEL.get(raw["layout_label"].lower(), len(raw["cells"]))
+    return raw
+
+
+def cell_shows_source(cell: dict, name: str) -> bool:
+    return name in cell["titles"] or name in cell["lines"]
+
+
+def plan_grid_state(current: dict, layout_cells: Optional[int], assigns: Dict[int, str]) -> List[dict]:
+    """
+    Langkah minimum dari `current` (hasil read_grid_state) ke kondisi yang diminta.
+    Ganti layout mengosongkan grid, jadi setelahnya semua cell di-assign ulang.
+    """
+    target_cells = layout_cells or current["layout_cells"]
+    bad = [g for g in assigns if g < 1 or g > target_cells]
+    if bad:
+        raise ValueError(f"grid {sorted(bad)} di luar layout {target_cells} cell")
+
+    plan: List[dict] = []
+    layout_change = layout_cells is not None and layout_cells != current["layout_cells"]
+    if layout_change:
+        plan.append({"op": "select_layout", "cells": layout_cells})
+
+    for grid, name in sorted(assigns.items()):
+        cells = current["cells"]
+        if not layout_change and grid <= len(cells) and cell_shows_source(cells[grid - 1], name):
+            continue
+        plan.append({"op": "assign_source_to_grid", "grid": grid, "name": name})
+    return plan
+
+
+@tracing.traced("grid.apply_state")
+def apply_grid_state(
+    page: Page,
+    layout_cells: Optional[int],
+    assigns: Dict[int, str],
+    confirm: bool = True,
+    dry_run: bool = False,
+) -> dict:
+    current = read_grid_state(page)
+    plan = plan_grid_state(current, layout_cells, assigns)
+    tracing.annotate(steps=len(plan), dry_run=dry_run)
+    if not dry_run:
+        for step in plan:
+            if step["op"] == "select_layout":
+                select_layout(page, step["cells"], confirm=confirm)
+            else:
+                assign_source_to_grid(page, step["grid"], step["name"])
+    return {
+        "noop": not plan,
+        "dry_run": dry_run,
+        "before": {"layout_cells": current["layout_cells"], "layout_label": current["layout_label"]},
+        "plan": plan,
+    }
+
+
+# =========================
+# Assign bulk "pipelined" (eksperimental)
+# =========================
+# Semua pasangan [index 0-based, nama] sudah tampil di cell-nya (satu predikat wait_for_dom)
+_JS_CELLS_SHOW = f"""
+(pairs) => {{
+  const cells = {JS_VISIBLE_CELLS};
+  return pairs.every(([i, name]) => {{
+    const el = cells[i];
+    if (!el) return false;
+    const titles = Array.from(el.querySelectorAll('[title]')).map((e) => (e.getAttribute('title') || '').trim());
+    const lines = (el.innerText || '').split('\\n').map((l) => l.trim());
+    return titles.includes(name) || lines.includes(name);
+  }});
+}}
+"""
+
+
+def _open_helper_pages(page: Page, count: int, cells: int) -> List[Page]:
+    """
+    `count` page baru di context yang sama (sesi login ikut), grid-nya sama dengan `page`.
+    Pemanggil wajib menutupnya (lihat assign_grid_pipelined).
+    """
+    out: List[Page] = []
+    try:
+        for _ in range(count):
+            hp = page.context.new_page()
+            out.append(hp)
+            hp.goto(page.url, wait_until="domcontentloaded")
+            if wait_for_dom(hp, {"grid": JS_GRID_HAS_CELLS}, arg=cells, timeout_ms=10_000) is None:
+                raise RuntimeError(f"page bantu tidak menampilkan grid {cells} cell")
+    except Exception:
+        _close_pages(out)
+        raise
+    return out
+
+
+def _close_pages(pages: List[Page]) -> None:
+    for hp in pages:
+        try:
+            hp.close()
+        except Error:
+            pass
+
+
+def _fire_assign(page: Page, grid: int, name: str) -> None:
+    """Klik cell lalu double-click source tanpa menunggu UI; urutan event dalam satu page terjaga."""
+    page.locator(GRID_CELL_VISIBLE_SEL).nth(grid - 1).click(timeout=5_000)
+    page.locator(SOURCE_ITEM_SEL).filter(has_text=name).first.dblclick(timeout=5_000)
+
+
+def _mismatched(page: Page, assigns: Dict[int, str]) -> List[int]:
+    cells = read_grid_state(page)["cells"]
+    return [g for g, name in sorted(assigns.items()) if g > len(cells) or not cell_shows_source(cells[g - 1], name)]
+
+
+@tracing.traced("grid.assign_pipelined")
+def assign_grid_pipelined(page: Page, assigns: Dict[int, str], pages: int = 1, timeout_ms: int = 10_000) -> dict:
+    """
+    Assign banyak cell tanpa menunggu konfirmasi per cell:
+      pages=1 : klik cell + double-click source beruntun di page utama, lalu tunggu sekali
+      pages>1 : pasangan dibagi round-robin ke page utama + page bantu di context yang sama
+
+    Hasil akhir diverifikasi lewat read_grid_state di page yang meng-assign (page
+    utama tidak di-reload: state SPA & watcher-nya dipakai job lain); cell yang
+    tidak cocok diulang sekali secara sekuensial di page yang sama, masih beda ->
+    RuntimeError. Page bantu selalu ditutup di akhir.
+    """
+    items = sorted(assigns.items())
+    if not items:
+        return {"pages": 0, "retried": []}
+    cells = len(read_grid_state(page)["cells"])
+    bad = [g for g, _ in items if g < 1 or g > cells]
+    if bad:
+        raise ValueError(f"grid {bad} di luar layout {cells} cell")
+
+    helpers = _open_helper_pages(page, min(pages, len(items)) - 1, cells) if pages > 1 else []
+    try:
+        workers = [page] + helpers
+        tracing.annotate(cells=len(items), pages=len(workers))
+        share: List[List[tuple]] = [items[i::len(workers)] for i in range(len(workers))]
+
+        # 1) tembak semua event; tiap page memproses klik-nya berurutan
+        for round_ in range(max(len(s) for s in share)):
+            for wp, pairs in zip(workers, share):
+                if round_ < len(pairs):
+                    _fire_assign(wp, *pairs[round_])
+
+        # 2) tunggu tiap page menampilkan bagiannya sendiri
+        for n, (wp, pairs) in enumerate(zip(workers, share)):
+            arg = [[g - 1, name] for g, name in pairs]
+            if pairs and wait_for_dom(wp, {"shown": _JS_CELLS_SHOW}, arg=arg, timeout_ms=timeout_ms) is None:
+                print(f"[WARN] sebagian cell belum tampil setelah {timeout_ms} ms (page {n})")
+
+        # 3) verifikasi + ulang sekuensial untuk yang meleset, di page yang meng-assign
+        retried: List[int] = []
+        left: List[int] = []
+        for wp, pairs in zip(workers, share):
+            part = dict(pairs)
+            miss = _mismatched(wp, part)
+            for g in miss:
+                assign_source_to_grid(wp, g, part[g])
+            retried += miss
+            left += _mismatched(wp, part) if miss else []
+    finally:
+        _close_pages(helpers)
+
+    tracing.annotate(retried=len(retried), mismatched=len(left))
+    if left:
+        raise RuntimeError(f"grid {sorted(left)} tidak sesuai peta yang diminta setelah retry")
+    return {"pages": len(workers), "retried": sorted(retried)}
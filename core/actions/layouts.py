@@ -1,7 +1,13 @@
 # core/actions/layouts.py
 from __future__ import annotations
+
+import json
+
 from playwright.sync_api import Page, Error
 
+from .. import tracing
+from ..utils import wait_for_dom
+
 # --- Selectors yang stabil dari DOM yang kamu kirim ---
 SEL_LAYOUT_SELECT = ".layout-setting-box .el-select"                  # tombol dropdown
 SEL_LAYOUT_DROPDOWN = ".layout-tool-select"                           # container dropdown
@@ -15,42 +21,83 @@ SEL_MODAL_CANCEL = f"{SEL_MODAL_WRAPPER} .el-button--default"         # tombol C
 # Grid item (untuk nunggu perubahan layout selesai)
 SEL_GRID_ITEM = ".layout-grid-content .grid-list-item"
 
+# Predikat JS untuk wait_for_dom: modal layout shift terlihat / grid sudah
+# ter-render dengan jumlah cell terlihat == n.
+# "Terlihat" sama dengan `:visible` Playwright (kotak tidak kosong, visibility bukan hidden),
+# supaya enumerasi cell di JS dan di locator selalu sama.
+VISIBLE_JS = """(el) => {
+  if (!el) return false;
+  const r = el.getBoundingClientRect();
+  return r.width > 0 && r.height > 0 && getComputedStyle(el).visibility !== 'hidden';
+}"""
+JS_SHIFT_MODAL_VISIBLE = f"""
+() => Array.from(document.querySelectorAll({json.dumps(SEL_MODAL_WRAPPER)}))
+  .some((w) => ({VISIBLE_JS})(w) && (w.innerText || '').includes('Layout shift will lose unsaved data'))
+"""
+JS_GRID_HAS_CELLS = f"""
+(n) => Array.from(document.querySelectorAll({json.dumps(SEL_GRID_ITEM)})).filter({VISIBLE_JS}).length === n
+"""
+
+# modal layout shift muncul dalam ~1,5 s setelah klik opsi; lebih dari itu dianggap tidak ada
+SHIFT_MODAL_TIMEOUT_MS = 1500
 
-def _maybe_handle_layout_shift_modal(page: Page, confirm: bool = True, timeout_ms: int = 1500) -> None:
+# jumlah cell -> label opsi di dropdown layout
+LAYOUT_LABELS = {
+    1:  "Single",
+    2:  "PIP",
+    4:  "2x2",
+    9:  "3x3",
+    16: "4x4",
+}
+
+
+@tracing.traced("layout.shift_modal")
+def _maybe_handle_layout_shift_modal(
+    page: Page, confirm: bool = True, timeout_ms: int = SHIFT_MODAL_TIMEOUT_MS, cells: int | None = None,
+) -> str | None:
     """
     Jika popup muncul, klik OK (confirm=True) atau Cancel (confirm=False).
-    Jika tidak muncul, diabaikan.
+    Jika tidak muncul, diabaikan. Return "modal" jika popup muncul, "grid" jika
+    grid sudah ter-render `cells` cell lebih dulu, None jika tidak keduanya.
+
+    Dengan `cells`, tidak menunggu timeout penuh: balapan antara modal muncul
+    vs grid sudah ter-render `cells` cell (berarti modal tidak akan muncul).
     """
     try:
+        if cells is not None:
+            winner = wait_for_dom(
+                page, {"modal": JS_SHIFT_MODAL_VISIBLE, "grid": JS_GRID_HAS_CELLS}, arg=cells, timeout_ms=timeout_ms,
+            )
+            if winner != "modal":
+                tracing.annotate(appeared=False, race=winner or "timeout")
+                return winner
         modal = page.locator(SEL_MODAL_WRAPPER).filter(
             has_text="Layout shift will lose unsaved data"
         )
         modal.wait_for(state="visible", timeout=timeout_ms)
+        tracing.annotate(appeared=True, confirm=confirm)
         if confirm:
             page.locator(SEL_MODAL_OK).click()
         else:
             # biasanya tombol Cancel adalah .el-button--default pertama
             page.locator(SEL_MODAL_CANCEL).first.click()
+        return "modal"
     except Error:
         # tidak ada modal — aman
-        pass
+        tracing.annotate(appeared=False)
+        return None
 
 
+@tracing.traced("layout.select")
 def select_layout(page: Page, cells: int, confirm: bool = True, timeout_ms: int = 10_000) -> None:
     """
     Pilih layout berdasarkan jumlah cell: 1 (Single), 4 (2x2), 9 (3x3), 16 (4x4), ...
     Akan otomatis meng-OK popup layout-shift jika 'confirm=True'.
     """
-    label_map = {
-        1:  "Single",
-        2:  "PIP",   
-        4:  "2x2",
-        9:  "3x3",
-        16: "4x4",
-    }
-    label = label_map.get(cells)
+    label = LAYOUT_LABELS.get(cells)
     if label is None:
-        raise ValueError(f"cells '{cells}' tidak didukung. Pilihan: {sorted(label_map.keys())}")
+        raise ValueError(f"cells '{cells}' tidak didukung. Pilihan: {sorted(LAYOUT_LABELS.keys())}")
+    tracing.annotate(cells=cells, label=label)
 
     # Buka dropdown
     page.locator(SEL_LAYOUT_SELECT).click()
@@ -62,13 +109,20 @@ def select_layout(page: Page, cells: int, confirm: bool = True, timeout_ms: int
         raise RuntimeError(f"Layout '{label}' tidak ditemukan di dropdown")
     option.click()
 
-    # Tangani modal konfirmasi jika muncul
-    _maybe_handle_layout_shift_modal(page, confirm=confirm, timeout_ms=1500)
+    # Tangani modal konfirmasi jika muncul (selesai begitu modal muncul atau grid sudah berganti;
+    # balapan dibatasi SHIFT_MODAL_TIMEOUT_MS, bukan timeout penuh)
+    race = _maybe_handle_layout_shift_modal(
+        page, confirm=confirm, timeout_ms=min(timeout_ms, SHIFT_MODAL_TIMEOUT_MS), cells=cells,
+    )
+    if race == "modal" and not confirm:
+        return  # dibatalkan: layout lama tetap, tidak ada grid baru yang ditunggu
+    if race == "grid":
+        return  # grid sudah ter-render `cells` cell saat balapan
 
     # Tunggu grid terbentuk sesuai jumlah cell (best effort)
     try:
-        # pastikan minimal index ke-(cells-1) sudah ada/visible
-        page.locator(SEL_GRID_ITEM).nth(cells - 1).wait_for(state="visible", timeout=timeout_ms)
+        if wait_for_dom(page, {"grid": JS_GRID_HAS_CELLS}, arg=cells, timeout_ms=timeout_ms) is None:
+            print(f"[WARN] grid belum menampilkan {cells} cell setelah {timeout_ms} ms")
     except Error:
-        # kadang animasi cepat; jika gagal tunggu, tetap lanjut
+        # page sempat navigasi / re-render penuh; tetap lanjut
         pass
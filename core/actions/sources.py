@@ -1,13 +1,41 @@
 from __future__ import annotations
 
+import json
 import re
 import time
-from typing import List, Dict, Tuple, Optional
+from typing import Iterable, List, Dict, Tuple, Optional
 
 from playwright.sync_api import Page, Error
+
+from .. import tracing
+from ..utils import wait_for_dom
+from .layouts import VISIBLE_JS
 GRID_CELL_SEL = ".layout-grid-content .grid-list-item"
 SOURCE_ITEM_SEL = "div.discovery-list-item"
 
+# Satu aturan enumerasi cell: hanya cell terlihat. Cell tersembunyi (mis. sisa layout
+# lama sesaat setelah ganti layout) tidak ikut dihitung, baik di locator maupun di JS.
+GRID_CELL_VISIBLE_SEL = f"{GRID_CELL_SEL}:visible"
+JS_VISIBLE_CELLS = f"Array.from(document.querySelectorAll({json.dumps(GRID_CELL_SEL)})).filter({VISIBLE_JS})"
+
+# Predikat wait_for_dom (index cell 0-based, sama dengan urutan locator GRID_CELL_VISIBLE_SEL)
+JS_CELL_ACTIVE = f"""
+(i) => {{
+  const el = {JS_VISIBLE_CELLS}[i];
+  return !!el && el.classList.contains('active-item');
+}}
+"""
+# cocokkan nama seperti core.actions.grid.cell_shows_source: title atau baris teks
+JS_CELL_SHOWS = f"""
+({{i, name}}) => {{
+  const el = {JS_VISIBLE_CELLS}[i];
+  if (!el) return false;
+  const titles = Array.from(el.querySelectorAll('[title]')).map((e) => (e.getAttribute('title') || '').trim());
+  const lines = (el.innerText || '').split('\\n').map((l) => l.trim());
+  return titles.includes(name) || lines.includes(name);
+}}
+"""
+
 
 def _find_source_item(page: Page, name: str):
     item = page.locator("div.discovery-list-item").filter(has_text=name).first
@@ -19,7 +47,51 @@ def _find_source_item(page: Page, name: str):
     return item
 
 
-def list_sources(page: Page) -> List[Dict[str, str]]:
+# Ekstraksi semua item dalam satu round-trip (dipakai list_sources mode "js").
+# Aturannya sama persis dengan _list_sources_dom di bawah.
+EXTRACT_SOURCES_JS = """
+(items) => items.map((it) => {
+  const text = (el) => ((el.getAttribute('title') || el.innerText) || '').trim();
+  let name = '';
+  const cand = it.querySelector('img + span[title]');
+  if (cand) {
+    name = text(cand);
+  } else {
+    for (const sp of it.querySelectorAll('span[title]')) {
+      if (!sp.closest('.item-status-ip')) { name = text(sp); break; }
+    }
+  }
+  const urlEl = it.querySelector('.item-status-ip span.over-ellipsis');
+  const statusEl = it.querySelector('.display-flex.align-items-center span.ft-12');
+  return {
+    name: name,
+    status: statusEl ? statusEl.innerText.trim() : '',
+    url: urlEl ? urlEl.innerText.trim() : '',
+    stream_id: it.getAttribute('data-stream-id') || '',
+  };
+})
+"""
+
+
+@tracing.traced("sources.list")
+def list_sources(page: Page, mode: str = "js") -> List[Dict[str, str]]:
+    """
+    Daftar source di panel kanan: [{name, status, url, stream_id}, ...].
+
+    mode="js"  : satu `eval_on_selector_all` untuk semua item (default, cepat)
+    mode="dom" : jalan per item lewat locator (cara lama, ~6-10 round-trip per item)
+    """
+    if mode == "dom":
+        items = _list_sources_dom(page)
+    elif mode == "js":
+        items = page.eval_on_selector_all(SOURCE_ITEM_SEL, EXTRACT_SOURCES_JS)
+    else:
+        raise ValueError(f"mode list_sources tidak dikenal: {mode!r} (pilihan: 'js', 'dom')")
+    tracing.annotate(mode=mode, count=len(items))
+    return items
+
+
+def _list_sources_dom(page: Page) -> List[Dict[str, str]]:
     items = page.locator("div.discovery-list-item")
     count = items.count()
     result: List[Dict[str, str]] = []
@@ -64,17 +136,19 @@ def list_sources(page: Page) -> List[Dict[str, str]]:
 
 
 def _grid_cell_by_index(page: Page, grid_index_1based: int):
-    cells = page.locator(".layout-grid-content .grid-list-item")
+    cells = page.locator(GRID_CELL_VISIBLE_SEL)
     idx0 = grid_index_1based - 1
     return cells.nth(idx0)
 
 
+@tracing.traced("grid.activate")
 def activate_grid_cell(page: Page, grid_index_1based: int, timeout_ms: int = 5000):
     idx = grid_index_1based - 1
-    cells = page.locator(GRID_CELL_SEL)
+    cells = page.locator(GRID_CELL_VISIBLE_SEL)
+    tracing.annotate(grid=grid_index_1based, retries=0)
 
-    # 1) Pastikan sel ke-idx sudah ter-attach
-    cells.nth(idx).wait_for(state="attached", timeout=timeout_ms)
+    # 1) Pastikan sel terlihat ke-idx sudah ada
+    cells.nth(idx).wait_for(state="visible", timeout=timeout_ms)
     target = cells.nth(idx)
 
     # (opsional) scroll biar aman di headless
@@ -86,30 +160,19 @@ def activate_grid_cell(page: Page, grid_index_1based: int, timeout_ms: int = 500
     # 2) Klik sel
     target.click()
 
-    # 3) Tunggu sampai sel itu jadi "active-item" (pakai index, bukan handle)
-    def _wait_active(idx: int, timeout: int):
-        page.wait_for_function(
-            """
-            (i) => {
-              const nodes = document.querySelectorAll('.layout-grid-content .grid-list-item');
-              const el = nodes[i];
-              return !!el && el.classList && el.classList.contains('active-item');
-            }
-            """,
-            arg=idx,
-            timeout=timeout
-        )
-
-    try:
-        _wait_active(idx, 2000)
-    except Error:
+    # 3) Tunggu sampai sel itu jadi "active-item" (pakai index, bukan handle),
+    #    selesai begitu class berubah (MutationObserver), bukan polling/sleep
+    if wait_for_dom(page, {"active": JS_CELL_ACTIVE}, arg=idx, timeout_ms=2000) is None:
         # Retry sekali lagi (klik lagi, lalu tunggu lebih lama)
+        tracing.annotate(retries=1)
         target.click()
-        page.wait_for_timeout(150)
-        _wait_active(idx, 3000)
+        if wait_for_dom(page, {"active": JS_CELL_ACTIVE}, arg=idx, timeout_ms=3000) is None:
+            raise RuntimeError(f"Grid {grid_index_1based} tidak menjadi aktif setelah diklik")
 
 
-def assign_source_to_grid(page: Page, grid_index_1based: int, source_name: str):
+@tracing.traced("grid.assign")
+def assign_source_to_grid(page: Page, grid_index_1based: int, source_name: str, confirm_timeout_ms: int = 3000):
+    tracing.annotate(grid=grid_index_1based, source=source_name)
     # Aktivasi sel grid tujuan
     activate_grid_cell(page, grid_index_1based)
 
@@ -129,8 +192,14 @@ def assign_source_to_grid(page: Page, grid_index_1based: int, source_name: str):
     # UI kamu butuh double-click untuk “push” ke grid
     src.dblclick(timeout=3000)
 
-    # (opsional) kecilkan jeda agar UI sempat update
-    page.wait_for_timeout(200)
+    # Selesai begitu cell menampilkan source (bukan jeda tetap); best effort
+    shown = wait_for_dom(
+        page, {"shown": JS_CELL_SHOWS}, arg={"i": grid_index_1based - 1, "name": source_name},
+        timeout_ms=confirm_timeout_ms,
+    )
+    tracing.annotate(confirmed=shown is not None)
+    if shown is None:
+        print(f"[WARN] grid {grid_index_1based} belum menampilkan '{source_name}' setelah {confirm_timeout_ms} ms")
 
 def _wait_visible_dialog(page: Page):
     dlg = page.locator(".el-dialog__wrapper:visible, .el-message-box__wrapper:visible")
@@ -138,23 +207,27 @@ def _wait_visible_dialog(page: Page):
     return dlg.first
 
 
+# Pilih input URL di dialog dalam satu evaluate (bukan input_value/get_attribute per input):
+# prioritas value berprotokol, lalu placeholder yang mirip URL, lalu input pertama.
+_PICK_URL_INPUT_JS = """
+(inputs) => {
+  const protos = ['rtsp://', 'http://', 'https://', 'rtmp://'];
+  const keys = ['url', 'address', 'stream', 'rtsp', 'http', 'rtmp'];
+  for (let i = 0; i < inputs.length; i++) {
+    const val = (inputs[i].value || '').trim().toLowerCase();
+    const ph = (inputs[i].getAttribute('placeholder') || '').toLowerCase();
+    if (protos.some((p) => val.includes(p))) return i;
+    if (keys.some((k) => ph.includes(k))) return i;
+  }
+  return inputs.length ? 0 : -1;
+}
+"""
+
+
 def _find_url_input_in_dialog(dlg) -> Optional[object]:
     cand = dlg.locator("input.el-input__inner")
-    n = cand.count()
-    # coba berdasarkan value
-    for i in range(n):
-        inp = cand.nth(i)
-        try:
-            val = (inp.input_value() or "").strip()
-            ph = (inp.get_attribute("placeholder") or "").lower()
-        except Error:
-            val, ph = "", ""
-        if any(proto in val.lower() for proto in ("rtsp://", "http://", "https://", "rtmp://")):
-            return inp
-        if any(key in ph for key in ("url", "address", "stream", "rtsp", "http", "rtmp")):
-            return inp
-    # fallback: pertama
-    return cand.first if n > 0 else None
+    idx = cand.evaluate_all(_PICK_URL_INPUT_JS)
+    return cand.nth(idx) if idx >= 0 else None
 
 
 def _click_dialog_primary(dlg):
@@ -171,32 +244,28 @@ def _click_dialog_primary(dlg):
     btns.first.click()
 
 
-def set_source_url(page: Page, source_name: str, new_url: str):
-    item = _find_source_item(page, source_name)
-    if not item or item.count() == 0:
-        raise RuntimeError(f"Source '{source_name}' tidak ditemukan.")
-
+@tracing.traced("source.edit_url")
+def _edit_source_url(page: Page, item, source_name: str, new_url: str):
+    """Hover -> gear -> dialog -> isi URL -> Save -> tunggu dialog tertutup."""
+    tracing.annotate(source=source_name)
     # Hover agar ikon muncul, lalu klik ikon gear (shezhi)
     try:
         item.hover()
     except Error:
         pass
 
-    gear = item.locator(".icon-setting i.icon-shezhi")
-    if gear.count() == 0:
-        # fallback: ikon setting lain di dalam item
-        gear = item.locator("i.icon-shezhi")
-    if gear.count() == 0:
-        raise RuntimeError("Ikon 'settings' tidak ditemukan pada item source.")
-
-    gear.first.click()
+    gear = item.locator(".icon-setting i.icon-shezhi, i.icon-shezhi").first
+    try:
+        gear.click(timeout=3_000)
+    except Error:
+        raise RuntimeError(f"Ikon 'settings' tidak ditemukan pada item source '{source_name}'.")
 
     # Tunggu dialog
     dlg = _wait_visible_dialog(page)
 
     # Temukan input URL
     url_input = _find_url_input_in_dialog(dlg)
-    if not url_input or url_input.count() == 0:
+    if url_input is None:
         raise RuntimeError("Field URL pada dialog tidak ditemukan.")
 
     # Isi URL baru (fill() otomatis clear + type)
@@ -207,3 +276,85 @@ def set_source_url(page: Page, source_name: str, new_url: str):
 
     # Tunggu dialog tertutup
     dlg.wait_for(state="hidden", timeout=5_000)
+
+
+def _dismiss_dialog(page: Page):
+    # bersihkan dialog yang tertinggal setelah edit gagal, supaya item berikutnya tetap jalan
+    try:
+        page.keyboard.press("Escape")
+        page.locator(".el-dialog__wrapper:visible").first.wait_for(state="hidden", timeout=1_000)
+    except Error:
+        pass
+
+
+def set_source_url(page: Page, source_name: str, new_url: str):
+    item = _find_source_item(page, source_name)
+    if not item or item.count() == 0:
+        raise RuntimeError(f"Source '{source_name}' tidak ditemukan.")
+    _edit_source_url(page, item, source_name, new_url)
+
+
+@tracing.traced("source.set_urls")
+def set_source_urls(
+    page: Page,
+    pairs: Iterable[Tuple[str, str]],
+    skip_unchanged: bool = True,
+    atomic: bool = False,
+) -> List[Dict[str, str]]:
+    """
+    Edit URL banyak source dalam satu page session.
+
+    - semua item di-resolve sekali lewat list_sources (satu round-trip)
+    - source yang URL-nya sudah sama dilewati (skip_unchanged)
+    - item dicari pakai data-stream-id, jadi tidak ada filter teks per item
+    - atomic=True: jika ada yang gagal, URL yang sudah terlanjur diubah dikembalikan
+
+    Return per item: {"name", "url", "status": "updated"|"unchanged"|"error"|"reverted", "error"?}
+    """
+    pairs = list(pairs)
+    tracing.annotate(items=len(pairs), atomic=atomic)
+    current = list_sources(page)
+    by_name: Dict[str, Dict[str, str]] = {}
+    for it in current:
+        by_name.setdefault(it["name"], it)
+
+    def _locate(name: str):
+        cur = by_name.get(name)
+        if cur and cur["stream_id"]:
+            return page.locator(f'{SOURCE_ITEM_SEL}[data-stream-id="{cur["stream_id"]}"]').first
+        item = _find_source_item(page, name)
+        if item.count() == 0:
+            raise RuntimeError(f"Source '{name}' tidak ditemukan.")
+        return item
+
+    results: List[Dict[str, str]] = []
+    applied: List[Tuple[Dict[str, str], str]] = []  # (result, url lama) untuk rollback
+    for name, url in pairs:
+        res = {"name": name, "url": url}
+        cur = by_name.get(name)
+        if skip_unchanged and cur is not None and cur["url"] == url:
+            res["status"] = "unchanged"
+            results.append(res)
+            continue
+        try:
+            _edit_source_url(page, _locate(name), name, url)
+            res["status"] = "updated"
+            if cur is not None:
+                applied.append((res, cur["url"]))
+                cur["url"] = url
+        except Exception as e:
+            res["status"] = "error"
+            res["error"] = str(e)
+            _dismiss_dialog(page)
+        results.append(res)
+
+    if atomic and any(r["status"] == "error" for r in results):
+        for res, old_url in reversed(applied):
+            try:
+                _edit_source_url(page, _locate(res["name"]), res["name"], old_url)
+                by_name[res["name"]]["url"] = old_url
+                res["status"] = "reverted"
+            except Exception as e:
+                res["error"] = f"rollback gagal: {e}"
+                _dismiss_dialog(page)
+    return results
@@ -0,0 +1,9 @@
+# core/aio/__init__.py
+"""
+Kembaran async dari core.browser / core.auth / core.utils / core.actions
+di atas `playwright.async_api`. Semua session async berbagi satu event loop
+(core.aio.loop), jadi banyak device jalan di satu thread dan operasi yang
+macet bisa dibatalkan (task.cancel) tanpa membunuh browser.
+
+API sync tetap dipakai run.py; main.py memilih lewat env ENGINE=sync|async.
+"""
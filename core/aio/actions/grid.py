@@ -0,0 +1,135 @@
+# core/aio/actions/grid.py
+"""
+Versi async core.actions.grid. Di mode multi-page, tiap page bantu jalan
+sebagai coroutine sendiri (asyncio.gather), bukan round-robin.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Dict, List, Optional
+
+from playwright.async_api import Error, Page
+
+from ... import tracing
+from ...actions.grid import _CELLS_BY_LABEL, _JS_CELLS_SHOW, _READ_GRID_JS, cell_shows_source, plan_grid_state
+from ...actions.layouts import JS_GRID_HAS_CELLS
+from ...actions.sources import GRID_CELL_VISIBLE_SEL, SOURCE_ITEM_SEL
+from ..utils import wait_for_dom
+from .layouts import select_layout
+from .sources import assign_source_to_grid
+
+
+async def read_grid_state(page: Page) -> dict:
+    """Lihat core.actions.grid.read_grid_state."""
+    raw = await page.evaluate(_READ_GRID_JS)
+    raw["layout_cells"] = _CELLS_BY_LABEL.get(raw["layout_label"].lower(), len(raw["cells"]))
+    return raw
+
+
+@tracing.traced("grid.apply_state")
+async def apply_grid_state(
+    page: Page,
+    layout_cells: Optional[int],
+    assigns: Dict[int, str],
+    confirm: bool = True,
+    dry_run: bool = False,
+) -> dict:
+    current = await read_grid_state(page)
+    plan = plan_grid_state(current, layout_cells, assigns)
+    tracing.annotate(steps=len(plan), dry_run=dry_run)
+    if not dry_run:
+        for step in plan:
+            if step["op"] == "select_layout":
+                await select_layout(page, step["cells"], confirm=confirm)
+            else:
+                await assign_source_to_grid(page, step["grid"], step["name"])
+    return {
+        "noop": not plan,
+        "dry_run": dry_run,
+        "before": {"layout_cells": current["layout_cells"], "layout_label": current["layout_label"]},
+        "plan": plan,
+    }
+
+
+async def _open_helper_pages(page: Page, count: int, cells: int) -> List[Page]:
+    """Lihat core.actions.grid._open_helper_pages; page dibuka paralel."""
+    out: List[Page] = []
+
+    async def _open() -> None:
+        hp = await page.context.new_page()
+        out.append(hp)
+        await hp.goto(page.url, wait_until="domcontentloaded")
+        if await wait_for_dom(hp, {"grid": JS_GRID_HAS_CELLS}, arg=cells, timeout_ms=10_000) is None:
+            raise RuntimeError(f"page bantu tidak menampilkan grid {cells} cell")
+
+    try:
+        await asyncio.gather(*(_open() for _ in range(count)))
+    except BaseException:
+        await _close_pages(out)
+        raise
+    return out
+
+
+async def _close_pages(pages: List[Page]) -> None:
+    for hp in pages:
+        try:
+            await hp.close()
+        except Error:
+            pass
+
+
+async def _mismatched(page: Page, assigns: Dict[int, str]) -> List[int]:
+    cells = (await read_grid_state(page))["cells"]
+    return [g for g, name in sorted(assigns.items()) if g > len(cells) or not cell_shows_source(cells[g - 1], name)]
+
+
+@tracing.traced("grid.assign_pipelined")
+async def assign_grid_pipelined(page: Page, assigns: Dict[int, str], pages: int = 1, timeout_ms: int = 10_000) -> dict:
+    """Lihat core.actions.grid.assign_grid_pipelined (verifikasi & retry sama)."""
+    items = sorted(assigns.items())
+    if not items:
+        return {"pages": 0, "retried": []}
+    cells = len((await read_grid_state(page))["cells"])
+    bad = [g for g, _ in items if g < 1 or g > cells]
+    if bad:
+        raise ValueError(f"grid {bad} di luar layout {cells} cell")
+
+    helpers = await _open_helper_pages(page, min(pages, len(items)) - 1, cells) if pages > 1 else []
+    workers = [page] + helpers
+    tracing.annotate(cells=len(items), pages=len(workers))
+
+    async def _worker(n: int, wp: Page, pairs: List[tuple]) -> List[int]:
+        """Assign bagian page ini, verifikasi & retry di page yang sama. Return grid yang di-retry."""
+        for grid, name in pairs:
+            await wp.locator(GRID_CELL_VISIBLE_SEL).nth(grid - 1).click(timeout=5_000)
+            await wp.locator(SOURCE_ITEM_SEL).filter(has_text=name).first.dblclick(timeout=5_000)
+        arg = [[g - 1, name] for g, name in pairs]
+        if pairs and await wait_for_dom(wp, {"shown": _JS_CELLS_SHOW}, arg=arg, timeout_ms=timeout_ms) is None:
+            print(f"[WARN] sebagian cell belum tampil setelah {timeout_ms} ms (page {n})")
+        part = dict(pairs)
+        miss = await _mismatched(wp, part)
+        for g in miss:
+            await assign_source_to_grid(wp, g, part[g])
+        return miss
+
+    try:
+        # tunggu semua worker selesai sebelum page bantu ditutup
+        outs = await asyncio.gather(
+            *(_worker(i, wp, items[i::len(workers)]) for i, wp in enumerate(workers)), return_exceptions=True,
+        )
+        err = next((o for o in outs if isinstance(o, BaseException)), None)
+        if err is not None:
+            raise err
+        retried = sorted(g for miss in outs for g in miss)
+        left: List[int] = []
+        for i, wp in enumerate(workers):
+            part = dict(items[i::len(workers)])
+            if any(g in part for g in retried):
+                left += await _mismatched(wp, part)
+    finally:
+        await _close_pages(helpers)
+
+    tracing.annotate(retried=len(retried), mismatched=len(left))
+    if left:
+        raise RuntimeError(f"grid {sorted(left)} tidak sesuai peta yang diminta setelah retry")
+    return {"pages": len(workers), "retried": retried}
@@ -0,0 +1,78 @@
+# core/aio/actions/layouts.py
+from __future__ import annotations
+
+from playwright.async_api import Page, Error
+
+from ... import tracing
+from ...actions.layouts import (
+    JS_GRID_HAS_CELLS,
+    JS_SHIFT_MODAL_VISIBLE,
+    LAYOUT_LABELS,
+    SHIFT_MODAL_TIMEOUT_MS,
+    SEL_LAYOUT_DROPDOWN,
+    SEL_LAYOUT_OPTION,
+    SEL_LAYOUT_SELECT,
+    SEL_MODAL_CANCEL,
+    SEL_MODAL_OK,
+    SEL_MODAL_WRAPPER,
+)
+from ..utils import wait_for_dom
+
+
+@tracing.traced("layout.shift_modal")
+async def _maybe_handle_layout_shift_modal(
+    page: Page, confirm: bool = True, timeout_ms: int = SHIFT_MODAL_TIMEOUT_MS, cells: int | None = None,
+) -> str | None:
+    """Lihat core.actions.layouts._maybe_handle_layout_shift_modal. Return "modal" / "grid" / None."""
+    try:
+        if cells is not None:
+            winner = await wait_for_dom(
+                page, {"modal": JS_SHIFT_MODAL_VISIBLE, "grid": JS_GRID_HAS_CELLS}, arg=cells, timeout_ms=timeout_ms,
+            )
+            if winner != "modal":
+                tracing.annotate(appeared=False, race=winner or "timeout")
+                return winner
+        modal = page.locator(SEL_MODAL_WRAPPER).filter(
+            has_text="Layout shift will lose unsaved data"
+        )
+        await modal.wait_for(state="visible", timeout=timeout_ms)
+        tracing.annotate(appeared=True, confirm=confirm)
+        if confirm:
+            await page.locator(SEL_MODAL_OK).click()
+        else:
+            await page.locator(SEL_MODAL_CANCEL).first.click()
+        return "modal"
+    except Error:
+        tracing.annotate(appeared=False)
+        return None
+
+
+@tracing.traced("layout.select")
+async def select_layout(page: Page, cells: int, confirm: bool = True, timeout_ms: int = 10_000) -> None:
+    """Pilih layout berdasarkan jumlah cell (lihat core.actions.layouts.select_layout)."""
+    label = LAYOUT_LABELS.get(cells)
+    if label is None:
+        raise ValueError(f"cells '{cells}' tidak didukung. Pilihan: {sorted(LAYOUT_LABELS.keys())}")
+    tracing.annotate(cells=cells, label=label)
+
+    await page.locator(SEL_LAYOUT_SELECT).click()
+    await page.locator(SEL_LAYOUT_DROPDOWN).wait_for(state="visible", timeout=timeout_ms)
+
+    option = page.locator(SEL_LAYOUT_OPTION).filter(has_text=label).first
+    if await option.count() == 0:
+        raise RuntimeError(f"Layout '{label}' tidak ditemukan di dropdown")
+    await option.click()
+
+    race = await _maybe_handle_layout_shift_modal(
+        page, confirm=confirm, timeout_ms=min(timeout_ms, SHIFT_MODAL_TIMEOUT_MS), cells=cells,
+    )
+    if race == "modal" and not confirm:
+        return  # dibatalkan: layout lama tetap, tidak ada grid baru yang ditunggu
+    if race == "grid":
+        return  # grid sudah ter-render `cells` cell saat balapan
+
+    try:
+        if await wait_for_dom(page, {"grid": JS_GRID_HAS_CELLS}, arg=cells, timeout_ms=timeout_ms) is None:
+            print(f"[WARN] grid belum menampilkan {cells} cell setelah {timeout_ms} ms")
+    except Error:
+        pass
@@ -0,0 +1,234 @@
+# core/aio/actions/sources.py
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from playwright.async_api import Error, Page
+
+from ... import tracing
+from ...actions.sources import (
+    _PICK_URL_INPUT_JS,
+    EXTRACT_SOURCES_JS,
+    GRID_CELL_VISIBLE_SEL,
+    JS_CELL_ACTIVE,
+    JS_CELL_SHOWS,
+    SOURCE_ITEM_SEL,
+)
+from ..utils import wait_for_dom
+
+
+async def _find_source_item(page: Page, name: str):
+    item = page.locator(SOURCE_ITEM_SEL).filter(has_text=name).first
+    try:
+        await item.scroll_into_view_if_needed(timeout=2_000)
+    except Error:
+        pass
+    return item
+
+
+@tracing.traced("sources.list")
+async def list_sources(page: Page, mode: str = "js") -> List[Dict[str, str]]:
+    """Daftar source di panel kanan: [{name, status, url, stream_id}, ...] (lihat core.actions.sources)."""
+    if mode == "dom":
+        items = await _list_sources_dom(page)
+    elif mode == "js":
+        items = await page.eval_on_selector_all(SOURCE_ITEM_SEL, EXTRACT_SOURCES_JS)
+    else:
+        raise ValueError(f"mode list_sources tidak dikenal: {mode!r} (pilihan: 'js', 'dom')")
+    tracing.annotate(mode=mode, count=len(items))
+    return items
+
+
+async def _list_sources_dom(page: Page) -> List[Dict[str, str]]:
+    items = page.locator(SOURCE_ITEM_SEL)
+    result: List[Dict[str, str]] = []
+    for i in range(await items.count()):
+        it = items.nth(i)
+        name = ""
+        cand = it.locator("img + span[title]").first
+        if await cand.count():
+            name = (await cand.get_attribute("title") or await cand.inner_text()).strip()
+        else:
+            spans = it.locator("span[title]")
+            for j in range(await spans.count()):
+                sp = spans.nth(j)
+                if not await sp.evaluate("el => !!el.closest('.item-status-ip')"):
+                    name = (await sp.get_attribute("title") or await sp.inner_text()).strip()
+                    break
+
+        try:
+            stream_id = await it.get_attribute("data-stream-id") or ""
+        except Error:
+            stream_id = ""
+
+        url_el = it.locator(".item-status-ip span.over-ellipsis")
+        url = (await url_el.inner_text()).strip() if await url_el.count() else ""
+
+        status_el = it.locator(".display-flex.align-items-center span.ft-12")
+        status = (await status_el.inner_text()).strip() if await status_el.count() else ""
+
+        result.append({"name": name, "status": status, "url": url, "stream_id": stream_id})
+    return result
+
+
+@tracing.traced("grid.activate")
+async def activate_grid_cell(page: Page, grid_index_1based: int, timeout_ms: int = 5000):
+    idx = grid_index_1based - 1
+    target = page.locator(GRID_CELL_VISIBLE_SEL).nth(idx)
+    tracing.annotate(grid=grid_index_1based, retries=0)
+
+    await target.wait_for(state="visible", timeout=timeout_ms)
+    try:
+        await target.scroll_into_view_if_needed()
+    except Exception:
+        pass
+    await target.click()
+
+    if await wait_for_dom(page, {"active": JS_CELL_ACTIVE}, arg=idx, timeout_ms=2000) is None:
+        tracing.annotate(retries=1)
+        await target.click()
+        if await wait_for_dom(page, {"active": JS_CELL_ACTIVE}, arg=idx, timeout_ms=3000) is None:
+            raise RuntimeError(f"Grid {grid_index_1based} tidak menjadi aktif setelah diklik")
+
+
+@tracing.traced("grid.assign")
+async def assign_source_to_grid(page: Page, grid_index_1based: int, source_name: str, confirm_timeout_ms: int = 3000):
+    tracing.annotate(grid=grid_index_1based, source=source_name)
+    await activate_grid_cell(page, grid_index_1based)
+
+    src = page.locator(SOURCE_ITEM_SEL).filter(has_text=source_name).first
+    await src.wait_for(state="visible", timeout=5000)
+    try:
+        await src.scroll_into_view_if_needed()
+    except Exception:
+        pass
+    await src.dblclick(timeout=3000)
+
+    shown = await wait_for_dom(
+        page, {"shown": JS_CELL_SHOWS}, arg={"i": grid_index_1based - 1, "name": source_name},
+        timeout_ms=confirm_timeout_ms,
+    )
+    tracing.annotate(confirmed=shown is not None)
+    if shown is None:
+        print(f"[WARN] grid {grid_index_1based} belum menampilkan '{source_name}' setelah {confirm_timeout_ms} ms")
+
+
+async def _wait_visible_dialog(page: Page):
+    dlg = page.locator(".el-dialog__wrapper:visible, .el-message-box__wrapper:visible")
+    await dlg.wait_for(state="visible", timeout=5_000)
+    return dlg.first
+
+
+async def _find_url_input_in_dialog(dlg) -> Optional[object]:
+    cand = dlg.locator("input.el-input__inner")
+    idx = await cand.evaluate_all(_PICK_URL_INPUT_JS)
+    return cand.nth(idx) if idx >= 0 else None
+
+
+async def _click_dialog_primary(dlg):
+    btns = dlg.locator(
+        "button:has-text('Save'), "
+        "button:has-text('OK'), "
+        "button:has-text('Confirm'), "
+        "button:has-text('保存'), "
+        "button:has-text('确定'), "
+        "button.el-button--primary"
+    )
+    if await btns.count() == 0:
+        raise RuntimeError("Tombol Save/OK/Confirm di dialog tidak ditemukan.")
+    await btns.first.click()
+
+
+@tracing.traced("source.edit_url")
+async def _edit_source_url(page: Page, item, source_name: str, new_url: str):
+    """Hover -> gear -> dialog -> isi URL -> Save -> tunggu dialog tertutup."""
+    tracing.annotate(source=source_name)
+    try:
+        await item.hover()
+    except Error:
+        pass
+
+    gear = item.locator(".icon-setting i.icon-shezhi, i.icon-shezhi").first
+    try:
+        await gear.click(timeout=3_000)
+    except Error:
+        raise RuntimeError(f"Ikon 'settings' tidak ditemukan pada item source '{source_name}'.")
+
+    dlg = await _wait_visible_dialog(page)
+    url_input = await _find_url_input_in_dialog(dlg)
+    if url_input is None:
+        raise RuntimeError("Field URL pada dialog tidak ditemukan.")
+    await url_input.fill(new_url)
+    await _click_dialog_primary(dlg)
+    await dlg.wait_for(state="hidden", timeout=5_000)
+
+
+async def _dismiss_dialog(page: Page):
+    try:
+        await page.keyboard.press("Escape")
+        await page.locator(".el-dialog__wrapper:visible").first.wait_for(state="hidden", timeout=1_000)
+    except Error:
+        pass
+
+
+async def set_source_url(page: Page, source_name: str, new_url: str):
+    item = await _find_source_item(page, source_name)
+    if await item.count() == 0:
+        raise RuntimeError(f"Source '{source_name}' tidak ditemukan.")
+    await _edit_source_url(page, item, source_name, new_url)
+
+
+@tracing.traced("source.set_urls")
+async def set_source_urls(
+    page: Page,
+    pairs: Iterable[Tuple[str, str]],
+    skip_unchanged: bool = True,
+    atomic: bool = False,
+) -> List[Dict[str, str]]:
+    """Lihat core.actions.sources.set_source_urls (hasil & aturan rollback sama)."""
+    pairs = list(pairs)
+    tracing.annotate(items=len(pairs), atomic=atomic)
+    by_name: Dict[str, Dict[str, str]] = {}
+    for it in await list_sources(page):
+        by_name.setdefault(it["name"], it)
+
+    async def _locate(name: str):
+        cur = by_name.get(name)
+        if cur and cur["stream_id"]:
+            return page.locator(f'{SOURCE_ITEM_SEL}[data-stream-id="{cur["stream_id"]}"]').first
+        item = await _find_source_item(page, name)
+        if await item.count() == 0:
+            raise RuntimeError(f"Source '{name}' tidak ditemukan.")
+        return item
+
+    results: List[Dict[str, str]] = []
+    applied: List[Tuple[Dict[str, str], str]] = []  # (result, url lama) untuk rollback
+    for name, url in pairs:
+        res = {"name": name, "url": url}
+        cur = by_name.get(name)
+        if skip_unchanged and cur is not None and cur["url"] == url:
+            res["status"] = "unchanged"
+            results.append(res)
+            continue
+        try:
+            await _edit_source_url(page, await _locate(name), name, url)
+            res["status"] = "updated"
+            if cur is not None:
+                applied.append((res, cur["url"]))
+                cur["url"] = url
+        except Exception as e:
+            res["status"] = "error"
+            res["error"] = str(e)
+            await _dismiss_dialog(page)
+        results.append(res)
+
+    if atomic and any(r["status"] == "error" for r in results):
+        for res, old_url in reversed(applied):
+            try:
+                await _edit_source_url(page, await _locate(res["name"]), res["name"], old_url)
+                by_name[res["name"]]["url"] = old_url
+                res["status"] = "reverted"
+            except Exception as e:
+                res["error"] = f"rollback gagal: {e}"
+                await _dismiss_dialog(page)
+    return results
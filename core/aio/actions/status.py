@@ -0,0 +1,49 @@
+# core/aio/actions/status.py
+from typing import Dict, List
+
+from playwright.async_api import Page
+
+from ...actions.status import PROTO_PREFIXES, _normalize_status
+from ...ui_selectors import LIST_SOURCE_ITEM
+
+async def _pick_name_from_item(item) -> str:
+    spans = item.locator('span[title]')
+    for i in range(await spans.count()):
+        t = (await spans.nth(i).get_attribute("title") or "").strip()
+        if t and not t.lower().startswith(PROTO_PREFIXES):
+            return t
+    txt = (await item.inner_text() or "").strip().splitlines()
+    return next((l.strip() for l in txt if l.strip()), "")
+
+async def _pick_url_from_item(item) -> str:
+    ip_span = item.locator('.item-status-ip span[title]')
+    if await ip_span.count() > 0:
+        return (await ip_span.first.get_attribute("title") or "").strip()
+    spans = item.locator('span[title]')
+    for i in range(await spans.count()):
+        t = (await spans.nth(i).get_attribute("title") or "").strip()
+        if t.lower().startswith(PROTO_PREFIXES):
+            return t
+    return ""
+
+async def _pick_status_text(item) -> str:
+    spans = item.locator(".display-flex.align-items-center span.ft-12")
+    c = await spans.count()
+    if c > 0:
+        return (await spans.nth(c - 1).text_content() or "").strip()
+    return ""
+
+async def read_sources_status(page: Page) -> List[Dict[str, str]]:
+    await page.wait_for_selector(LIST_SOURCE_ITEM, timeout=10_000)
+    items = page.locator(LIST_SOURCE_ITEM)
+    results: List[Dict[str, str]] = []
+    for i in range(await items.count()):
+        item = items.nth(i)
+        status_label = await _pick_status_text(item)
+        results.append({
+            "name": await _pick_name_from_item(item) or f"item_{i}",
+            "url": await _pick_url_from_item(item),
+            "status": _normalize_status(status_label),
+            "status_label": status_label,
+        })
+    return results
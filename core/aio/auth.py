@@ -0,0 +1,76 @@
+# core/aio/auth.py
+from pathlib import Path
+
+from playwright.async_api import BrowserContext, Error, Page
+
+from .. import tracing
+from ..auth import STATE_MAX_AGE_SEC, write_state_meta
+from ..ui_selectors import SEL_USER, SEL_PASS, SEL_BTN_LOGIN, DASHBOARD_PROBES
+from .utils import goto_login, goto_with_retry, wait_for_url_not_contains, wait_for_any_selector
+
+# saved_state_if_fresh / invalidate_storage_state hanya operasi file: pakai yang di core.auth
+
+@tracing.traced("auth.login")
+async def login(page: Page, base_url: str, username: str, password: str, navigate: bool = True):
+    if navigate:
+        await goto_login(page, base_url)
+    else:
+        await page.wait_for_selector(SEL_USER, timeout=20_000)
+    await page.fill(SEL_USER, username)
+    await page.fill(SEL_PASS, password)
+    await page.click(SEL_BTN_LOGIN)
+    await wait_for_url_not_contains(page, "/login", timeout_ms=30_000)
+
+@tracing.traced("auth.wait_dashboard")
+async def wait_for_dashboard(page: Page):
+    await wait_for_any_selector(page, DASHBOARD_PROBES, timeout_ms=20_000)
+
+async def save_storage_state(
+    context: BrowserContext, state_path: Path, base_url: str, max_age_sec: float = STATE_MAX_AGE_SEC,
+):
+    state = await context.storage_state(path=str(state_path))
+    write_state_meta(state, state_path, base_url, max_age_sec)
+
+@tracing.traced("auth.restore")
+async def restore_session(page: Page, base_url: str, timeout_ms: int = 15_000) -> bool:
+    await goto_with_retry(page, base_url.rstrip("/"))
+    try:
+        await page.wait_for_selector(", ".join(DASHBOARD_PROBES + [SEL_USER]), state="visible", timeout=timeout_ms)
+    except Error:
+        return False
+    # SPA bisa sempat render dashboard lalu redirect ke /login setelah API menolak sesi
+    try:
+        await page.wait_for_load_state("networkidle", timeout=2_000)
+    except Error:
+        pass
+    if "/login" in (page.url or ""):
+        return False
+    ok = False
+    for sel in DASHBOARD_PROBES:
+        try:
+            if await page.locator(sel).first.is_visible():
+                ok = True
+                break
+        except Error:
+            pass
+    tracing.annotate(ok=ok)
+    return ok
+
+@tracing.traced("auth.ensure")
+async def ensure_logged_in(page: Page, base_url: str, username: str, password: str, try_restore: bool = False) -> str:
+    """Lihat core.auth.ensure_logged_in. Return "restored" atau "login"."""
+    navigate = True
+    if try_restore:
+        if await restore_session(page, base_url):
+            print("[INFO] sesi tersimpan dipakai ulang, skip form login")
+            tracing.annotate(how="restored")
+            return "restored"
+        print("[INFO] sesi tersimpan tidak valid, login ulang")
+        try:
+            navigate = not await page.locator(SEL_USER).first.is_visible()
+        except Error:
+            navigate = True
+    await login(page, base_url, username, password, navigate=navigate)
+    await wait_for_dashboard(page)
+    tracing.annotate(how="login", restore_tried=try_restore)
+    return "login"
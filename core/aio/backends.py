@@ -0,0 +1,73 @@
+# core/aio/backends.py
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .. import tracing
+from ..backends import PlaywrightBackend, Step, _group_parents, _wants_snapshot
+from .actions.grid import apply_grid_state, assign_grid_pipelined
+from .actions.layouts import select_layout
+from .actions.sources import assign_source_to_grid, list_sources, set_source_url, set_source_urls
+
+
+class AsyncPlaywrightBackend(PlaywrightBackend):
+    """PlaywrightBackend untuk ENGINE=async: step dijalankan sebagai satu coroutine `async fn(page)`."""
+
+    name = "playwright-async"
+
+    _ACTIONS: Dict[str, Callable] = {
+        "list_sources": list_sources,
+        "select_layout": select_layout,
+        "assign_source_to_grid": assign_source_to_grid,
+        "set_source_url": set_source_url,
+        "set_source_urls": set_source_urls,
+        "apply_grid_state": apply_grid_state,
+        "assign_grid_pipelined": assign_grid_pipelined,
+    }
+
+    async def _snapshot(self, page) -> None:
+        try:
+            with tracing.span("poll.piggyback"):
+                items = await self._ACTIONS["list_sources"](page)
+        except Exception as e:
+            print(f"[WARN] snapshot sources setelah operasi gagal: {e}")
+            return
+        self.snapshots += 1
+        self.on_snapshot(items)
+
+    def run_steps(self, steps: Sequence[Step]) -> List[Any]:
+        steps = list(steps)
+        if not steps:
+            return []
+        snapshot = self.on_snapshot is not None and _wants_snapshot([steps])
+
+        async def _do(page):
+            out = [await self._ACTIONS[op](page, *args, **kwargs) for op, args, kwargs in steps]
+            if snapshot:
+                await self._snapshot(page)
+            return out
+
+        return self._run(_do)
+
+    def run_groups(self, groups: Sequence[Sequence[Step]], parents: Optional[Sequence] = None) -> List[Any]:
+        groups = [list(g) for g in groups]
+        parents = _group_parents(groups, parents)
+        snapshot = self.on_snapshot is not None and _wants_snapshot(groups)
+
+        async def _do(page):
+            out = []
+            for steps, parent in zip(groups, parents):
+                try:
+                    with tracing.attach(parent):
+                        out.append([await self._ACTIONS[op](page, *args, **kwargs) for op, args, kwargs in steps])
+                except Exception as e:
+                    out.append(e)
+                    try:
+                        await page.keyboard.press("Escape")
+                    except Exception:
+                        pass
+            if snapshot:
+                await self._snapshot(page)
+            return out
+
+        return self._run(_do, len(groups))
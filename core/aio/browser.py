@@ -0,0 +1,50 @@
+# core/aio/browser.py
+import os
+from pathlib import Path
+from typing import Optional
+
+from playwright.async_api import Route, async_playwright
+
+from .. import tracing
+from ..browser import LEAN_BLOCK_TYPES, LEAN_BLOCK_URL_RE, LEAN_CHROMIUM_ARGS, context_options
+
+async def _lean_route(route: Route):
+    req = route.request
+    if req.resource_type in LEAN_BLOCK_TYPES or LEAN_BLOCK_URL_RE.search(req.url):
+        await route.abort("blockedbyclient")
+    else:
+        await route.continue_()
+
+@tracing.traced("browser.launch")
+async def launch_browser(
+    headless: bool = True,
+    record_video: bool = False,
+    out_dir: Path = Path("out"),
+    storage_state: Optional[Path] = None,
+    profile: Optional[str] = None,
+):
+    """Sama dengan core.browser.launch_browser, return (pw, browser, context, page) versi async."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    profile = (profile or os.environ.get("BROWSER_PROFILE") or "full").lower()
+    lean = profile == "lean"
+
+    pw = await async_playwright().start()
+
+    engine = (os.environ.get("BROWSER") or "chromium").lower()
+    launcher = {"chromium": pw.chromium, "firefox": pw.firefox, "webkit": pw.webkit}.get(engine, pw.chromium)
+    tracing.annotate(engine=engine, profile=profile, storage_state=storage_state is not None, aio=True)
+
+    args = ["--no-sandbox", "--disable-dev-shm-usage"]
+    if lean and launcher is pw.chromium:
+        args += LEAN_CHROMIUM_ARGS
+    try:
+        browser = await launcher.launch(headless=headless, args=args)
+        context = await browser.new_context(**context_options(out_dir, record_video, storage_state))
+        if lean:
+            await context.route("**/*", _lean_route)
+        page = await context.new_page()
+    except BaseException:
+        await pw.stop()
+        raise
+    return pw, browser, context, page
@@ -0,0 +1,38 @@
+# core/aio/loop.py
+"""
+Satu event loop bersama (thread daemon) untuk semua AsyncBrowserSession.
+Kode sync (DeviceQueue, poller) masuk lewat `submit()` / `run()`.
+"""
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from threading import Lock, Thread
+from typing import Any, Awaitable, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            Thread(target=_loop.run_forever, name="playwright-aio", daemon=True).start()
+        return _loop
+
+
+def submit(coro: Awaitable) -> Future:
+    """Jadwalkan coroutine di loop bersama; `Future.cancel()` membatalkan task-nya."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run(coro: Awaitable, timeout: Optional[float] = None) -> Any:
+    """Jalankan coroutine dari thread lain dan tunggu hasilnya; timeout -> task dibatalkan."""
+    fut = submit(coro)
+    try:
+        return fut.result(timeout=timeout)
+    except FutureTimeout:
+        fut.cancel()
+        raise
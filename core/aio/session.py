@@ -0,0 +1,271 @@
+# core/aio/session.py
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Awaitable, Callable, List, Optional
+
+from playwright.async_api import Error, Page
+
+from .. import metrics, tracing, utils
+from ..auth import STATE_MAX_AGE_SEC, invalidate_storage_state, saved_state_if_fresh
+from ..ui_selectors import DASHBOARD_PROBES
+from . import loop as aio_loop
+from .auth import ensure_logged_in, save_storage_state
+from .browser import launch_browser
+
+AsyncPageFn = Callable[[Page], Awaitable[Any]]
+
+
+class AsyncBrowserSession:
+    """
+    Padanan core.session.BrowserSession di atas playwright.async_api.
+
+    Semua session berjalan di event loop bersama (core.aio.loop), satu lock
+    asyncio per session menggantikan thread worker. `fn` adalah coroutine
+    function `async fn(page)`. Dari thread lain pakai `run()` / `submit()`;
+    dari coroutine di loop yang sama pakai `arun()`.
+
+    Operasi yang sedang jalan bisa dibatalkan (`cancel_current()`, timeout,
+    atau `Future.cancel()`): task-nya di-cancel, page dibersihkan dengan
+    Escape, browser tetap hidup.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        username: str,
+        password: str,
+        *,
+        name: str = "default",
+        headless: bool = True,
+        out_dir: Path = utils.OUT_DIR,
+        health_interval: float = 30.0,
+        restore_state: bool = True,
+        state_max_age: float = STATE_MAX_AGE_SEC,
+        profile: Optional[str] = None,
+    ):
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.name = name
+        self.headless = headless
+        self.profile = profile
+        self.out_dir = out_dir
+        self.health_interval = health_interval
+        # coroutine function `async hook(page)`, dipanggil setiap page selesai login / login ulang
+        self.page_hooks: List[Callable[[Page], Awaitable[None]]] = []
+        self.restore_state = restore_state
+        self.state_max_age = state_max_age
+        self.state_path = out_dir / "storage_state.json"
+        self._state_loaded = False
+
+        self._lock: Optional[asyncio.Lock] = None
+        self._health_task: Optional[asyncio.Task] = None
+        self._current: Optional[asyncio.Task] = None
+        self._waiting = 0
+
+        self._pw = None
+        self._browser = None
+        self._context = None
+        self._page: Optional[Page] = None
+
+        self.launches = 0
+        self.logins = 0
+        self.restores = 0
+        self.cancelled = 0
+        self.last_ready_at: Optional[float] = None
+
+    # ---------- API publik (thread mana pun) ----------
+    def start(self) -> None:
+        aio_loop.get_loop().call_soon_threadsafe(self._start_health)
+
+    def submit(self, fn: AsyncPageFn) -> Future:
+        self.start()
+        return aio_loop.submit(self.arun(fn, parent=tracing.current()))
+
+    def run(self, fn: AsyncPageFn, timeout: Optional[float] = None) -> Any:
+        self.start()
+        return aio_loop.run(self.arun(fn, parent=tracing.current()), timeout=timeout)
+
+    def warm(self) -> Future:
+        async def _noop(page):
+            return None
+        return self.submit(_noop)
+
+    def cancel_current(self) -> bool:
+        """Batalkan operasi yang sedang memegang page (bukan yang masih menunggu lock)."""
+        task = self._current
+        if task is None or task.done():
+            return False
+        aio_loop.get_loop().call_soon_threadsafe(task.cancel)
+        return True
+
+    def close(self, timeout: float = 10.0) -> None:
+        try:
+            aio_loop.run(self._aclose(), timeout=timeout)
+        except Exception as e:
+            print(f"[WARN] tutup session async '{self.name}' gagal: {e}")
+
+    @property
+    def is_ready(self) -> bool:
+        return self._page is not None
+
+    def info(self) -> dict:
+        return {
+            "name": self.name,
+            "engine": "async",
+            "ready": self.is_ready,
+            "launches": self.launches,
+            "logins": self.logins,
+            "restores": self.restores,
+            "cancelled": self.cancelled,
+            "last_ready_at": self.last_ready_at,
+            "pending": self._waiting,
+        }
+
+    # ---------- di event loop ----------
+    async def arun(self, fn: AsyncPageFn, parent: Optional[tracing.Span] = None) -> Any:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        self._waiting += 1
+        try:
+            await self._lock.acquire()
+        finally:
+            self._waiting -= 1
+        self._current = asyncio.current_task()
+        try:
+            with tracing.attach(parent if parent is not None else tracing.current()):
+                page = await self._ensure_ready()
+                return await fn(page)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            # jangan tinggalkan dialog/dropdown setengah jalan untuk operasi berikutnya
+            await asyncio.shield(self._after_failure())
+            raise
+        except BaseException:
+            await self._after_failure()
+            raise
+        finally:
+            self._current = None
+            self._lock.release()
+
+    def _start_health(self) -> None:
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.get_running_loop().create_task(self._health_loop())
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            # hanya jaga session yang sudah pernah dibuka, dan jangan antre di belakang operasi
+            if self._page is None or self._lock is None or self._lock.locked():
+                continue
+            async with self._lock:
+                try:
+                    await self._ensure_ready()
+                except Exception as e:
+                    print(f"[WARN] health-check session '{self.name}' gagal: {e}")
+                    await self._shutdown()
+
+    @tracing.traced("session.launch")
+    async def _launch(self) -> None:
+        tracing.annotate(device=self.name, engine="async")
+        t0 = time.perf_counter()
+        state = saved_state_if_fresh(self.state_path, self.base_url) if self.restore_state else None
+        self._pw, self._browser, self._context, self._page = await launch_browser(
+            headless=self.headless,
+            record_video=False,
+            out_dir=self.out_dir,
+            storage_state=state,
+            profile=self.profile,
+        )
+        self._state_loaded = state is not None
+        self.launches += 1
+        metrics.BROWSER_LAUNCH.observe(time.perf_counter() - t0, device=self.name)
+
+    @tracing.traced("session.login")
+    async def _login(self) -> None:
+        tracing.annotate(device=self.name)
+        try_restore, self._state_loaded = self._state_loaded, False
+        t0 = time.perf_counter()
+        how = await ensure_logged_in(self._page, self.base_url, self.username, self.password, try_restore=try_restore)
+        metrics.BROWSER_LOGIN.observe(time.perf_counter() - t0, device=self.name, how=how)
+        if how == "restored":
+            self.restores += 1
+        else:
+            self.logins += 1
+            if try_restore:
+                invalidate_storage_state(self.state_path)
+            try:
+                await save_storage_state(self._context, self.state_path, self.base_url, self.state_max_age)
+            except Exception:
+                pass
+        self.last_ready_at = time.time()
+        for hook in self.page_hooks:
+            try:
+                await hook(self._page)
+            except Exception as e:
+                print(f"[WARN] page hook session '{self.name}' gagal: {e}")
+
+    async def _is_healthy(self) -> bool:
+        try:
+            if "/login" in (self._page.url or ""):
+                return False
+            for sel in DASHBOARD_PROBES:
+                if await self._page.locator(sel).count() > 0:
+                    return True
+            return False
+        except Error:
+            return False
+
+    async def _ensure_ready(self) -> Page:
+        alive = (
+            self._page is not None
+            and not self._page.is_closed()
+            and self._browser is not None
+            and self._browser.is_connected()
+        )
+        if not alive:
+            await self._shutdown()
+            await self._launch()
+            await self._login()
+            return self._page
+
+        if not await self._is_healthy():
+            print(f"[WARN] session '{self.name}' tidak di dashboard (expired?), login ulang")
+            try:
+                await self._login()
+            except Error:
+                await self._shutdown()
+                await self._launch()
+                await self._login()
+        return self._page
+
+    async def _after_failure(self) -> None:
+        if self._browser is None or not self._browser.is_connected():
+            await self._shutdown()
+            return
+        try:
+            await self._page.keyboard.press("Escape")
+        except Error:
+            await self._shutdown()
+
+    async def _shutdown(self) -> None:
+        for closer in (
+            lambda: self._browser and self._browser.close(),
+            lambda: self._pw and self._pw.stop(),
+        ):
+            try:
+                aw = closer()
+                if aw:
+                    await aw
+            except Exception:
+                pass
+        self._pw = self._browser = self._context = self._page = None
+
+    async def _aclose(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+        await self._shutdown()
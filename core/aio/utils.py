@@ -0,0 +1,67 @@
+# core/aio/utils.py
+import asyncio
+import json
+import time
+
+from playwright.async_api import Error, Page
+
+from .. import tracing
+from ..ui_selectors import SEL_USER
+from ..utils import OUT_DIR, _WAIT_DOM_JS
+
+@tracing.traced("nav.goto")
+async def goto_with_retry(page: Page, url: str):
+    """goto dengan retry singkat untuk redirect cepat SPA (ERR_ABORTED / frame detached)."""
+    print(f"[INFO] goto {url}")
+    tracing.annotate(url=url)
+
+    for attempt in range(2):
+        try:
+            await page.goto(url, wait_until="commit", timeout=60_000)
+            break
+        except Error as e:
+            msg = str(e)
+            if "ERR_ABORTED" in msg or "frame was detached" in msg:
+                print(f"[WARN] goto aborted (attempt {attempt+1}): {msg}")
+                tracing.annotate(retries=attempt + 1)
+                await asyncio.sleep(0.5)
+                continue
+            raise
+
+@tracing.traced("nav.goto_login")
+async def goto_login(page: Page, base_url: str):
+    await goto_with_retry(page, base_url.rstrip("/"))
+
+    try:
+        await page.wait_for_selector(SEL_USER, timeout=20_000)
+    except Error:
+        await page.screenshot(path=str(OUT_DIR / "after_goto_login.png"), full_page=True)
+        raise
+
+@tracing.traced("nav.wait_url")
+async def wait_for_url_not_contains(page: Page, needle: str, timeout_ms: int = 30_000):
+    await page.wait_for_function(
+        "url => !window.location.href.includes(url)",
+        arg=needle,
+        timeout=timeout_ms,
+    )
+
+async def wait_for_any_selector(page: Page, selectors: list[str], timeout_ms: int = 15_000):
+    """Lolos kalau salah satu selector muncul."""
+    deadline = time.time() + (timeout_ms / 1000.0)
+    last_err = None
+    for sel in selectors:
+        try:
+            remain = max(1, int((deadline - time.time()) * 1000))
+            await page.wait_for_selector(sel, timeout=remain, state="visible")
+            return sel
+        except Error as e:
+            last_err = e
+            continue
+    if last_err:
+        raise last_err
+
+async def wait_for_dom(page: Page, predicates: dict[str, str], arg=None, timeout_ms: int = 5_000) -> str | None:
+    """Sama dengan core.utils.wait_for_dom (MutationObserver, race antar predikat)."""
+    body = ", ".join(f"{json.dumps(k)}: ({src.strip()})" for k, src in predicates.items())
+    return await page.evaluate(_WAIT_DOM_JS % body, {"value": arg, "timeout": timeout_ms})
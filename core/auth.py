@@ -1,14 +1,121 @@
 # core/auth.py
-from playwright.sync_api import Page
-from .utils import goto_login, wait_for_url_not_contains, wait_for_any_selector
+import json
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse
+
+from playwright.sync_api import BrowserContext, Error, Page
+from . import tracing
+from .utils import goto_login, goto_with_retry, wait_for_url_not_contains, wait_for_any_selector
 from .ui_selectors import SEL_USER, SEL_PASS, SEL_BTN_LOGIN, DASHBOARD_PROBES
 
-def login(page: Page, base_url: str, username: str, password: str):
-    goto_login(page, base_url)
+# umur maksimal storage_state yang masih dicoba dipakai ulang (di luar expiry cookie)
+STATE_MAX_AGE_SEC = 12 * 3600
+
+@tracing.traced("auth.login")
+def login(page: Page, base_url: str, username: str, password: str, navigate: bool = True):
+    if navigate:
+        goto_login(page, base_url)
+    else:
+        page.wait_for_selector(SEL_USER, timeout=20_000)
     page.fill(SEL_USER, username)
     page.fill(SEL_PASS, password)
     page.click(SEL_BTN_LOGIN)
     wait_for_url_not_contains(page, "/login", timeout_ms=30_000)
 
+@tracing.traced("auth.wait_dashboard")
 def wait_for_dashboard(page: Page):
     wait_for_any_selector(page, DASHBOARD_PROBES, timeout_ms=20_000)
+
+# =========================
+# Pakai ulang sesi (storage_state.json)
+# =========================
+def _meta_path(state_path: Path) -> Path:
+    return state_path.with_name(state_path.stem + ".meta.json")
+
+def saved_state_if_fresh(state_path: Path, base_url: str) -> Optional[Path]:
+    """Path storage_state jika masih layak dicoba (device sama & belum expired), selain itu None."""
+    try:
+        meta = json.loads(_meta_path(state_path).read_text("utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not state_path.exists() or meta.get("base_url") != base_url:
+        return None
+    if time.time() >= float(meta.get("expires_at") or 0):
+        return None
+    return state_path
+
+def save_storage_state(context: BrowserContext, state_path: Path, base_url: str, max_age_sec: float = STATE_MAX_AGE_SEC):
+    """
+    Simpan storage_state + metadata expiry. Expiry = yang paling cepat antara
+    umur maksimal dan cookie persisten milik host device.
+    """
+    state = context.storage_state(path=str(state_path))
+    write_state_meta(state, state_path, base_url, max_age_sec)
+
+def write_state_meta(state: dict, state_path: Path, base_url: str, max_age_sec: float = STATE_MAX_AGE_SEC):
+    """Tulis metadata expiry untuk hasil `context.storage_state()` (dipakai juga core.aio.auth)."""
+    now = time.time()
+    host = urlparse(base_url).hostname or ""
+    expiries = [
+        float(c["expires"])
+        for c in state.get("cookies", [])
+        if float(c.get("expires", -1)) > 0 and host.endswith(c.get("domain", "").lstrip("."))
+    ]
+    meta = {"base_url": base_url, "saved_at": now, "expires_at": min([now + max_age_sec] + expiries)}
+    _meta_path(state_path).write_text(json.dumps(meta), encoding="utf-8")
+
+def invalidate_storage_state(state_path: Path):
+    for p in (state_path, _meta_path(state_path)):
+        try:
+            p.unlink()
+        except OSError:
+            pass
+
+@tracing.traced("auth.restore")
+def restore_session(page: Page, base_url: str, timeout_ms: int = 15_000) -> bool:
+    """
+    Buka dashboard langsung dengan cookie/localStorage yang sudah dimuat di context.
+    True jika dashboard muncul tanpa form login.
+    """
+    goto_with_retry(page, base_url.rstrip("/"))
+    try:
+        page.wait_for_selector(", ".join(DASHBOARD_PROBES + [SEL_USER]), state="visible", timeout=timeout_ms)
+    except Error:
+        return False
+    # SPA bisa sempat render dashboard lalu redirect ke /login setelah API menolak sesi
+    try:
+        page.wait_for_load_state("networkidle", timeout=2_000)
+    except Error:
+        pass
+    if "/login" in (page.url or ""):
+        return False
+    try:
+        ok = any(page.locator(sel).first.is_visible() for sel in DASHBOARD_PROBES)
+    except Error:
+        ok = False
+    tracing.annotate(ok=ok)
+    return ok
+
+@tracing.traced("auth.ensure")
+def ensure_logged_in(page: Page, base_url: str, username: str, password: str, try_restore: bool = False) -> str:
+    """
+    Dashboard siap dengan cara termurah: pulihkan sesi tersimpan bila `try_restore`,
+    fallback login penuh. Return "restored" atau "login".
+    """
+    navigate = True
+    if try_restore:
+        if restore_session(page, base_url):
+            print("[INFO] sesi tersimpan dipakai ulang, skip form login")
+            tracing.annotate(how="restored")
+            return "restored"
+        print("[INFO] sesi tersimpan tidak valid, login ulang")
+        try:
+            navigate = not page.locator(SEL_USER).first.is_visible()
+        except Error:
+            navigate = True
+    login(page, base_url, username, password, navigate=navigate)
+    wait_for_dashboard(page)
+    tracing.annotate(how="login", restore_tried=try_restore)
+    return "login"
@@ -0,0 +1,552 @@
+# core/backends.py
+"""
+Lapisan backend untuk operasi device:
+
+- PlaywrightBackend : lewat web UI (core/actions/*), selalu tersedia
+- HttpBackend       : langsung ke JSON API device (endpoint diambil dari traffic SPA,
+                      dipetakan di scenario YAML bagian `api:`)
+- FallbackBackend   : pakai HTTP untuk operasi yang dipetakan, sisanya ke Playwright
+
+Setiap operasi ditulis sebagai step `(op, args, kwargs)` supaya beberapa step
+yang jatuh ke Playwright bisa dijalankan dalam satu page session.
+"""
+from __future__ import annotations
+
+import re
+from threading import Lock
+from urllib.parse import quote
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import tracing
+from .actions.grid import apply_grid_state, assign_grid_pipelined
+from .actions.layouts import LAYOUT_LABELS, select_layout
+from .actions.sources import assign_source_to_grid, list_sources, set_source_url, set_source_urls
+
+Step = Tuple[str, tuple, dict]
+
+OPERATIONS = (
+    "list_sources", "select_layout", "assign_source_to_grid",
+    "set_source_url", "set_source_urls", "apply_grid_state", "assign_grid_pipelined",
+)
+# operasi baca boleh di-fallback ke browser jika HTTP gagal; operasi tulis tidak
+# (bisa jadi sudah ter-apply di device)
+READ_OPS = frozenset({"list_sources"})
+
+
+class OperationNotMapped(RuntimeError):
+    pass
+
+
+def _group_parents(groups: Sequence, parents: Optional[Sequence]) -> list:
+    return list(parents) if parents is not None else [tracing.current()] * len(groups)
+
+
+def _wants_snapshot(groups: Sequence[Sequence[Step]]) -> bool:
+    # batch yang sudah membaca list_sources (poll / GET /sources) tidak perlu snapshot tambahan
+    return bool(groups) and not any(op in READ_OPS for steps in groups for op, _, _ in steps)
+
+
+class Backend:
+    name = "base"
+
+    def supports(self, op: str) -> bool:
+        return False
+
+    def run_steps(self, steps: Sequence[Step]) -> List[Any]:
+        raise NotImplementedError
+
+    def run_groups(self, groups: Sequence[Sequence[Step]], parents: Optional[Sequence] = None) -> List[Any]:
+        """
+        Jalankan beberapa kelompok step berurutan; kegagalan satu kelompok tidak
+        menghentikan kelompok lain. Return per kelompok: list hasil atau exception.
+        `parents`: span induk per kelompok (lihat core.tracing), default span aktif.
+        """
+        out: List[Any] = []
+        for steps, parent in zip(groups, _group_parents(groups, parents)):
+            try:
+                with tracing.attach(parent):
+                    out.append(self.run_steps(steps))
+            except Exception as e:
+                out.append(e)
+        return out
+
+    def call(self, op: str, *args, **kwargs) -> Any:
+        return self.run_steps([(op, args, kwargs)])[0]
+
+    def cancel_running(self) -> bool:
+        """Batalkan eksekusi yang sedang jalan jika backend mendukung (engine async). True jika dibatalkan."""
+        return False
+
+    def list_sources(self) -> List[Dict[str, str]]:
+        return self.call("list_sources")
+
+    def select_layout(self, cells: int, confirm: bool = True) -> None:
+        return self.call("select_layout", cells, confirm=confirm)
+
+    def assign_source_to_grid(self, grid_index_1based: int, source_name: str) -> None:
+        return self.call("assign_source_to_grid", grid_index_1based, source_name)
+
+    def set_source_url(self, source_name: str, new_url: str) -> None:
+        return self.call("set_source_url", source_name, new_url)
+
+    def set_source_urls(self, pairs, skip_unchanged: bool = True, atomic: bool = False) -> List[Dict[str, str]]:
+        return self.call("set_source_urls", list(pairs), skip_unchanged=skip_unchanged, atomic=atomic)
+
+    def apply_grid_state(self, layout_cells, assigns, confirm: bool = True, dry_run: bool = False) -> dict:
+        return self.call("apply_grid_state", layout_cells, assigns, confirm=confirm, dry_run=dry_run)
+
+    def assign_grid_pipelined(self, assigns: Dict[int, str], pages: int = 1) -> dict:
+        return self.call("assign_grid_pipelined", assigns, pages=pages)
+
+    def info(self) -> dict:
+        return {"name": self.name, "operations": [op for op in OPERATIONS if self.supports(op)]}
+
+
+# =========================
+# Playwright (web UI)
+# =========================
+class PlaywrightBackend(Backend):
+    name = "playwright"
+
+    _ACTIONS: Dict[str, Callable] = {
+        "list_sources": list_sources,
+        "select_layout": select_layout,
+        "assign_source_to_grid": assign_source_to_grid,
+        "set_source_url": set_source_url,
+        "set_source_urls": set_source_urls,
+        "apply_grid_state": apply_grid_state,
+        "assign_grid_pipelined": assign_grid_pipelined,
+    }
+
+    def __init__(
+        self,
+        run_with_page: Callable[..., Any],
+        cancel: Optional[Callable[[], bool]] = None,
+        on_snapshot: Optional[Callable[[List[Dict[str, str]]], None]] = None,
+    ):
+        self._run = run_with_page
+        self._cancel = cancel
+        # page sudah terbuka untuk operasi tulis -> ambil list_sources sekalian (satu eval JS)
+        self.on_snapshot = on_snapshot
+        self.snapshots = 0
+
+    def supports(self, op: str) -> bool:
+        return op in self._ACTIONS
+
+    def cancel_running(self) -> bool:
+        return self._cancel() if self._cancel is not None else False
+
+    def _snapshot(self, page) -> None:
+        try:
+            with tracing.span("poll.piggyback"):
+                items = self._ACTIONS["list_sources"](page)
+        except Exception as e:
+            print(f"[WARN] snapshot sources setelah operasi gagal: {e}")
+            return
+        self.snapshots += 1
+        self.on_snapshot(items)
+
+    def info(self) -> dict:
+        return {**super().info(), "snapshots": self.snapshots}
+
+    def run_steps(self, steps: Sequence[Step]) -> List[Any]:
+        steps = list(steps)
+        if not steps:
+            return []
+        snapshot = self.on_snapshot is not None and _wants_snapshot([steps])
+
+        def _do(page):
+            out = [self._ACTIONS[op](page, *args, **kwargs) for op, args, kwargs in steps]
+            if snapshot:
+                self._snapshot(page)
+            return out
+
+        return self._run(_do)
+
+    def run_groups(self, groups: Sequence[Sequence[Step]], parents: Optional[Sequence] = None) -> List[Any]:
+        # semua kelompok dalam satu page session
+        groups = [list(g) for g in groups]
+        parents = _group_parents(groups, parents)
+        snapshot = self.on_snapshot is not None and _wants_snapshot(groups)
+
+        def _do(page):
+            out = []
+            for steps, parent in zip(groups, parents):
+                try:
+                    with tracing.attach(parent):
+                        out.append([self._ACTIONS[op](page, *args, **kwargs) for op, args, kwargs in steps])
+                except Exception as e:
+                    out.append(e)
+                    try:
+                        page.keyboard.press("Escape")
+                    except Exception:
+                        pass
+            if snapshot:
+                self._snapshot(page)
+            return out
+
+        return self._run(_do, len(groups))
+
+
+# =========================
+# HTTP (JSON API device)
+# =========================
+_PLACEHOLDER = re.compile(r"^\{(\w+)\}$")
+_PLACEHOLDER_ANY = re.compile(r"\{(\w+)\}")
+
+
+def _render(tpl: Any, params: dict, *, path: bool = False) -> Any:
+    """
+    Isi template path/query/json. "{x}" utuh dipertahankan tipenya (int tetap int).
+    Hanya {nama} yang ada di `params` yang diganti; kurung kurawal lain (mis. JSON
+    literal) dibiarkan. path=True: nilai di-encode sebagai segmen URL.
+    """
+    if isinstance(tpl, str):
+        m = _PLACEHOLDER.match(tpl)
+        if m and m.group(1) in params and not path:
+            return params[m.group(1)]
+
+        def _sub(m: "re.Match") -> str:
+            if m.group(1) not in params:
+                return m.group(0)
+            val = str(params[m.group(1)])
+            return quote(val, safe="") if path else val
+
+        return _PLACEHOLDER_ANY.sub(_sub, tpl)
+    if isinstance(tpl, dict):
+        return {k: _render(v, params, path=path) for k, v in tpl.items()}
+    if isinstance(tpl, list):
+        return [_render(v, params, path=path) for v in tpl]
+    return tpl
+
+
+def _dig(data: Any, path: Optional[str]) -> Any:
+    """Ambil nilai bersarang pakai dot-path, mis. "data.list" atau "result.0.id"."""
+    if not path:
+        return data
+    for part in path.split("."):
+        if isinstance(data, list) and part.isdigit():
+            data = data[int(part)]
+        elif isinstance(data, dict):
+            data = data.get(part)
+        else:
+            return None
+    return data
+
+
+class HttpBackend(Backend):
+    """
+    Contoh konfigurasi (scenario YAML), lihat scenarios/http_api.yaml.example:
+
+        api:
+          login: {method: POST, path: /api/login, json: {username: "{username}", password: "{password}"}}
+          operations:
+            list_sources:
+              method: GET
+              path: /api/sources
+              items_field: data.list
+              fields: {name: name, status: status, url: url, stream_id: id}
+    """
+
+    name = "http"
+
+    def __init__(
+        self,
+        base_url: str,
+        username: str,
+        password: str,
+        api_cfg: dict,
+        *,
+        timeout: float = 5.0,
+        pool_maxsize: int = 8,
+    ):
+        self.base_url = (api_cfg.get("base_url") or base_url).rstrip("/")
+        self.username = username
+        self.password = password
+        self.timeout = float(api_cfg.get("timeout") or timeout)
+        self.login_cfg: Optional[dict] = api_cfg.get("login")
+        self.ops: Dict[str, dict] = {k: v for k, v in (api_cfg.get("operations") or {}).items() if v}
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_maxsize)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._session.verify = bool(api_cfg.get("verify_tls", False))
+        self._login_lock = Lock()
+        self._logged_in = False
+        # hasil list_sources yang dipakai bersama step-step dalam satu run_steps
+        # (resolve stream_id & URL sekarang), bukan satu listing per item
+        self._listing: Optional[List[Dict[str, str]]] = None
+
+    def supports(self, op: str) -> bool:
+        if op == "set_source_urls":
+            return "set_source_url" in self.ops
+        return op in self.ops
+
+    def run_steps(self, steps: Sequence[Step]) -> List[Any]:
+        out = []
+        try:
+            for op, args, kwargs in steps:
+                if not self.supports(op):
+                    raise OperationNotMapped(f"operasi '{op}' belum dipetakan ke HTTP API")
+                out.append(getattr(self, f"_op_{op}")(*args, **kwargs))
+        finally:
+            self._listing = None
+        return out
+
+    # ---------- transport ----------
+    def _login(self) -> None:
+        cfg = self.login_cfg
+        data = self._send(cfg, {"username": self.username, "password": self.password})
+        token_field = cfg.get("token_field")
+        if token_field:
+            token = _dig(data, token_field)
+            if not token:
+                raise RuntimeError(f"Login API gagal, token '{token_field}' kosong: {data}")
+            header = cfg.get("token_header") or "Authorization"
+            self._session.headers[header] = (cfg.get("token_format") or "{token}").format(token=token)
+        self._logged_in = True
+
+    def _ensure_login(self, force: bool = False) -> None:
+        if not self.login_cfg:
+            return
+        with self._login_lock:
+            if force or not self._logged_in:
+                self._login()
+
+    def _send(self, spec: dict, params: dict) -> Any:
+        kwargs: Dict[str, Any] = {"timeout": self.timeout}
+        if "query" in spec:
+            kwargs["params"] = _render(spec["query"], params)
+        if "json" in spec:
+            kwargs["json"] = _render(spec["json"], params)
+        if "form" in spec:
+            kwargs["data"] = _render(spec["form"], params)
+        url = self.base_url + _render(spec["path"], params, path=True)
+        method = (spec.get("method") or "GET").upper()
+        with tracing.span("http.api", method=method, url=url) as sp:
+            r = self._session.request(method, url, **kwargs)
+            sp.set(status=r.status_code)
+        if r.status_code in (401, 403):
+            raise PermissionError(f"HTTP {r.status_code} {url}")
+        r.raise_for_status()
+        data = r.json() if r.content else None
+
+        ok_field = spec.get("ok_field")
+        if ok_field is not None:
+            got = _dig(data, ok_field)
+            if got != spec.get("ok_value", 0):
+                raise RuntimeError(f"API {url} menolak request ({ok_field}={got!r}): {data}")
+        return data
+
+    def _request(self, op: str, params: dict) -> Any:
+        spec = self.ops[op]
+        self._ensure_login()
+        try:
+            return self._send(spec, params)
+        except PermissionError:
+            # sesi API expired -> login ulang sekali
+            if not self.login_cfg:
+                raise
+            self._ensure_login(force=True)
+            return self._send(spec, params)
+
+    def _sources(self) -> List[Dict[str, str]]:
+        if self._listing is None:
+            self._listing = self._op_list_sources()
+        return self._listing
+
+    def _stream_id(self, name: str) -> str:
+        for it in self._sources():
+            if it["name"] == name:
+                return it["stream_id"]
+        raise RuntimeError(f"Source '{name}' tidak ditemukan.")
+
+    def _params_for(self, op: str, **params) -> dict:
+        # stream_id hanya di-resolve kalau template operasinya memakai {stream_id}
+        if "name" in params and "{stream_id}" in str(self.ops[op]):
+            params["stream_id"] = self._stream_id(params["name"])
+        return params
+
+    # ---------- operasi ----------
+    def _op_list_sources(self) -> List[Dict[str, str]]:
+        spec = self.ops["list_sources"]
+        data = self._request("list_sources", {})
+        return parse_source_items(data, spec)
+
+    def _op_select_layout(self, cells: int, confirm: bool = True) -> None:
+        label = LAYOUT_LABELS.get(cells)
+        if label is None:
+            raise ValueError(f"cells '{cells}' tidak didukung. Pilihan: {sorted(LAYOUT_LABELS.keys())}")
+        self._request("select_layout", {"cells": cells, "label": label, "confirm": confirm})
+
+    def _op_assign_source_to_grid(self, grid_index_1based: int, source_name: str) -> None:
+        params = self._params_for(
+            "assign_source_to_grid",
+            grid=grid_index_1based,
+            grid0=grid_index_1based - 1,
+            name=source_name,
+        )
+        self._request("assign_source_to_grid", params)
+
+    def _op_set_source_url(self, source_name: str, new_url: str) -> None:
+        params = self._params_for("set_source_url", name=source_name, url=new_url)
+        self._request("set_source_url", params)
+        # listing bersama tetap sesuai isi device untuk step berikutnya
+        for it in self._listing or []:
+            if it["name"] == source_name:
+                it["url"] = new_url
+
+    def _op_set_source_urls(self, pairs, skip_unchanged: bool = True, atomic: bool = False) -> List[Dict[str, str]]:
+        # hasil per item sama dengan core.actions.sources.set_source_urls
+        current = {}
+        if "list_sources" in self.ops:
+            for it in self._sources():
+                current.setdefault(it["name"], it["url"])
+        results, applied = [], []
+        for name, url in pairs:
+            res = {"name": name, "url": url}
+            if skip_unchanged and current.get(name) == url:
+                res["status"] = "unchanged"
+            else:
+                try:
+                    self._op_set_source_url(name, url)
+                    res["status"] = "updated"
+                    if name in current:
+                        applied.append((res, current[name]))
+                        current[name] = url
+                except Exception as e:
+                    res["status"] = "error"
+                    res["error"] = str(e)
+            results.append(res)
+
+        if atomic and any(r["status"] == "error" for r in results):
+            for res, old_url in reversed(applied):
+                try:
+                    self._op_set_source_url(res["name"], old_url)
+                    res["status"] = "reverted"
+                except Exception as e:
+                    res["error"] = f"rollback gagal: {e}"
+        return results
+
+
+def parse_source_items(data: Any, spec: dict) -> List[Dict[str, str]]:
+    """JSON respons API -> [{name, status, url, stream_id}] (bentuk sama dengan list_sources)."""
+    items = _dig(data, spec.get("items_field")) or []
+    fields = {"name": "name", "status": "status", "url": "url", "stream_id": "stream_id"}
+    fields.update(spec.get("fields") or {})
+    status_map = {str(k): v for k, v in (spec.get("status_map") or {}).items()}
+
+    out = []
+    for it in items:
+        row = {}
+        for key, path in fields.items():
+            val = _dig(it, path)
+            row[key] = "" if val is None else str(val)
+        row["status"] = status_map.get(row["status"], row["status"])
+        out.append(row)
+    return out
+
+
+# =========================
+# HTTP dulu, fallback Playwright
+# =========================
+class FallbackBackend(Backend):
+    name = "http+playwright"
+
+    def __init__(self, primary: Backend, fallback: Backend):
+        self.primary = primary
+        self.fallback = fallback
+
+    def supports(self, op: str) -> bool:
+        return self.primary.supports(op) or self.fallback.supports(op)
+
+    def run_steps(self, steps: Sequence[Step]) -> List[Any]:
+        results: List[Any] = []
+        pending: List[Step] = []  # step Playwright berurutan -> satu page session
+
+        def _flush():
+            if pending:
+                results.extend(self.fallback.run_steps(pending))
+                pending.clear()
+
+        for step in steps:
+            op = step[0]
+            if not self.primary.supports(op):
+                pending.append(step)
+                continue
+            _flush()
+            try:
+                results.extend(self.primary.run_steps([step]))
+            except Exception as e:
+                if op not in READ_OPS:
+                    raise
+                print(f"[WARN] {self.primary.name} {op} gagal ({e}), fallback ke {self.fallback.name}")
+                pending.append(step)
+        _flush()
+        return results
+
+    def run_groups(self, groups: Sequence[Sequence[Step]], parents: Optional[Sequence] = None) -> List[Any]:
+        # kelompok yang seluruhnya Playwright dan berurutan -> satu page session di fallback
+        groups = [list(g) for g in groups]
+        parents = _group_parents(groups, parents)
+        out: List[Any] = []
+        pending: List[int] = []
+
+        def _flush():
+            if pending:
+                out.extend(self.fallback.run_groups([groups[i] for i in pending], [parents[i] for i in pending]))
+                pending.clear()
+
+        for i, (steps, parent) in enumerate(zip(groups, parents)):
+            if not any(self.primary.supports(op) for op, _, _ in steps):
+                pending.append(i)
+                continue
+            _flush()
+            try:
+                with tracing.attach(parent):
+                    out.append(self.run_steps(steps))
+            except Exception as e:
+                out.append(e)
+        _flush()
+        return out
+
+    def cancel_running(self) -> bool:
+        return self.fallback.cancel_running()
+
+    def info(self) -> dict:
+        return {
+            "name": self.name,
+            "operations": {op: (self.primary.name if self.primary.supports(op) else self.fallback.name)
+                           for op in OPERATIONS},
+        }
+
+
+def make_backend(
+    scn: dict,
+    run_with_page: Callable[..., Any],
+    *,
+    engine: str = "sync",
+    cancel: Optional[Callable[[], bool]] = None,
+    on_snapshot: Optional[Callable[[List[Dict[str, str]]], None]] = None,
+) -> Backend:
+    """
+    Backend sesuai scenario: tanpa `api:` -> Playwright saja.
+    engine="async": aksi dari core.aio.actions, `run_with_page` menerima coroutine function.
+    `on_snapshot(items)`: hasil list_sources yang diambil setelah operasi tulis lewat browser.
+    `run_with_page(fn, jobs=1)`: `jobs` = jumlah kelompok dalam satu page session (skala timeout).
+    """
+    if engine == "async":
+        from .aio.backends import AsyncPlaywrightBackend
+        pw_backend: Backend = AsyncPlaywrightBackend(run_with_page, cancel, on_snapshot)
+    else:
+        pw_backend = PlaywrightBackend(run_with_page, cancel, on_snapshot)
+    api_cfg = scn.get("api") or {}
+    if not api_cfg or api_cfg.get("enabled") is False or not api_cfg.get("operations"):
+        return pw_backend
+    creds = scn.get("login") or {}
+    http = HttpBackend(scn["base_url"], creds.get("username", ""), creds.get("password", ""), api_cfg)
+    return FallbackBackend(http, pw_backend)
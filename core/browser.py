@@ -1,32 +1,93 @@
-# core/browser.py
 from pathlib import Path
-from playwright.sync_api import sync_playwright
+from typing import Optional
+from playwright.sync_api import Route, sync_playwright
 import os
+import re
 
-def launch_browser(headless: bool = True, record_video: bool = False, out_dir: Path = Path("out")):
-    out_dir.mkdir(parents=True, exist_ok=True)
-    video_dir = out_dir / "videos"
-    if record_video:
-        video_dir.mkdir(parents=True, exist_ok=True)
+from . import tracing
 
-    pw = sync_playwright().start()
+# Profil "lean": otomasi hanya butuh DOM + script + XHR/WS dashboard, bukan
+# preview video, gambar, atau font. Semua itu di-abort sebelum keluar ke jaringan.
+LEAN_BLOCK_TYPES = {"media", "image", "font"}
 
-    # pilih engine via env BROWSER (chromium|firefox|webkit), default chromium
-    engine = (os.environ.get("BROWSER") or "chromium").lower()
-    launcher = {"chromium": pw.chromium, "firefox": pw.firefox, "webkit": pw.webkit}.get(engine, pw.chromium)
+# stream preview yang tidak selalu ditandai resource_type "media"
+# (MJPEG lewat <img>/fetch, HLS/FLV lewat XHR, snapshot periodik)
+LEAN_BLOCK_URL_RE = re.compile(
+    r"(\.(m3u8|ts|flv|mp4|webm|mjpe?g|jpe?g|png|gif|webp|ico|woff2?|ttf|otf)(\?|$))"
+    r"|(/(mjpeg|snapshot)(/|\?|$))",
+    re.IGNORECASE,
+)
+
+# flag Chromium: tanpa GPU/compositing & layanan latar yang tidak relevan
+LEAN_CHROMIUM_ARGS = [
+    "--disable-gpu",
+    "--disable-gpu-compositing",
+    "--disable-software-rasterizer",
+    "--disable-accelerated-video-decode",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-extensions",
+    "--disable-sync",
+    "--mute-audio",
+    "--autoplay-policy=user-gesture-required",
+    # preview WebRTC tidak bisa membuka jalur UDP langsung -> tidak ada stream
+    "--force-webrtc-ip-handling-policy=disable_non_proxied_udp",
+    "--disable-features=MediaRouter,OptimizationHints,Translate,BackForwardCache",
+]
 
-    browser = launcher.launch(headless=headless, args=["--no-sandbox", "--disable-dev-shm-usage"])
+def _lean_route(route: Route):
+    req = route.request
+    if req.resource_type in LEAN_BLOCK_TYPES or LEAN_BLOCK_URL_RE.search(req.url):
+        route.abort("blockedbyclient")
+    else:
+        route.continue_()
 
-    ctx_kwargs = dict(
+def context_options(out_dir: Path, record_video: bool = False, storage_state: Optional[Path] = None) -> dict:
+    """Opsi new_context yang sama untuk engine sync & async (core.aio.browser)."""
+    opts = dict(
         viewport={"width": 1366, "height": 768},
         device_scale_factor=1,
         service_workers="block",      # hindari detach/error dari SW
         ignore_https_errors=True,
     )
     if record_video:
-        ctx_kwargs["record_video_dir"] = str(video_dir)
+        video_dir = out_dir / "videos"
+        video_dir.mkdir(parents=True, exist_ok=True)
+        opts["record_video_dir"] = str(video_dir)
+    if storage_state is not None:
+        # cookie/localStorage sesi sebelumnya (lihat core.auth.ensure_logged_in)
+        opts["storage_state"] = str(storage_state)
+    return opts
+
+@tracing.traced("browser.launch")
+def launch_browser(
+    headless: bool = True,
+    record_video: bool = False,
+    out_dir: Path = Path("out"),
+    storage_state: Optional[Path] = None,
+    profile: Optional[str] = None,
+):
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    # profil via env BROWSER_PROFILE (full|lean), default full
+    profile = (profile or os.environ.get("BROWSER_PROFILE") or "full").lower()
+    lean = profile == "lean"
+
+    pw = sync_playwright().start()
+
+    # pilih engine via env BROWSER (chromium|firefox|webkit), default chromium
+    engine = (os.environ.get("BROWSER") or "chromium").lower()
+    launcher = {"chromium": pw.chromium, "firefox": pw.firefox, "webkit": pw.webkit}.get(engine, pw.chromium)
+    tracing.annotate(engine=engine, profile=profile, storage_state=storage_state is not None)
+
+    args = ["--no-sandbox", "--disable-dev-shm-usage"]
+    if lean and launcher is pw.chromium:
+        args += LEAN_CHROMIUM_ARGS
+    browser = launcher.launch(headless=headless, args=args)
 
-    context = browser.new_context(**ctx_kwargs)
+    context = browser.new_context(**context_options(out_dir, record_video, storage_state))
+    if lean:
+        context.route("**/*", _lean_route)
     page = context.new_page()
     return pw, browser, context, page
-    
\ No newline at end of file
@@ -0,0 +1,281 @@
+# core/device_queue.py
+"""
+Antrian operasi per device (pengganti `_device_lock` + handler sync).
+
+- pemanggil submit daftar step lalu menunggu Future (bisa di-await dari asyncio)
+- request baca identik yang masih antre / sedang jalan digabung (coalescing)
+- write berurutan di antrean digabung jadi satu eksekusi backend
+  (satu page session), tapi error tetap terisolasi per request
+- kedalaman antrean & waktu tunggu tersedia lewat stats()
+- pemanggil async yang berhenti menunggu (client disconnect / timeout) membatalkan
+  job-nya bila tidak dipakai bersama: yang masih antre dibuang, yang sedang jalan
+  sendirian dibatalkan lewat backend.cancel_running() (engine async)
+- job `background` (poll cache) selalu mengalah: job pemanggil biasa yang masuk
+  belakangan diambil lebih dulu; `after_write` dipanggil setelah batch write selesai
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from threading import Condition, Thread
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence
+
+from . import metrics, tracing
+from .backends import READ_OPS, Backend, Step
+
+
+@dataclass(eq=False)
+class _Job:
+    steps: List[Step]
+    read: bool
+    key: Optional[str]
+    future: Future = field(default_factory=Future)
+    span: Optional[tracing.Span] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+    waiters: int = 1
+    background: bool = False
+
+
+def _op_label(steps: Sequence[Step]) -> str:
+    return "+".join(dict.fromkeys(op for op, _, _ in steps))
+
+
+def _job_key(steps: Sequence[Step]) -> str:
+    return repr([(op, tuple(args), sorted(kwargs.items())) for op, args, kwargs in steps])
+
+
+class DeviceQueue:
+    def __init__(self, backend: Backend, *, name: str = "default", max_merge: int = 20):
+        self.backend = backend
+        self.name = name
+        self.max_merge = max_merge
+
+        self._cv = Condition()
+        self._pending: Deque[_Job] = deque()
+        self._by_key: Dict[str, _Job] = {}  # read yang antre / sedang jalan
+        self._running: List[_Job] = []
+        self._stop = False
+        self._thread: Optional[Thread] = None
+        # dipanggil (di thread worker) setelah batch write selesai, mis. percepat poll
+        self.after_write: Optional[Callable[[], None]] = None
+        self.last_foreground_at: Optional[float] = None  # monotonic, job non-background terakhir selesai
+
+        # statistik
+        self.submitted = 0
+        self.coalesced = 0
+        self.merged = 0
+        self.batches = 0
+        self.cancelled = 0
+        self.preempted = 0
+        self._waits_ms: Deque[float] = deque(maxlen=500)
+
+    # ---------- API publik ----------
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop = False
+        self._thread = Thread(target=self._loop, name=f"device-queue-{self.name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, steps: Sequence[Step], *, read: bool = False, background: bool = False) -> Future:
+        return self._submit(steps, read=read, background=background).future
+
+    def _submit(self, steps: Sequence[Step], *, read: bool = False, background: bool = False) -> _Job:
+        self.start()
+        steps = list(steps)
+        key = _job_key(steps) if read else None
+        with self._locked():
+            self.submitted += 1
+            if key is not None and key in self._by_key:
+                self.coalesced += 1
+                tracing.annotate(coalesced=True)
+                shared = self._by_key[key]
+                shared.waiters += 1
+                if shared.background and not background:
+                    # pemanggil biasa menumpang poll yang masih antre -> naikkan prioritasnya
+                    shared.background = False
+                    if shared in self._pending:
+                        self._pending.remove(shared)
+                        self._enqueue(shared)
+                return shared
+            job = _Job(steps=steps, read=read, key=key, background=background)
+            job.span = tracing.start_span(
+                "device.op", device=self.name, ops=[s[0] for s in steps], read=read, background=background,
+            )
+            if key is not None:
+                self._by_key[key] = job
+            else:
+                # read setelah write ini harus melihat hasil write -> jangan digabung ke read lama
+                self._by_key.clear()
+            self._enqueue(job)
+            self._cv.notify()
+        return job
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Lock antrean dari sisi pemanggil (route); waktu tunggunya masuk LOCK_WAIT."""
+        t0 = time.perf_counter()
+        with self._cv:
+            metrics.LOCK_WAIT.observe(time.perf_counter() - t0, lock="queue")
+            yield
+
+    def _enqueue(self, job: _Job) -> None:
+        # job biasa disisipkan sebelum job background pertama (poll selalu boleh ditunda;
+        # read background yang tertunda tetap melihat hasil write yang menyalipnya)
+        if not job.background:
+            for i, other in enumerate(self._pending):
+                if other.background:
+                    self._pending.insert(i, job)
+                    self.preempted += 1
+                    return
+        self._pending.append(job)
+
+    def foreground_busy(self) -> bool:
+        """True jika ada job non-background yang antre atau sedang jalan."""
+        with self._cv:
+            return any(not j.background for j in self._pending) or any(not j.background for j in self._running)
+
+    def run_sync(
+        self, steps: Sequence[Step], *, read: bool = False, background: bool = False, timeout: Optional[float] = None,
+    ) -> List[Any]:
+        return self.submit(steps, read=read, background=background).result(timeout=timeout)
+
+    async def run(self, steps: Sequence[Step], *, read: bool = False, timeout: Optional[float] = None) -> List[Any]:
+        # shield: Future bisa dipakai bersama beberapa pemanggil (coalescing),
+        # jadi pembatalan satu pemanggil tidak boleh membatalkan yang lain
+        job = self._submit(steps, read=read)
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job.future)), timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            self.abandon(job)
+            raise
+
+    async def call(self, op: str, *args, **kwargs) -> Any:
+        return (await self.run([(op, args, kwargs)], read=op in READ_OPS))[0]
+
+    def abandon(self, job: _Job) -> None:
+        """Satu pemanggil berhenti menunggu `job`; batalkan jika tidak ada pemanggil lain."""
+        with self._locked():
+            job.waiters -= 1
+            if job.waiters > 0 or job.future.done():
+                return
+            if job in self._pending:
+                self._pending.remove(job)
+                if job.key is not None and self._by_key.get(job.key) is job:
+                    del self._by_key[job.key]
+                job.future.cancel()
+                job.span.set(cancelled="queued")
+                job.span.finish()
+                self.cancelled += 1
+                return
+            # write yang digabung dengan job lain tidak dibatalkan (hasil job lain ikut hilang)
+            alone = len(self._running) == 1 and self._running[0] is job
+        if alone and self.backend.cancel_running():
+            job.span.set(cancelled="running")
+            self.cancelled += 1
+
+    def close(self, timeout: float = 5.0) -> None:
+        with self._cv:
+            self._stop = True
+            self._cv.notify_all()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+
+    def stats(self) -> dict:
+        with self._cv:
+            depth, running = len(self._pending), len(self._running)
+            waits = list(self._waits_ms)
+        waits.sort()
+
+        def pct(p: float) -> Optional[float]:
+            if not waits:
+                return None
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))], 1)
+
+        return {
+            "name": self.name,
+            "depth": depth,
+            "running": running,
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "merged": self.merged,
+            "batches": self.batches,
+            "cancelled": self.cancelled,
+            "preempted": self.preempted,
+            "wait_ms": {"p50": pct(0.50), "p95": pct(0.95), "max": round(waits[-1], 1) if waits else None},
+        }
+
+    # ---------- worker ----------
+    def _take_batch(self) -> List[_Job]:
+        job = self._pending.popleft()
+        batch = [job]
+        if not job.read:
+            while self._pending and not self._pending[0].read and len(batch) < self.max_merge:
+                batch.append(self._pending.popleft())
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            with self._cv:
+                while not self._pending and not self._stop:
+                    self._cv.wait()
+                if self._stop and not self._pending:
+                    return
+                batch = self._take_batch()
+                self._running = batch
+
+            now = time.monotonic()
+            live = []
+            for job in batch:
+                wait_ms = (now - job.enqueued_at) * 1000.0
+                with self._cv:
+                    self._waits_ms.append(wait_ms)
+                metrics.QUEUE_WAIT.observe(wait_ms / 1000.0, device=self.name)
+                job.span.set(wait_ms=round(wait_ms, 1), batch=len(batch))
+                if job.future.set_running_or_notify_cancel():
+                    live.append(job)
+                else:
+                    job.span.finish()
+            self.batches += 1
+            self.merged += len(batch) - 1
+
+            t_batch = time.perf_counter()
+            try:
+                # batch satu job: launch/login di session ikut masuk trace job itu
+                with tracing.attach(live[0].span if len(live) == 1 else None):
+                    outcomes = self.backend.run_groups(
+                        [job.steps for job in live], parents=[job.span for job in live],
+                    ) if live else []
+            except Exception as e:
+                outcomes = [e] * len(live)
+            metrics.BATCH_SECONDS.observe(time.perf_counter() - t_batch, device=self.name)
+
+            done = time.monotonic()
+            for job, out in zip(live, outcomes):
+                op = _op_label(job.steps)
+                metrics.OP_SECONDS.observe(done - job.enqueued_at, device=self.name, op=op)
+                if isinstance(out, BaseException):
+                    metrics.OP_FAILURES.inc(device=self.name, op=op)
+                    job.span.finish(out)
+                    job.future.set_exception(out)
+                else:
+                    job.span.finish()
+                    job.future.set_result(out)
+
+            with self._cv:
+                for job in batch:
+                    if job.key is not None and self._by_key.get(job.key) is job:
+                        del self._by_key[job.key]
+                self._running = []
+                if any(not job.background for job in batch):
+                    self.last_foreground_at = done
+
+            if self.after_write is not None and not batch[0].read:
+                try:
+                    self.after_write()
+                except Exception as e:
+                    print(f"[WARN] after_write queue '{self.name}' gagal: {e}")
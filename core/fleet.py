@@ -0,0 +1,338 @@
+# core/fleet.py
+"""
+Banyak decoder sekaligus: setiap device punya browser session, backend,
+antrean operasi, watcher, cache & poller sendiri.
+"""
+from __future__ import annotations
+
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Thread
+from typing import Dict, List, Optional
+
+import yaml
+
+from . import metrics, tracing
+from .aio import loop as aio_loop
+from .aio.auth import ensure_logged_in as aio_ensure_logged_in, save_storage_state as aio_save_storage_state
+from .aio.browser import launch_browser as aio_launch_browser
+from .aio.session import AsyncBrowserSession
+from .auth import ensure_logged_in, save_storage_state, saved_state_if_fresh
+from .backends import make_backend
+from .browser import launch_browser
+from .device_queue import DeviceQueue
+from .poll_scheduler import PollScheduler
+from .session import BrowserSession
+from .source_cache import SourceCache
+from .watcher import SourceWatcher
+
+_NAME_OK = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+@dataclass
+class DeviceSettings:
+    warm_session: bool = True
+    health_interval: float = 30.0
+    op_timeout: float = 180.0
+    watch: bool = False
+    watch_resync: int = 300
+    poll_interval: int = 20
+    # poll adaptif (lihat core/poll_scheduler.py); None = sama dengan poll_interval (tetap)
+    poll_fast: Optional[float] = None
+    poll_max: Optional[float] = None
+    poll_error_max: Optional[float] = None
+    poll_yield: float = 2.0  # poll ditunda selama ada / baru saja ada operasi user
+    poll_piggyback: bool = True
+    queue_max_merge: int = 20
+    restore_state: bool = True
+    state_max_age: float = 12 * 3600
+    browser_profile: Optional[str] = None
+    engine: str = "sync"  # "sync" (thread per device) | "async" (core.aio, satu event loop)
+
+
+def load_scenarios(spec: str) -> Dict[str, dict]:
+    """
+    `spec` bisa berupa file YAML, direktori berisi *.yaml / *.yml, atau beberapa
+    path dipisah koma. Nama device = field `name` di YAML, fallback nama file.
+    """
+    paths: List[Path] = []
+    for part in (p.strip() for p in spec.split(",")):
+        if not part:
+            continue
+        p = Path(part)
+        if p.is_dir():
+            paths += sorted(x for x in p.iterdir() if x.suffix in (".yaml", ".yml"))
+        elif p.exists():
+            paths.append(p)
+        else:
+            raise RuntimeError(f"Scenario YAML tidak ditemukan: {part}")
+    if not paths:
+        raise RuntimeError(f"Tidak ada scenario YAML di: {spec}")
+
+    out: Dict[str, dict] = {}
+    for p in paths:
+        with open(p, "r", encoding="utf-8") as f:
+            scn = yaml.safe_load(f) or {}
+        creds = scn.get("login") or {}
+        if not scn.get("base_url") or "username" not in creds or "password" not in creds:
+            raise RuntimeError(f"Scenario YAML harus berisi base_url dan login.username/password: {p}")
+        name = str(scn.get("name") or p.stem)
+        if not _NAME_OK.match(name):
+            raise RuntimeError(f"Nama device tidak valid '{name}' ({p}); pakai huruf/angka/_-.")
+        if name in out:
+            raise RuntimeError(f"Nama device duplikat '{name}' ({p})")
+        out[name] = scn
+    return out
+
+
+class Device:
+    def __init__(self, name: str, scn: dict, *, out_dir: Path, settings: DeviceSettings):
+        self.name = name
+        self.scn = scn
+        self.base_url = scn["base_url"]
+        self.creds = scn["login"]
+        self.out_dir = out_dir
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.settings = settings
+
+        watch = settings.watch and settings.warm_session
+        self.is_async = settings.engine == "async"
+        session_kwargs = dict(
+            name=name,
+            headless=True,
+            out_dir=out_dir,
+            health_interval=settings.health_interval,
+            restore_state=settings.restore_state,
+            state_max_age=settings.state_max_age,
+            profile=settings.browser_profile,
+        )
+        if self.is_async:
+            # event di-dispatch oleh event loop, tidak perlu pump_interval
+            self.session = AsyncBrowserSession(
+                self.base_url, self.creds["username"], self.creds["password"], **session_kwargs,
+            )
+        else:
+            self.session = BrowserSession(
+                self.base_url, self.creds["username"], self.creds["password"],
+                pump_interval=0.2 if watch else None, **session_kwargs,
+            )
+        # HTTP API langsung jika dipetakan di scenario (`api:`), sisanya via browser
+        cancel = self.session.cancel_current if self.is_async and settings.warm_session else None
+        self.backend = make_backend(
+            scn, self.run_with_page, engine="async" if self.is_async else "sync", cancel=cancel,
+            on_snapshot=self._on_snapshot if settings.poll_piggyback else None,
+        )
+        # read identik digabung, write berurutan dijalankan dalam satu page session
+        self.queue = DeviceQueue(self.backend, name=name, max_merge=settings.queue_max_merge)
+
+        self.cache_path = out_dir / "sources_cache.json"
+        # berversi: revisi + ETag + riwayat delta, tulis atomik hanya jika isi berubah
+        self.cache = SourceCache(self.cache_path)
+
+        self.watcher: Optional[SourceWatcher] = None
+        if watch:
+            self.watcher = SourceWatcher(self.set_cache, watch_cfg=(scn.get("api") or {}).get("watch"))
+            self.session.page_hooks.append(self.watcher.attach_async if self.is_async else self.watcher.attach)
+
+        # mode watch: perubahan sudah di-push, poll hanya resync dengan interval tetap
+        if watch:
+            self.scheduler = PollScheduler(settings.watch_resync)
+        else:
+            self.scheduler = PollScheduler(
+                settings.poll_interval,
+                fast=settings.poll_fast,
+                max_interval=settings.poll_max,
+                error_max=settings.poll_error_max,
+            )
+        self.queue.after_write = self.scheduler.kick
+
+        self._poller: Optional[Thread] = None
+
+    # ---------- eksekusi dengan page ----------
+    def run_with_page(self, fn, jobs: int = 1):
+        # `jobs`: jumlah job yang digabung dalam satu eksekusi -> timeout ikut diskalakan
+        timeout = self.settings.op_timeout * max(1, jobs)
+        if self.settings.warm_session:
+            return self.session.run(fn, timeout=timeout)
+        if self.is_async:
+            return aio_loop.run(self._run_with_cold_page_async(fn, tracing.current()), timeout=timeout)
+        return self._run_with_cold_page(fn)
+
+    def _run_with_cold_page(self, fn):
+        state_path = self.out_dir / "storage_state.json"
+        state = saved_state_if_fresh(state_path, self.base_url) if self.settings.restore_state else None
+        t0 = time.perf_counter()
+        pw, browser, context, page = launch_browser(
+            headless=True,
+            record_video=False,
+            out_dir=self.out_dir,
+            storage_state=state,
+            profile=self.settings.browser_profile,
+        )
+        metrics.BROWSER_LAUNCH.observe(time.perf_counter() - t0, device=self.name)
+        try:
+            t0 = time.perf_counter()
+            how = ensure_logged_in(
+                page, self.base_url, self.creds["username"], self.creds["password"], try_restore=state is not None,
+            )
+            metrics.BROWSER_LOGIN.observe(time.perf_counter() - t0, device=self.name, how=how)
+            result = fn(page)
+            if how == "login":
+                try:
+                    save_storage_state(context, state_path, self.base_url, self.settings.state_max_age)
+                except Exception:
+                    pass
+            return result
+        finally:
+            browser.close()
+            pw.stop()
+
+    async def _run_with_cold_page_async(self, fn, parent):
+        state_path = self.out_dir / "storage_state.json"
+        state = saved_state_if_fresh(state_path, self.base_url) if self.settings.restore_state else None
+        with tracing.attach(parent):
+            t0 = time.perf_counter()
+            pw, browser, context, page = await aio_launch_browser(
+                headless=True,
+                record_video=False,
+                out_dir=self.out_dir,
+                storage_state=state,
+                profile=self.settings.browser_profile,
+            )
+            metrics.BROWSER_LAUNCH.observe(time.perf_counter() - t0, device=self.name)
+            try:
+                t0 = time.perf_counter()
+                how = await aio_ensure_logged_in(
+                    page, self.base_url, self.creds["username"], self.creds["password"], try_restore=state is not None,
+                )
+                metrics.BROWSER_LOGIN.observe(time.perf_counter() - t0, device=self.name, how=how)
+                result = await fn(page)
+                if how == "login":
+                    try:
+                        await aio_save_storage_state(context, state_path, self.base_url, self.settings.state_max_age)
+                    except Exception:
+                        pass
+                return result
+            finally:
+                await browser.close()
+                await pw.stop()
+
+    # ---------- cache & poller ----------
+    def set_cache(self, data):
+        self.cache.set_data(data)
+
+    def _set_cache_error(self, msg: str):
+        self.cache.set_error(msg)
+
+    def _on_snapshot(self, data):
+        # list_sources yang diambil backend setelah operasi tulis (page sudah terbuka)
+        self.scheduler.record(self.cache.set_data(data))
+
+    def poll_sources_once(self) -> bool:
+        """Satu poll (job background di antrean). Return True jika isi cache berubah."""
+        with tracing.span("poll.cycle", device=self.name), metrics.POLL_SECONDS.time(device=self.name):
+            data = self.queue.run_sync(
+                [("list_sources", (), {})], read=True, background=True, timeout=self.settings.op_timeout,
+            )[0]
+        return self.cache.set_data(data)
+
+    def _poll(self, what: str) -> None:
+        try:
+            self.scheduler.record(self.poll_sources_once())
+        except Exception as e:
+            metrics.POLL_FAILURES.inc(device=self.name)
+            self.scheduler.record_error()
+            self._set_cache_error(f"{what} failed: {e}")
+
+    def _user_active(self) -> bool:
+        last = self.queue.last_foreground_at
+        return self.queue.foreground_busy() or (
+            last is not None and time.monotonic() - last < self.settings.poll_yield
+        )
+
+    def _poller_loop(self):
+        self.cache.load()
+        if self.watcher is not None:
+            # page harus terbuka walau list_sources dilayani HTTP backend
+            self.session.warm()
+        # seed awal (tidak blocking kalau error)
+        self._poll("initial poll")
+
+        sched = self.scheduler
+        while sched.wait():
+            # operasi user didahulukan; ditunda paling lama max_interval supaya cache tidak basi
+            give_up = time.monotonic() + sched.max_interval
+            while self._user_active() and time.monotonic() < give_up:
+                sched.deferred += 1
+                if not sched.wait(self.settings.poll_yield):
+                    return
+            # snapshot piggyback barusan mengisi cache -> tidak perlu poll
+            # (mode watch tidak: resync justru pengaman untuk event yang terlewat)
+            fresh = self.cache.data_at is not None and time.time() - self.cache.data_at < sched.fast
+            if self.watcher is None and fresh:
+                sched.skipped += 1
+                continue
+            self._poll("poll")
+
+    # ---------- lifecycle ----------
+    def start(self):
+        self.scheduler.start()
+        self._poller = Thread(target=self._poller_loop, name=f"sources-poller-{self.name}", daemon=True)
+        self._poller.start()
+
+    def stop(self):
+        self.scheduler.stop()
+        if self._poller and self._poller.is_alive():
+            self._poller.join(timeout=5)
+        self.queue.close()
+        if self.settings.warm_session:
+            self.session.close()
+
+    def info(self) -> dict:
+        return {
+            "name": self.name,
+            "base_url": self.base_url,
+            "session": self.session.info() if self.settings.warm_session else None,
+            "backend": self.backend.info(),
+            "watcher": self.watcher.info() if self.watcher is not None else None,
+            "queue": self.queue.stats(),
+            "cache": self.cache.info(),
+            "poll": self.scheduler.info(),
+        }
+
+
+class Fleet:
+    def __init__(self, scenarios: Dict[str, dict], *, out_dir: Path, settings: DeviceSettings):
+        # satu device -> file di out/ langsung (kompatibel dengan versi single-device)
+        single = len(scenarios) == 1
+        self.devices: Dict[str, Device] = {
+            name: Device(name, scn, out_dir=out_dir if single else out_dir / "devices" / name, settings=settings)
+            for name, scn in scenarios.items()
+        }
+        self.default = next(iter(self.devices.values()))
+
+    def get(self, name: Optional[str]) -> Device:
+        if name is None:
+            return self.default
+        try:
+            return self.devices[name]
+        except KeyError:
+            raise KeyError(f"Device '{name}' tidak dikenal. Pilihan: {sorted(self.devices)}")
+
+    def select(self, names: Optional[List[str]]) -> List[Device]:
+        if not names:
+            return list(self.devices.values())
+        return [self.get(n) for n in names]
+
+    def start(self):
+        for dev in self.devices.values():
+            dev.start()
+
+    def stop(self):
+        for dev in self.devices.values():
+            dev.stop()
+
+    def __len__(self):
+        return len(self.devices)
@@ -0,0 +1,198 @@
+# core/metrics.py
+"""
+Registry metrik minimal berformat teks Prometheus (tanpa prometheus_client).
+
+Counter & Histogram diperbarui langsung di titik kejadian; Gauge yang berupa
+snapshot (kedalaman antrean, umur cache, status source, subscriber SSE, RSS Chromium) diisi
+ulang oleh handler GET /metrics sesaat sebelum render, di bawah SCRAPE_LOCK supaya
+scrape yang bersamaan tidak melihat registry yang baru setengah terisi.
+"""
+from __future__ import annotations
+
+import math
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+LabelKey = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _esc(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._lock = Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: label {sorted(labels)} != {sorted(self.labelnames)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _labels(self, key: LabelKey, extra: str = "") -> str:
+        parts = [f'{n}="{_esc(v)}"' for n, v in zip(self.labelnames, key)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *a, **kw):
+        super().__init__(*a, **kw)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{self._labels(k)} {_fmt(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *a, **kw):
+        super().__init__(*a, **kw)
+        self._values: Dict[LabelKey, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{self._labels(k)} {_fmt(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._values: Dict[LabelKey, list] = {}  # key -> [counts per bucket..., sum, count]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        out = []
+        for key, row in items:
+            for b, n in zip(self.buckets, row):
+                le = 'le="%s"' % _fmt(b)
+                out.append(f"{self.name}_bucket{self._labels(key, le)} {n}")
+            out.append(f"{self.name}_sum{self._labels(key)} {_fmt(row[-2])}")
+            out.append(f"{self.name}_count{self._labels(key)} {row[-1]}")
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def _add(self, m):
+        self._metrics.append(m)
+        return m
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in self._metrics:
+            lines += m.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+# dipegang selama gauge snapshot dikosongkan + diisi ulang + di-render
+SCRAPE_LOCK = Lock()
+
+# ---------- operasi device ----------
+OP_SECONDS = REGISTRY.histogram(
+    "kv_device_op_seconds", "Durasi operasi device dari submit sampai selesai (termasuk antre)", ["device", "op"])
+OP_FAILURES = REGISTRY.counter("kv_device_op_failures_total", "Operasi device yang gagal", ["device", "op"])
+QUEUE_WAIT = REGISTRY.histogram(
+    "kv_queue_wait_seconds", "Waktu tunggu di antrean device sebelum dieksekusi", ["device"])
+BATCH_SECONDS = REGISTRY.histogram(
+    "kv_queue_batch_seconds", "Durasi eksekusi satu batch antrean (write yang digabung)", ["device"])
+QUEUE_DEPTH = REGISTRY.gauge("kv_queue_depth", "Job yang sedang antre", ["device"])
+LOCK_WAIT = REGISTRY.histogram(
+    "kv_lock_wait_seconds", "Waktu tunggu lock (device = endpoint non-antrean, queue = antrean device)", ["lock"])
+
+# ---------- browser ----------
+BROWSER_LAUNCH = REGISTRY.histogram("kv_browser_launch_seconds", "Durasi launch browser", ["device"])
+BROWSER_LOGIN = REGISTRY.histogram(
+    "kv_browser_login_seconds", "Durasi sampai dashboard siap (how=restored|login)", ["device", "how"])
+SESSION_READY = REGISTRY.gauge("kv_session_ready", "1 jika browser session warm siap", ["device"])
+CHROMIUM_PROCESSES = REGISTRY.gauge("kv_chromium_processes", "Jumlah proses Chromium milik controller")
+CHROMIUM_RSS = REGISTRY.gauge("kv_chromium_rss_bytes", "Total RSS proses Chromium")
+CHROMIUM_CPU = REGISTRY.gauge("kv_chromium_cpu_seconds", "Total CPU time proses Chromium yang masih hidup")
+
+# ---------- poller & cache ----------
+POLL_SECONDS = REGISTRY.histogram("kv_poll_duration_seconds", "Durasi satu siklus poll list_sources", ["device"])
+POLL_FAILURES = REGISTRY.counter("kv_poll_failures_total", "Siklus poll yang gagal", ["device"])
+CACHE_AGE = REGISTRY.gauge("kv_sources_cache_age_seconds", "Umur cache sources (now - updated_at)", ["device"])
+SOURCE_STATUS = REGISTRY.gauge(
+    "kv_source_status", "1 untuk status source saat ini (Connected / Network Error / ...)",
+    ["device", "source", "status"])
+SOURCES_BY_STATUS = REGISTRY.gauge("kv_sources", "Jumlah source per status", ["device", "status"])
+SSE_SUBSCRIBERS = REGISTRY.gauge("kv_sse_subscribers", "Client yang terhubung ke /sources/stream", ["device"])
@@ -0,0 +1,130 @@
+# core/poll_scheduler.py
+"""
+Jadwal poll list_sources per device (pengganti interval tetap SOURCES_POLL_INTERVAL):
+
+- setelah write atau ada perubahan (status flap, source baru/hilang): beberapa
+  poll cepat berturut-turut (`fast`)
+- data stabil: interval naik 2x per poll sampai `max_interval`
+- device tidak terjangkau (poll gagal): backoff 2x sampai `error_max`
+- `kick()` membangunkan poller lebih awal (dipanggil setelah batch write)
+
+Yang memutuskan *kapan* ada di sini; poller di core/fleet.py yang menjalankan,
+sekaligus mengalah ke operasi user dan melewati poll jika snapshot piggyback
+masih segar.
+"""
+from __future__ import annotations
+
+import time
+from threading import Condition
+from typing import Optional
+
+
+class PollScheduler:
+    def __init__(
+        self,
+        interval: float,
+        *,
+        fast: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        error_max: Optional[float] = None,
+        fast_polls: int = 3,
+        stable_polls: int = 3,
+    ):
+        self.interval = interval
+        self.fast = min(fast if fast is not None else interval, interval)
+        self.max_interval = max(max_interval if max_interval is not None else interval, interval)
+        self.error_max = max(error_max if error_max is not None else self.max_interval, interval)
+        self.fast_polls = fast_polls
+        self.stable_polls = stable_polls  # poll tanpa perubahan sebelum mulai backoff
+
+        self._cv = Condition()
+        self._kicked = False
+        self._stopped = False
+        self._fast_left = 0
+        self._stable = 0
+        self._errors = 0
+        self.delay = interval  # jeda yang sedang/terakhir ditunggu
+
+        # statistik
+        self.polls = 0
+        self.kicks = 0
+        self.deferred = 0
+        self.skipped = 0
+
+    # ---------- input ----------
+    def record(self, changed: bool) -> None:
+        """Hasil poll / snapshot berhasil; `changed` = revisi cache baru."""
+        with self._cv:
+            self.polls += 1
+            self._errors = 0
+            if changed:
+                self._stable = 0
+                self._fast_left = self.fast_polls
+            else:
+                self._stable += 1
+                self._fast_left = max(0, self._fast_left - 1)
+
+    def record_error(self) -> None:
+        with self._cv:
+            self.polls += 1
+            self._errors += 1
+            self._fast_left = 0
+
+    def kick(self) -> None:
+        """Ada write ke device: poll cepat mulai sekarang."""
+        with self._cv:
+            self.kicks += 1
+            self._stable = 0
+            self._fast_left = self.fast_polls
+            self._kicked = True
+            self._cv.notify_all()
+
+    def start(self) -> None:
+        with self._cv:
+            self._stopped = False
+
+    def stop(self) -> None:
+        with self._cv:
+            self._stopped = True
+            self._cv.notify_all()
+
+    # ---------- jadwal ----------
+    def next_delay(self) -> float:
+        with self._cv:
+            if self._errors:
+                return min(self.error_max, self.interval * 2 ** min(self._errors - 1, 16))
+            if self._fast_left:
+                return self.fast
+            over = self._stable - self.stable_polls
+            if over < 0:
+                return self.interval
+            return min(self.max_interval, self.interval * 2 ** min(over + 1, 16))
+
+    def wait(self, delay: Optional[float] = None) -> bool:
+        """
+        Tunggu sampai jadwal poll berikutnya. `kick()` memendekkan jeda jadi `fast`
+        (dihitung dari saat kick). Return False jika scheduler dihentikan.
+        """
+        self.delay = self.next_delay() if delay is None else delay
+        deadline = time.monotonic() + self.delay
+        with self._cv:
+            while not self._stopped:
+                if self._kicked:
+                    self._kicked = False
+                    deadline = min(deadline, time.monotonic() + self.fast)
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return True
+                self._cv.wait(left)
+            return False
+
+    def info(self) -> dict:
+        return {
+            "delay": self.delay,
+            "next_delay": self.next_delay(),
+            "polls": self.polls,
+            "kicks": self.kicks,
+            "deferred": self.deferred,
+            "skipped": self.skipped,
+            "errors_in_row": self._errors,
+        }
@@ -0,0 +1,74 @@
+# core/procstats.py
+"""
+Jumlah proses, RSS & CPU Chromium yang dijalankan proses ini (lewat Playwright).
+Dibaca langsung dari /proc, jadi hanya Linux; di OS lain hasilnya None.
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+_PROC = Path("/proc")
+_BROWSER_NAMES = ("chrome", "chromium", "headless_shell")
+
+
+def _stat(pid: int) -> Optional[List[str]]:
+    try:
+        raw = (_PROC / str(pid) / "stat").read_text()
+    except OSError:
+        return None
+    # comm bisa berisi spasi/kurung -> potong setelah ')' terakhir
+    return raw[raw.rfind(")") + 2:].split()
+
+
+def _children_map() -> Dict[int, List[int]]:
+    children: Dict[int, List[int]] = {}
+    for d in _PROC.iterdir():
+        if not d.name.isdigit():
+            continue
+        st = _stat(int(d.name))
+        if st:
+            children.setdefault(int(st[1]), []).append(int(d.name))
+    return children
+
+
+def _descendants(root: int) -> List[int]:
+    children = _children_map()
+    out, todo = [], [root]
+    while todo:
+        for c in children.get(todo.pop(), []):
+            out.append(c)
+            todo.append(c)
+    return out
+
+
+def _is_browser(pid: int) -> bool:
+    try:
+        comm = (_PROC / str(pid) / "comm").read_text().strip().lower()
+    except OSError:
+        return False
+    return any(n in comm for n in _BROWSER_NAMES)
+
+
+def chromium_stats(root_pid: Optional[int] = None) -> Optional[dict]:
+    """
+    Return {"processes": n, "rss_mb": x, "rss_bytes": b, "cpu_sec": y} untuk semua proses browser
+    turunan `root_pid` (default: proses ini), atau None jika /proc tidak tersedia.
+    """
+    if not _PROC.is_dir():
+        return None
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    ticks = os.sysconf("SC_CLK_TCK")
+    n, rss, cpu = 0, 0, 0
+    for pid in _descendants(root_pid or os.getpid()):
+        if not _is_browser(pid):
+            continue
+        st = _stat(pid)
+        if not st:
+            continue
+        n += 1
+        # field 14/15 (utime/stime) & 24 (rss pages) di proc(5), offset -3 setelah comm
+        cpu += int(st[11]) + int(st[12])
+        rss += int(st[21]) * page_size
+    return {"processes": n, "rss_mb": round(rss / 2**20, 1), "rss_bytes": rss, "cpu_sec": round(cpu / ticks, 2)}
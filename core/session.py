@@ -0,0 +1,274 @@
+# core/session.py
+from __future__ import annotations
+
+import queue
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from threading import Event, Thread
+from typing import Any, Callable, List, Optional
+
+from playwright.sync_api import Error, Page
+
+from . import metrics, tracing, utils
+from .auth import (
+    STATE_MAX_AGE_SEC,
+    ensure_logged_in,
+    invalidate_storage_state,
+    save_storage_state,
+    saved_state_if_fresh,
+)
+from .browser import launch_browser
+from .ui_selectors import DASHBOARD_PROBES
+
+
+class BrowserSession:
+    """
+    Browser + page yang sudah login & dashboard-ready, dipakai ulang lintas request.
+
+    Sync API Playwright terikat ke thread yang membuatnya, jadi semua akses page
+    dijalankan di satu thread worker milik session ini. Pemanggil cukup
+    `run(fn)` / `submit(fn)` dengan `fn(page)`.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        username: str,
+        password: str,
+        *,
+        name: str = "default",
+        headless: bool = True,
+        out_dir: Path = utils.OUT_DIR,
+        health_interval: float = 30.0,
+        pump_interval: Optional[float] = None,
+        restore_state: bool = True,
+        state_max_age: float = STATE_MAX_AGE_SEC,
+        profile: Optional[str] = None,
+    ):
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.name = name
+        self.headless = headless
+        self.profile = profile  # None -> env BROWSER_PROFILE (lihat core.browser)
+        self.out_dir = out_dir
+        self.health_interval = health_interval
+        # pump_interval: saat idle, beri kesempatan Playwright men-dispatch event
+        # (page.on("response"), binding, websocket) tiap N detik. None = tidak perlu.
+        self.pump_interval = pump_interval
+        # dipanggil (di thread worker) setiap page selesai login / login ulang
+        self.page_hooks: List[Callable[[Page], None]] = []
+        # storage_state per device: launch berikutnya mencoba skip form login
+        self.restore_state = restore_state
+        self.state_max_age = state_max_age
+        self.state_path = out_dir / "storage_state.json"
+        self._state_loaded = False
+
+        # (fn, future, span induk pemanggil)
+        self._jobs: "queue.Queue[Optional[tuple[Callable[[Page], Any], Future, Optional[tracing.Span]]]]" = queue.Queue()
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+        self._pw = None
+        self._browser = None
+        self._context = None
+        self._page: Optional[Page] = None
+
+        # statistik ringan (untuk /health)
+        self.launches = 0
+        self.logins = 0
+        self.restores = 0
+        self.last_ready_at: Optional[float] = None
+
+    # ---------- API publik ----------
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._loop, name=f"browser-session-{self.name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable[[Page], Any]) -> Future:
+        self.start()
+        fut: Future = Future()
+        self._jobs.put((fn, fut, tracing.current()))
+        return fut
+
+    def run(self, fn: Callable[[Page], Any], timeout: Optional[float] = None) -> Any:
+        return self.submit(fn).result(timeout=timeout)
+
+    def warm(self) -> Future:
+        """Launch + login di background tanpa aksi apa pun."""
+        return self.submit(lambda page: None)
+
+    def close(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        self._jobs.put(None)
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+
+    @property
+    def is_ready(self) -> bool:
+        return self._page is not None
+
+    def info(self) -> dict:
+        return {
+            "name": self.name,
+            "ready": self.is_ready,
+            "launches": self.launches,
+            "logins": self.logins,
+            "restores": self.restores,
+            "last_ready_at": self.last_ready_at,
+            "pending": self._jobs.qsize(),
+        }
+
+    # ---------- worker thread ----------
+    def _loop(self) -> None:
+        last_health = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                try:
+                    job = self._jobs.get(timeout=self.pump_interval or self.health_interval)
+                except queue.Empty:
+                    if time.monotonic() - last_health >= self.health_interval:
+                        last_health = time.monotonic()
+                        self._keep_warm()
+                    else:
+                        self._pump_events()
+                    continue
+                if job is None:
+                    break
+                fn, fut, parent = job
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                try:
+                    # launch/login ulang yang dipicu job ini ikut tercatat di trace pemanggil
+                    with tracing.attach(parent):
+                        page = self._ensure_ready()
+                        result = fn(page)
+                    fut.set_result(result)
+                except BaseException as e:
+                    fut.set_exception(e)
+                    self._after_failure()
+        finally:
+            self._shutdown()
+            # job yang tersisa jangan dibiarkan menggantung
+            while True:
+                try:
+                    job = self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not None and job[1].set_running_or_notify_cancel():
+                    job[1].set_exception(RuntimeError(f"Browser session '{self.name}' sudah ditutup."))
+
+    @tracing.traced("session.launch")
+    def _launch(self) -> None:
+        tracing.annotate(device=self.name)
+        t0 = time.perf_counter()
+        state = saved_state_if_fresh(self.state_path, self.base_url) if self.restore_state else None
+        self._pw, self._browser, self._context, self._page = launch_browser(
+            headless=self.headless,
+            record_video=False,
+            out_dir=self.out_dir,
+            storage_state=state,
+            profile=self.profile,
+        )
+        self._state_loaded = state is not None
+        self.launches += 1
+        metrics.BROWSER_LAUNCH.observe(time.perf_counter() - t0, device=self.name)
+
+    @tracing.traced("session.login")
+    def _login(self) -> None:
+        tracing.annotate(device=self.name)
+        # state tersimpan hanya dicoba sekali per launch; login ulang karena expired selalu login penuh
+        try_restore, self._state_loaded = self._state_loaded, False
+        t0 = time.perf_counter()
+        how = ensure_logged_in(self._page, self.base_url, self.username, self.password, try_restore=try_restore)
+        metrics.BROWSER_LOGIN.observe(time.perf_counter() - t0, device=self.name, how=how)
+        if how == "restored":
+            self.restores += 1
+        else:
+            self.logins += 1
+            if try_restore:
+                invalidate_storage_state(self.state_path)
+            try:
+                save_storage_state(self._context, self.state_path, self.base_url, self.state_max_age)
+            except Exception:
+                pass
+        self.last_ready_at = time.time()
+        for hook in self.page_hooks:
+            try:
+                hook(self._page)
+            except Exception as e:
+                print(f"[WARN] page hook session '{self.name}' gagal: {e}")
+
+    def _is_healthy(self) -> bool:
+        try:
+            if "/login" in (self._page.url or ""):
+                return False
+            return any(self._page.locator(sel).count() > 0 for sel in DASHBOARD_PROBES)
+        except Error:
+            return False
+
+    def _ensure_ready(self) -> Page:
+        alive = (
+            self._page is not None
+            and not self._page.is_closed()
+            and self._browser is not None
+            and self._browser.is_connected()
+        )
+        if not alive:
+            self._shutdown()
+            self._launch()
+            self._login()
+            return self._page
+
+        if not self._is_healthy():
+            print(f"[WARN] session '{self.name}' tidak di dashboard (expired?), login ulang")
+            try:
+                self._login()
+            except Error:
+                self._shutdown()
+                self._launch()
+                self._login()
+        return self._page
+
+    def _keep_warm(self) -> None:
+        # hanya jaga session yang sudah pernah dibuka
+        if self._page is None:
+            return
+        try:
+            self._ensure_ready()
+        except Exception as e:
+            print(f"[WARN] health-check session '{self.name}' gagal: {e}")
+            self._shutdown()
+
+    def _pump_events(self) -> None:
+        if self._page is None:
+            return
+        try:
+            self._page.wait_for_timeout(1)
+        except Error:
+            pass
+
+    def _after_failure(self) -> None:
+        if self._browser is None or not self._browser.is_connected():
+            self._shutdown()
+            return
+        # tutup dialog/dropdown yang mungkin tertinggal dari aksi yang gagal
+        try:
+            self._page.keyboard.press("Escape")
+        except Error:
+            self._shutdown()
+
+    def _shutdown(self) -> None:
+        for closer in (
+            lambda: self._browser and self._browser.close(),
+            lambda: self._pw and self._pw.stop(),
+        ):
+            try:
+                closer()
+            except Exception:
+                pass
+        self._pw = self._browser = self._context = self._page = None
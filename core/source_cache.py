@@ -0,0 +1,233 @@
+# core/source_cache.py
+"""
+Cache daftar source per device, berversi:
+
+- `revision` naik setiap isi data (atau error) berubah, termasuk lintas restart
+  (disimpan di file cache)
+- `etag` = hash isi data (JSON kompak yang sama dengan body /sources_cached),
+  jadi client bisa pakai If-None-Match -> 304
+- riwayat perubahan per revisi (terbatas) untuk /sources/changes?since=<rev>
+- tulis ke disk atomik (tmp + os.replace), dilewati jika isi tidak berubah
+- `wait_newer()` / `change_event()` untuk stream (SSE): semua subscriber yang
+  berada di revisi sama berbagi satu event yang sudah diserialisasi
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from threading import Lock
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+Item = Dict[str, str]
+
+
+def _key(it: Item) -> str:
+    return it.get("stream_id") or it.get("name") or ""
+
+
+def _wake(fut: asyncio.Future) -> None:
+    if not fut.done():
+        fut.set_result(True)
+
+
+def _dumps(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class SourceCache:
+    def __init__(self, path: Path, history: int = 512):
+        self.path = path
+        self._lock = Lock()
+        self.updated_at: Optional[str] = None  # ISO string UTC, poll/push terakhir (berhasil atau error)
+        self.error: Optional[str] = None       # pesan error polling terakhir (jika ada)
+        self.data: Optional[List[Item]] = None
+        self.data_at: Optional[float] = None   # epoch data terakhir yang berhasil (untuk staleness)
+        self.revision = 0
+        self.etag: Optional[str] = None
+        self.data_json = b"null"
+        self._by_key: Dict[str, Item] = {}
+        # (revision, {key: item terbaru atau None jika hilang})
+        self._history: Deque[Tuple[int, Dict[str, Optional[Item]]]] = deque(maxlen=history)
+        self._base_revision = 0  # revisi tertua yang masih bisa dihitung delta-nya
+        self.writes = 0
+        self.skipped_writes = 0
+        # stream: coroutine yang menunggu revisi baru & event per `since` untuk revisi sekarang
+        self._waiters: Set[asyncio.Future] = set()
+        self._events: Dict[int, Tuple[str, bytes]] = {}
+
+    # ---------- update ----------
+    def set_data(self, data: List[Item]) -> bool:
+        """Simpan hasil poll/push. Return True jika isi berubah (revisi baru)."""
+        body = _dumps(data)
+        etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+        with self._lock:
+            self.updated_at = datetime.now(timezone.utc).isoformat()
+            self.data_at = time.time()
+            if etag == self.etag and self.error is None:
+                self.skipped_writes += 1
+                return False
+            changed = self._diff(data) if etag != self.etag else {}
+            self.data, self.data_json, self.etag, self.error = data, body, etag, None
+            self._by_key = {_key(it): it for it in data}
+            self._bump(changed)
+            self._write()
+        return True
+
+    def set_error(self, msg: str) -> None:
+        with self._lock:
+            self.updated_at = datetime.now(timezone.utc).isoformat()
+            if msg == self.error:
+                self.skipped_writes += 1
+                return
+            self.error = msg
+            self._bump({})
+            self._write()
+
+    def _diff(self, data: List[Item]) -> Dict[str, Optional[Item]]:
+        new = {_key(it): it for it in data}
+        changed: Dict[str, Optional[Item]] = {k: it for k, it in new.items() if self._by_key.get(k) != it}
+        changed.update({k: None for k in self._by_key if k not in new})
+        return changed
+
+    def _bump(self, changed: Dict[str, Optional[Item]]) -> None:
+        self.revision += 1
+        if len(self._history) == self._history.maxlen:
+            self._base_revision = self._history[0][0]
+        self._history.append((self.revision, changed))
+        self._events.clear()
+        # set_data/set_error bisa dari thread poller/watcher -> bangunkan lewat loop masing-masing
+        for fut in self._waiters:
+            fut.get_loop().call_soon_threadsafe(_wake, fut)
+        self._waiters.clear()
+
+    # ---------- baca ----------
+    def snapshot(self) -> dict:
+        """
+        Keadaan konsisten untuk endpoint: data + body JSON siap kirim.
+        `meta_etag` (lemah) untuk /sources/cache mencakup data + error, bukan updated_at.
+        """
+        with self._lock:
+            err = hashlib.blake2b((self.error or "").encode("utf-8"), digest_size=4).hexdigest()
+            meta_json = (
+                b'{"updated_at":%s,"error":%s,"revision":%d,"etag":%s,"data":%s}'
+                % (_dumps(self.updated_at), _dumps(self.error), self.revision, _dumps(self.etag), self.data_json)
+            )
+            return {
+                "updated_at": self.updated_at,
+                "error": self.error,
+                "revision": self.revision,
+                "etag": self.etag,
+                "data": self.data,
+                "data_json": self.data_json,
+                "meta_etag": f'W/"{self.etag}-{err}"',
+                "meta_json": meta_json,
+            }
+
+    def changes_since(self, since: int) -> dict:
+        """
+        Source yang berubah (status/url/nama, baru) & yang hilang setelah revisi `since`.
+        `full=True` jika riwayat tidak mencakup `since` (terlalu lama / restart):
+        `changes` berisi seluruh data.
+        """
+        with self._lock:
+            return self._changes(since)
+
+    def _changes(self, since: int) -> dict:
+        out = {"revision": self.revision, "since": since, "full": False, "error": self.error}
+        if since == self.revision:
+            out.update(changes=[], removed=[])
+            return out
+        if since < self._base_revision or since > self.revision or self.data is None:
+            out.update(full=True, changes=list(self.data or []), removed=[])
+            return out
+        merged: Dict[str, Optional[Item]] = {}
+        for rev, changed in self._history:
+            if rev > since:
+                merged.update(changed)
+        out["changes"] = [it for it in merged.values() if it is not None]
+        out["removed"] = [k for k, it in merged.items() if it is None]
+        return out
+
+    def change_event(self, since: Optional[int]) -> Tuple[int, Optional[str], Optional[bytes]]:
+        """
+        (revisi, jenis, body JSON) event stream untuk subscriber di revisi `since`
+        (None = belum punya data -> snapshot penuh). Jenis None jika tidak ada yang baru.
+        Dihitung sekali per (revisi, since), dipakai bersama semua subscriber.
+        """
+        with self._lock:
+            if since == self.revision:
+                return self.revision, None, None
+            key = -1 if since is None else since
+            ev = self._events.get(key)
+            if ev is None:
+                d = self._changes(key)
+                ev = self._events[key] = ("snapshot" if d["full"] else "changes", _dumps(d))
+            return (self.revision,) + ev
+
+    async def wait_newer(self, revision: int, timeout: float) -> bool:
+        """Tunggu sampai revisi > `revision` (True) atau timeout (False)."""
+        fut = asyncio.get_running_loop().create_future()
+        with self._lock:
+            if self.revision != revision:
+                return True
+            self._waiters.add(fut)
+        try:
+            await asyncio.wait_for(fut, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                self._waiters.discard(fut)
+
+    # ---------- disk ----------
+    def _write(self) -> None:
+        body = (
+            b'{"revision":%d,"updated_at":%s,"error":%s,"data":%s}'
+            % (self.revision, _dumps(self.updated_at), _dumps(self.error), self.data_json)
+        )
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        try:
+            tmp.write_bytes(body)
+            os.replace(tmp, self.path)
+            self.writes += 1
+        except OSError as e:
+            print(f"[WARN] tulis cache {self.path} gagal: {e}")
+
+    def load(self) -> None:
+        try:
+            raw = json.loads(self.path.read_bytes())
+        except (OSError, ValueError):
+            return
+        if not isinstance(raw, dict):
+            return
+        with self._lock:
+            data = raw.get("data")
+            self.updated_at = raw.get("updated_at")
+            self.error = raw.get("error")
+            self.revision = self._base_revision = int(raw.get("revision") or 0)
+            if isinstance(data, list):
+                self.data = data
+                self.data_json = _dumps(data)
+                self.etag = hashlib.blake2b(self.data_json, digest_size=12).hexdigest()
+                self._by_key = {_key(it): it for it in data}
+                if not self.error and self.updated_at:
+                    try:
+                        self.data_at = datetime.fromisoformat(self.updated_at).timestamp()
+                    except ValueError:
+                        pass
+
+    def info(self) -> dict:
+        return {
+            "revision": self.revision,
+            "etag": self.etag,
+            "updated_at": self.updated_at,
+            "writes": self.writes,
+            "skipped_writes": self.skipped_writes,
+        }
@@ -0,0 +1,191 @@
+# core/tracing.py
+"""
+Span bertingkat untuk melihat ke mana waktu sebuah operasi habis
+(launch, goto + retry, login, tunggu dashboard, modal layout, aktivasi cell, ...).
+
+- `span(name, **attrs)` / `@traced(name)` membuat span anak dari span aktif
+  (contextvars, jadi ikut `await`; `@traced` juga untuk fungsi async). Lintas thread (antrean device, worker
+  browser) span induk dibawa eksplisit dengan `attach(parent)`.
+- `annotate(**attrs)` menambah atribut ke span aktif (mis. retry, jumlah item).
+- Span root yang selesai dikirim ke sink:
+    TRACE_JSONL=out/traces.jsonl  -> satu baris JSON per trace
+    TRACE_OTEL=true               -> diekspor ulang ke OpenTelemetry (jika terpasang)
+  TRACE_MIN_MS menyaring trace pendek (mis. poll rutin).
+"""
+from __future__ import annotations
+
+import contextvars
+import functools
+import inspect
+import json
+import os
+import secrets
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("kv_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent", "attrs", "children", "start", "end_time", "error",
+                 "_t0", "_t1")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attrs: Optional[dict] = None):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.attrs: Dict[str, Any] = dict(attrs or {})
+        self.children: List[Span] = []
+        self.start = time.time()
+        self.end_time: Optional[float] = None
+        self.error: Optional[str] = None
+        self._t0 = time.perf_counter()
+        self._t1: Optional[float] = None
+        if parent is not None:
+            parent.children.append(self)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self._t1 if self._t1 is not None else time.perf_counter()
+        return (end - self._t0) * 1000.0
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        if self._t1 is not None:
+            return
+        self._t1 = time.perf_counter()
+        self.end_time = self.start + (self._t1 - self._t0)
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        if self.parent is None:
+            _export(self)
+
+    def to_dict(self) -> dict:
+        d = {
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration_ms": round(self.duration_ms, 1),
+        }
+        if self._t1 is None:
+            d["open"] = True
+        if self.attrs:
+            d["attrs"] = self.attrs
+        if self.error:
+            d["error"] = self.error
+        if self.children:
+            d["children"] = [c.to_dict() for c in list(self.children)]
+        return d
+
+
+# ---------- API ----------
+def current() -> Optional[Span]:
+    return _current.get()
+
+
+def start_span(name: str, parent: Optional[Span] = None, **attrs) -> Span:
+    """Span manual (selesai dengan `.finish()`), induk default = span aktif."""
+    return Span(name, parent if parent is not None else _current.get(), attrs)
+
+
+@contextmanager
+def attach(parent: Optional[Span]) -> Iterator[Optional[Span]]:
+    """Jadikan `parent` span aktif di thread/konteks ini (untuk lintas thread)."""
+    token = _current.set(parent)
+    try:
+        yield parent
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Span]:
+    sp = Span(name, _current.get(), attrs)
+    token = _current.set(sp)
+    try:
+        yield sp
+    except BaseException as e:
+        sp.finish(e)
+        raise
+    finally:
+        _current.reset(token)
+        sp.finish()
+
+
+def traced(name: str) -> Callable:
+    def deco(fn):
+        if inspect.iscoroutinefunction(fn):
+            # versi async (core.aio): span selesai saat coroutine selesai, bukan saat dibuat
+            @functools.wraps(fn)
+            async def awrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return awrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def annotate(**attrs) -> None:
+    sp = _current.get()
+    if sp is not None:
+        sp.attrs.update(attrs)
+
+
+# ---------- sink ----------
+_JSONL_PATH = os.getenv("TRACE_JSONL") or None
+_MIN_MS = float(os.getenv("TRACE_MIN_MS", "0"))
+_OTEL = os.getenv("TRACE_OTEL", "false").lower() == "true"
+_sink_lock = Lock()
+_otel_tracer = None
+
+
+def _export(root: Span) -> None:
+    if root.duration_ms < _MIN_MS:
+        return
+    if _JSONL_PATH:
+        line = json.dumps({"trace_id": root.trace_id, **root.to_dict()}, ensure_ascii=False, default=str)
+        try:
+            with _sink_lock:
+                Path(_JSONL_PATH).parent.mkdir(parents=True, exist_ok=True)
+                with open(_JSONL_PATH, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+        except OSError as e:
+            print(f"[WARN] tulis trace gagal: {e}")
+    if _OTEL:
+        _export_otel(root)
+
+
+def _export_otel(root: Span) -> None:
+    """Putar ulang pohon span ke tracer OpenTelemetry (start/end time asli)."""
+    global _otel_tracer
+    try:
+        from opentelemetry import trace as ot
+    except ImportError:
+        return
+    if _otel_tracer is None:
+        _otel_tracer = ot.get_tracer("kiloview-controller")
+
+    def _emit(sp: Span, ctx) -> None:
+        attrs = {k: (v if isinstance(v, (str, bool, int, float)) else str(v)) for k, v in sp.attrs.items()}
+        o = _otel_tracer.start_span(sp.name, context=ctx, start_time=int(sp.start * 1e9), attributes=attrs)
+        if sp.error:
+            o.set_status(ot.Status(ot.StatusCode.ERROR, sp.error))
+        child_ctx = ot.set_span_in_context(o)
+        for c in list(sp.children):
+            _emit(c, child_ctx)
+        o.end(end_time=int((sp.end_time or time.time()) * 1e9))
+
+    try:
+        _emit(root, None)
+    except Exception as e:
+        print(f"[WARN] ekspor OpenTelemetry gagal: {e}")
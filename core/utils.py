@@ -1,14 +1,18 @@
+import json
 import time
 from pathlib import Path
 from playwright.sync_api import Error, Page
+from . import tracing
 from .ui_selectors import SEL_USER
 
 OUT_DIR = Path("out")
 OUT_DIR.mkdir(parents=True, exist_ok=True)
 
-def goto_login(page: Page, base_url: str):
-    url = base_url.rstrip("/")
+@tracing.traced("nav.goto")
+def goto_with_retry(page: Page, url: str):
+    """goto dengan retry singkat untuk redirect cepat SPA (ERR_ABORTED / frame detached)."""
     print(f"[INFO] goto {url}")
+    tracing.annotate(url=url)
 
     for attempt in range(2):
         try:
@@ -18,16 +22,22 @@ def goto_login(page: Page, base_url: str):
             msg = str(e)
             if "ERR_ABORTED" in msg or "frame was detached" in msg:
                 print(f"[WARN] goto aborted (attempt {attempt+1}): {msg}")
+                tracing.annotate(retries=attempt + 1)
                 time.sleep(0.5)
                 continue
             raise
 
+@tracing.traced("nav.goto_login")
+def goto_login(page: Page, base_url: str):
+    goto_with_retry(page, base_url.rstrip("/"))
+
     try:
         page.wait_for_selector(SEL_USER, timeout=20_000)
     except Error:
         page.screenshot(path=str(OUT_DIR / "after_goto_login.png"), full_page=True)
         raise
 
+@tracing.traced("nav.wait_url")
 def wait_for_url_not_contains(page: Page, needle: str, timeout_ms: int = 30_000):
     page.wait_for_function(
         "url => !window.location.href.includes(url)",
@@ -49,3 +59,34 @@ def wait_for_any_selector(page: Page, selectors: list[str], timeout_ms: int = 15
             continue
     if last_err:
         raise last_err
+
+# Tunggu kondisi DOM berbasis event: predikat dicek ulang setiap ada mutasi DOM
+# (MutationObserver), plus cek berkala jarang untuk perubahan yang bukan mutasi
+# (transisi CSS). Beberapa predikat bisa di-"race"; yang pertama benar menang.
+_WAIT_DOM_JS = """
+(arg) => new Promise((resolve) => {
+  const preds = {%s};
+  const check = () => {
+    for (const k of Object.keys(preds)) {
+      try { if (preds[k](arg.value)) return k; } catch (e) {}
+    }
+    return null;
+  };
+  const first = check();
+  if (first) return resolve(first);
+  let obs = null, tick = null, timer = null;
+  const done = (k) => { obs.disconnect(); clearInterval(tick); clearTimeout(timer); resolve(k); };
+  obs = new MutationObserver(() => { const k = check(); if (k) done(k); });
+  obs.observe(document.documentElement, { subtree: true, childList: true, attributes: true, characterData: true });
+  tick = setInterval(() => { const k = check(); if (k) done(k); }, 100);
+  timer = setTimeout(() => done(null), arg.timeout);
+})
+"""
+
+def wait_for_dom(page: Page, predicates: dict[str, str], arg=None, timeout_ms: int = 5_000) -> str | None:
+    """
+    `predicates`: {nama: sumber fungsi JS `(arg) => boolean`}. Return nama predikat
+    yang pertama terpenuhi, atau None jika timeout (tidak raise).
+    """
+    body = ", ".join(f"{json.dumps(k)}: ({src.strip()})" for k, src in predicates.items())
+    return page.evaluate(_WAIT_DOM_JS % body, {"value": arg, "timeout": timeout_ms})
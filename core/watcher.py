@@ -0,0 +1,202 @@
+# core/watcher.py
+"""
+Pantau status source secara push dari page dashboard yang tetap terbuka,
+tanpa scrape ulang berkala:
+
+1) DOM push  : MutationObserver di page memanggil binding Python setiap daftar
+               `div.discovery-list-item` berubah (pakai EXTRACT_SOURCES_JS).
+2) XHR / WS  : respons & frame WebSocket yang memang diterima SPA di-parse
+               dengan spesifikasi yang sama dengan HttpBackend (`api.watch`).
+
+Callback dijalankan di thread worker BrowserSession; session perlu
+`pump_interval` supaya event tetap di-dispatch saat idle. Untuk engine async
+(core.aio) pakai `attach_async`; event di-dispatch oleh event loop.
+"""
+from __future__ import annotations
+
+import json
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional
+
+from playwright.sync_api import Error, Page, Response, WebSocket
+
+from .actions.sources import EXTRACT_SOURCES_JS, SOURCE_ITEM_SEL
+from .backends import parse_source_items
+from .ui_selectors import SOURCE_LIST_CONTAINER
+
+_BINDING = "__kvSourcesPush"
+
+# Dipasang sebagai init script (bertahan setelah reload/login ulang) sekaligus
+# dievaluasi langsung pada page yang sedang terbuka.
+_OBSERVER_JS = """
+(() => {
+  if (window.__kvWatchInstalled) return;
+  window.__kvWatchInstalled = true;
+  const extract = %(extract)s;
+  let last = null, timer = null;
+  const flush = () => {
+    timer = null;
+    const items = Array.from(document.querySelectorAll(%(selector)s));
+    if (!items.length) return;
+    const data = extract(items);
+    const key = JSON.stringify(data);
+    if (key === last) return;
+    last = key;
+    window.%(binding)s(data);
+  };
+  const schedule = () => { if (!timer) timer = setTimeout(flush, %(debounce)d); };
+  // observer atribut hanya di container list; observer root cuma memantau
+  // container dibuat/diganti (SPA re-render) supaya bisa di-bind ulang
+  let box = null, inner = null;
+  const bind = () => {
+    if (box && box.isConnected) return;
+    if (inner) inner.disconnect();
+    box = document.querySelector(%(container)s);
+    inner = null;
+    if (!box) return;
+    inner = new MutationObserver(schedule);
+    inner.observe(box, {
+      subtree: true, childList: true, characterData: true, attributes: true,
+      attributeFilter: ['title', 'class', 'data-stream-id'],
+    });
+    schedule();
+  };
+  const start = () => {
+    new MutationObserver(bind).observe(document.documentElement, {
+      subtree: true, childList: true,
+    });
+    bind();
+  };
+  if (document.documentElement) start();
+  else document.addEventListener('DOMContentLoaded', start);
+})();
+"""
+
+
+class SourceWatcher:
+    def __init__(
+        self,
+        on_sources: Callable[[List[Dict[str, str]]], None],
+        *,
+        watch_cfg: Optional[dict] = None,
+        debounce_ms: int = 250,
+    ):
+        self.on_sources = on_sources
+        self.watch_cfg = watch_cfg or {}
+        self.debounce_ms = debounce_ms
+        # WeakSet: Page baru (relaunch) selalu didaftarkan ulang, Page lama ikut lepas
+        self._attached_pages: weakref.WeakSet = weakref.WeakSet()
+        self._last: Optional[List[Dict[str, str]]] = None
+
+        # statistik (untuk /health)
+        self.events = 0
+        self.last_event_at: Optional[float] = None
+        self.last_event_kind: Optional[str] = None
+
+    def attach(self, page: Page) -> None:
+        """Pasang listener ke page. Aman dipanggil ulang setelah login ulang."""
+        if page not in self._attached_pages:
+            page.expose_function(_BINDING, lambda data: self._emit(data, "dom"))
+            page.add_init_script(self._observer_script())
+            if self.watch_cfg.get("url_contains"):
+                page.on("response", self._on_response)
+            if self.watch_cfg.get("ws_url_contains"):
+                page.on("websocket", self._on_websocket)
+            self._attached_pages.add(page)
+        page.evaluate(self._observer_script().strip().rstrip(";"))
+
+    async def attach_async(self, page) -> None:
+        """Seperti attach(), untuk page playwright.async_api."""
+        if page not in self._attached_pages:
+            await page.expose_function(_BINDING, lambda data: self._emit(data, "dom"))
+            await page.add_init_script(self._observer_script())
+            if self.watch_cfg.get("url_contains"):
+                page.on("response", self._on_response_async)
+            if self.watch_cfg.get("ws_url_contains"):
+                page.on("websocket", self._on_websocket)
+            self._attached_pages.add(page)
+        await page.evaluate(self._observer_script().strip().rstrip(";"))
+
+    def info(self) -> dict:
+        return {
+            "events": self.events,
+            "last_event_at": self.last_event_at,
+            "last_event_kind": self.last_event_kind,
+        }
+
+    # ---------- sumber event ----------
+    def _observer_script(self) -> str:
+        return _OBSERVER_JS % {
+            "extract": EXTRACT_SOURCES_JS.strip(),
+            "selector": json.dumps(SOURCE_ITEM_SEL),
+            "container": json.dumps(SOURCE_LIST_CONTAINER),
+            "binding": _BINDING,
+            "debounce": self.debounce_ms,
+        }
+
+    def _on_response(self, resp: Response) -> None:
+        if self.watch_cfg["url_contains"] not in resp.url or not resp.ok:
+            return
+        try:
+            data = resp.json()
+        except (Error, ValueError):
+            return
+        self._emit_parsed(data, "xhr")
+
+    async def _on_response_async(self, resp) -> None:
+        if self.watch_cfg["url_contains"] not in resp.url or not resp.ok:
+            return
+        try:
+            data = await resp.json()
+        except (Error, ValueError):
+            return
+        self._emit_parsed(data, "xhr")
+
+    def _on_websocket(self, ws: WebSocket) -> None:
+        if self.watch_cfg["ws_url_contains"] not in ws.url:
+            return
+        ws.on("framereceived", self._on_ws_frame)
+
+    def _on_ws_frame(self, payload: Any) -> None:
+        if isinstance(payload, bytes):
+            payload = payload.decode("utf-8", "replace")
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            return
+        self._emit_parsed(data, "ws")
+
+    def _emit_parsed(self, data: Any, kind: str) -> None:
+        items = parse_source_items(data, self.watch_cfg)
+        if not items:
+            return
+        if self.watch_cfg.get("partial") and self._last is not None:
+            items = _merge_partial(self._last, items)
+        self._emit(items, kind)
+
+    def _emit(self, items: List[Dict[str, str]], kind: str) -> None:
+        if items == self._last:
+            return
+        self._last = items
+        self.events += 1
+        self.last_event_at = time.time()
+        self.last_event_kind = kind
+        try:
+            self.on_sources(items)
+        except Exception as e:
+            print(f"[WARN] callback watcher gagal: {e}")
+
+
+def _merge_partial(current: List[Dict[str, str]], updates: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Update sebagian (mis. frame WS satu source) ditimpa ke daftar lengkap terakhir."""
+    def key(it):
+        return it.get("stream_id") or it.get("name")
+
+    by_key = {key(u): u for u in updates}
+    merged = []
+    for it in current:
+        upd = by_key.pop(key(it), None)
+        merged.append({**it, **{k: v for k, v in upd.items() if v}} if upd else it)
+    merged.extend(by_key.values())
+    return merged
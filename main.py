@@ -264,67 +264,83 @@
 
 from __future__ import annotations
 from dotenv import load_dotenv
-import os, yaml
-from pathlib import Path
-from threading import Lock, Thread, Event
-from typing import List, Optional
+import os
+import asyncio
+import time
+from threading import Lock
+from typing import Dict, List, Literal, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from get_rtmp import fetch_rtmp as android_fetch_rtmp
-from core.browser import launch_browser
-from core.auth import login, wait_for_dashboard
-from core.actions.layouts import select_layout
-from core.actions.sources import list_sources, assign_source_to_grid, set_source_url
-from core import utils
-from fastapi.responses import PlainTextResponse
-
-# ===== Tambahan untuk cache & polling =====
-import json, time
-from datetime import datetime, timezone
+from core.fleet import Device, DeviceSettings, Fleet, load_scenarios
+from core.procstats import chromium_stats
+from core import metrics, tracing, utils
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 
 load_dotenv()
 
 # =========================
 # Konfigurasi dasar
 # =========================
+# SCENARIO_PATH: satu file YAML, direktori berisi *.yaml (fleet), atau beberapa path dipisah koma
 SCENARIO_PATH = os.getenv("SCENARIO_PATH")
-if not Path(SCENARIO_PATH).exists():
-    raise RuntimeError(f"Scenario YAML tidak ditemukan: {SCENARIO_PATH}")
-
-with open(SCENARIO_PATH, "r", encoding="utf-8") as f:
-    SCN = yaml.safe_load(f) or {}
-
-BASE_URL = SCN.get("base_url")
-CREDS = SCN.get("login") or {}
-if not BASE_URL or "username" not in CREDS or "password" not in CREDS:
-    raise RuntimeError("Scenario YAML harus berisi base_url dan login.username/password")
+SCENARIOS = load_scenarios(SCENARIO_PATH or "")
 
 OUT_DIR = utils.OUT_DIR
 OUT_DIR.mkdir(parents=True, exist_ok=True)
 
 _device_lock = Lock()
 
-def _run_with_page(fn):
-    pw, browser, context, page = launch_browser(
-        headless=True,
-        record_video=False,
-        out_dir=OUT_DIR,
-    )
-    try:
-        login(page, BASE_URL, CREDS["username"], CREDS["password"])
-        wait_for_dashboard(page)
-        return fn(page)
-    except Exception as e:
-        raise
-    finally:
-        try:
-            context.storage_state(path=str(OUT_DIR / "storage_state.json"))
-        except Exception:
-            pass
-        browser.close()
-        pw.stop()
+# SOURCES_POLL_ADAPTIVE=false -> poll tiap SOURCES_POLL_INTERVAL persis (perilaku lama)
+POLL_ADAPTIVE = os.getenv("SOURCES_POLL_ADAPTIVE", "true").lower() == "true"
+
+SETTINGS = DeviceSettings(
+    # Browser warm: satu page login & dashboard-ready per device yang dipakai semua endpoint + poller.
+    # WARM_SESSION=false -> perilaku lama (launch + login per request).
+    warm_session=os.getenv("WARM_SESSION", "true").lower() == "true",
+    health_interval=float(os.getenv("SESSION_HEALTH_INTERVAL", "30")),
+    op_timeout=float(os.getenv("SESSION_OP_TIMEOUT", "180")),
+    # Mode watch: page dashboard tetap terbuka & perubahan source di-push ke cache
+    # (MutationObserver + XHR/WS SPA). Poll berkala hanya sebagai resync pengaman.
+    watch=os.getenv("SOURCES_WATCH", "false").lower() == "true",
+    watch_resync=int(os.getenv("SOURCES_WATCH_RESYNC", "300")),
+    poll_interval=int(os.getenv("SOURCES_POLL_INTERVAL", "20")),
+    # Poll adaptif: cepat (SOURCES_POLL_FAST) setelah write/perubahan, 2x lebih jarang saat stabil
+    # sampai SOURCES_POLL_MAX, backoff sampai SOURCES_POLL_ERROR_MAX saat device tak terjangkau.
+    # Poll mengalah ke operasi user; SOURCES_PIGGYBACK mengambil snapshot dari page operasi tulis.
+    poll_fast=float(os.getenv("SOURCES_POLL_FAST", "3")) if POLL_ADAPTIVE else None,
+    poll_max=float(os.getenv("SOURCES_POLL_MAX", "120")) if POLL_ADAPTIVE else None,
+    poll_error_max=float(os.getenv("SOURCES_POLL_ERROR_MAX", "300")) if POLL_ADAPTIVE else None,
+    poll_yield=float(os.getenv("SOURCES_POLL_YIELD", "2")),
+    poll_piggyback=os.getenv("SOURCES_PIGGYBACK", "true").lower() == "true",
+    queue_max_merge=int(os.getenv("QUEUE_MAX_MERGE", "20")),
+    # pakai ulang out/.../storage_state.json (cookie sesi) untuk skip form login
+    restore_state=os.getenv("SESSION_RESTORE", "true").lower() == "true",
+    state_max_age=float(os.getenv("SESSION_STATE_MAX_AGE", str(12 * 3600))),
+    # "lean": blokir preview video/gambar/font & matikan GPU (lihat core/browser.py)
+    browser_profile=os.getenv("BROWSER_PROFILE", "full"),
+    # "async": browser lewat playwright.async_api (core/aio), semua device di satu event loop
+    # dan operasi yang sedang jalan bisa dibatalkan; "sync": thread per device (default)
+    engine=os.getenv("ENGINE", "sync").lower(),
+)
+
+# Operasi fleet (mis. layout 3x3 di semua device) dijalankan paralel, dibatasi sejumlah ini
+FLEET_MAX_PARALLEL = int(os.getenv("FLEET_MAX_PARALLEL", "4"))
+
+# /assign/bulk default: "sequential" (per cell, tunggu konfirmasi) atau "pipelined"
+# (eksperimental, lihat core/actions/grid.assign_grid_pipelined); ASSIGN_PAGES > 1 = multi-page
+ASSIGN_MODE = os.getenv("ASSIGN_MODE", "sequential")
+ASSIGN_PAGES = int(os.getenv("ASSIGN_PAGES", "1"))
+
+# /sources/stream (SSE): komentar ping tiap SSE_HEARTBEAT detik saat tidak ada perubahan,
+# SSE_RETRY_MS = jeda reconnect yang disarankan ke EventSource
+SSE_HEARTBEAT = float(os.getenv("SSE_HEARTBEAT", "15"))
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "3000"))
+
+FLEET = Fleet(SCENARIOS, out_dir=OUT_DIR, settings=SETTINGS)
+BASE_URL = FLEET.default.base_url
 
 # =========================
 # FastAPI app
@@ -337,6 +353,77 @@ app.add_middleware(
     allow_methods=["*"], allow_headers=["*"],
 )
 
+# Satu trace per request: span langkah (launch, login, goto, layout, assign, ...)
+# jadi anak span ini; dikirim ke TRACE_JSONL / OpenTelemetry (lihat core/tracing.py)
+# dan disertakan di respons error 5xx bila TRACE_ON_ERROR=true.
+TRACE_ON_ERROR = os.getenv("TRACE_ON_ERROR", "true").lower() == "true"
+
+@app.middleware("http")
+async def _trace_request(request: Request, call_next):
+    with tracing.span("http.request", method=request.method, path=request.url.path) as sp:
+        response = await call_next(request)
+        sp.set(status=response.status_code)
+        return response
+
+# Client memutus koneksi sebelum respons dikirim -> handler di-cancel, job antrean
+# device-nya dibuang (masih antre) atau dibatalkan (sedang jalan, ENGINE=async).
+CANCEL_ON_DISCONNECT = os.getenv("CANCEL_ON_DISCONNECT", "true").lower() == "true"
+
+class _CancelOnDisconnect:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        inbox: asyncio.Queue = asyncio.Queue()
+        disconnected = asyncio.Event()
+        responded = False
+
+        async def _pump():
+            # baca receive() terus supaya http.disconnect terlihat walau handler tidak membaca body
+            while True:
+                msg = await receive()
+                inbox.put_nowait(msg)
+                if msg["type"] == "http.disconnect":
+                    disconnected.set()
+                    return
+
+        async def _send(msg):
+            nonlocal responded
+            if msg["type"] == "http.response.body" and not msg.get("more_body"):
+                responded = True
+            await send(msg)
+
+        pump = asyncio.create_task(_pump())
+        watch = asyncio.create_task(disconnected.wait())
+        app_task = asyncio.create_task(self.app(scope, inbox.get, _send))
+        try:
+            await asyncio.wait({app_task, watch}, return_when=asyncio.FIRST_COMPLETED)
+            if not app_task.done() and not responded:
+                print(f"[INFO] client putus, batalkan {scope['method']} {scope['path']}")
+                app_task.cancel()
+            try:
+                await app_task
+            except asyncio.CancelledError:
+                if not disconnected.is_set():
+                    raise
+        finally:
+            for t in (pump, watch, app_task):
+                if not t.done():
+                    t.cancel()
+
+if CANCEL_ON_DISCONNECT:
+    app.add_middleware(_CancelOnDisconnect)
+
+@app.exception_handler(HTTPException)
+async def _http_error_with_trace(request: Request, exc: HTTPException):
+    body = {"detail": exc.detail}
+    root = tracing.current()
+    if TRACE_ON_ERROR and exc.status_code >= 500 and root is not None:
+        body["trace"] = {"trace_id": root.trace_id, **root.to_dict()}
+    return JSONResponse(body, status_code=exc.status_code, headers=getattr(exc, "headers", None))
+
 # =========================
 # Schemas (Pydantic)
 # =========================
@@ -356,6 +443,8 @@ class AssignOne(BaseModel):
 
 class AssignBulkReq(BaseModel):
     assigns: List[AssignOne]
+    mode: Optional[Literal["sequential", "pipelined"]] = Field(None, description="null = ASSIGN_MODE")
+    pages: Optional[int] = Field(None, ge=1, le=8, description="Jumlah page untuk mode pipelined; null = ASSIGN_PAGES")
 
 class SetUrlOne(BaseModel):
     name: str
@@ -363,6 +452,8 @@ class SetUrlOne(BaseModel):
 
 class SetUrlBulkReq(BaseModel):
     items: List[SetUrlOne]
+    skip_unchanged: bool = Field(True, description="Lewati source yang URL-nya sudah sama")
+    atomic: bool = Field(False, description="Jika ada yang gagal, kembalikan URL yang sudah terlanjur diubah")
 
 class RunCombinedReq(BaseModel):
     layout_cells: Optional[int] = Field(None)
@@ -370,108 +461,370 @@ class RunCombinedReq(BaseModel):
     set_urls: Optional[List[SetUrlOne]] = None
     assigns: Optional[List[AssignOne]] = None
 
+class GridStateReq(BaseModel):
+    layout_cells: Optional[int] = Field(None, description="Layout yang diinginkan; null = pertahankan layout sekarang")
+    assigns: Dict[int, str] = Field(default_factory=dict, description="Peta grid (1-based) -> nama source")
+    confirm_shift: bool = True
+    dry_run: bool = Field(False, description="Hanya hitung rencana, tanpa eksekusi")
+
+class FleetLayoutReq(LayoutReq):
+    devices: Optional[List[str]] = Field(None, description="Nama device; kosong = semua device")
+
+class FleetRunReq(RunCombinedReq):
+    devices: Optional[List[str]] = Field(None, description="Nama device; kosong = semua device")
+
+class FleetGridStateReq(GridStateReq):
+    devices: Optional[List[str]] = Field(None, description="Nama device; kosong = semua device")
+
 # ===== Tambahan: schema untuk cache =====
 class SourcesCacheResp(BaseModel):
     updated_at: Optional[str]
     error: Optional[str]
+    revision: int = 0
+    etag: Optional[str] = None
     data: Optional[List[SourceItem]]
 
+class SourcesChangesResp(BaseModel):
+    revision: int
+    since: int
+    full: bool = Field(..., description="True jika riwayat tidak mencakup `since`: changes = seluruh data")
+    error: Optional[str]
+    changes: List[SourceItem]
+    removed: List[str] = Field(..., description="stream_id (atau nama) source yang hilang")
+
 # =========================
-# Endpoint existing (tetap apa adanya)
+# Pemilihan device
 # =========================
-@app.get("/health")
-def health():
-    return {"ok": True, "base_url": BASE_URL}
+def _default_device(device: Optional[str] = None) -> Device:
+    # endpoint lama: device default, atau ?device=<nama>
+    try:
+        return FLEET.get(device)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
 
-@app.get("/sources", response_model=List[SourceItem])
-def get_sources():
-    # PERILAKU LAMA (LIVE): tetap membuka browser & login
-    with _device_lock:
+def _path_device(device: str) -> Device:
+    try:
+        return FLEET.get(device)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+# =========================
+# Helper operasi
+# =========================
+def _count_set_url_results(results):
+    counts = {"updated": 0, "unchanged": 0, "failed": 0}
+    for r in results:
+        key = "failed" if r["status"] in ("error", "reverted") else r["status"]
+        counts[key] += 1
+    return counts
+
+def _raise_if_set_url_failed(results):
+    failed = [r for r in results if r["status"] in ("error", "reverted")]
+    if failed:
+        msg = "; ".join(f"{r['name']}: {r.get('error') or r['status']}" for r in failed)
+        raise RuntimeError(f"{len(failed)}/{len(results)} gagal ({msg})")
+
+async def _run_combined(dev: Device, req: RunCombinedReq) -> dict:
+    result = {}
+    steps = []
+    if req.layout_cells:
+        steps.append(("select_layout", (req.layout_cells,), {"confirm": req.confirm_shift}))
+        result["layout_cells"] = req.layout_cells
+        result["confirm_shift"] = req.confirm_shift
+
+    if req.set_urls:
+        set_url_idx = len(steps)
+        steps.append(("set_source_urls", ([(it.name, it.url) for it in req.set_urls],), {}))
+        result["set_urls"] = len(req.set_urls)
+
+    if req.assigns:
+        steps += [("assign_source_to_grid", (a.grid, a.name), {}) for a in req.assigns]
+        result["assigns"] = len(req.assigns)
+
+    # snapshot sumber setelah aksi (step terakhir)
+    steps.append(("list_sources", (), {}))
+    out = await dev.queue.run(steps)
+    if req.set_urls:
+        set_url_results = out[set_url_idx]
+        _raise_if_set_url_failed(set_url_results)
+        result.update({f"set_urls_{k}": v for k, v in _count_set_url_results(set_url_results).items()})
+    result["sources"] = out[-1]
+    return result
+
+async def _fan_out(devices: List[Device], fn) -> dict:
+    """Jalankan `fn(dev)` di banyak device paralel (maks FLEET_MAX_PARALLEL bersamaan)."""
+    sem = asyncio.Semaphore(FLEET_MAX_PARALLEL)
+
+    async def _one(dev: Device):
+        async with sem:
+            try:
+                return dev.name, {"ok": True, "result": await fn(dev)}
+            except Exception as e:
+                return dev.name, {"ok": False, "error": str(e)}
+
+    results = dict(await asyncio.gather(*(_one(d) for d in devices)))
+    return {"ok": all(r["ok"] for r in results.values()), "devices": results}
+
+def _fleet_devices(names: Optional[List[str]]) -> List[Device]:
+    try:
+        return FLEET.select(names)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+def _not_modified(request: Request, etag: str) -> bool:
+    # perbandingan lemah (RFC 9110 If-None-Match): abaikan prefix W/
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+def _etag_response(request: Request, etag: str, body: bytes, revision: int) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "X-Cache-Revision": str(revision)}
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+_SSE_SUBSCRIBERS: Dict[str, int] = {}
+
+def _last_event_id(request: Request, since: Optional[int]) -> Optional[int]:
+    # reconnect EventSource mengirim Last-Event-ID = revisi event terakhir yang diterima
+    raw = request.headers.get("last-event-id")
+    if raw:
+        try:
+            return int(raw)
+        except ValueError:
+            pass
+    return since
+
+async def _sse_source_events(request: Request, dev: Device, since: Optional[int]):
+    """
+    Satu generator per subscriber, tapi tidak ada polling tambahan: semua menunggu
+    revisi baru dari SourceCache (diisi poller/watcher device) dan event per revisi
+    diserialisasi sekali untuk semua subscriber.
+    """
+    _SSE_SUBSCRIBERS[dev.name] = _SSE_SUBSCRIBERS.get(dev.name, 0) + 1
+    try:
+        yield b"retry: %d\n\n" % SSE_RETRY_MS
+        last = since
+        while True:
+            rev, kind, body = dev.cache.change_event(last)
+            if kind is not None:
+                yield b"id: %d\nevent: %s\ndata: %s\n\n" % (rev, kind.encode(), body)
+                last = rev
+            if await request.is_disconnected():
+                return
+            if not await dev.cache.wait_newer(rev, SSE_HEARTBEAT):
+                yield b": ping\n\n"
+    finally:
+        _SSE_SUBSCRIBERS[dev.name] -= 1
+
+# =========================
+# Endpoint per device
+# =========================
+def _device_routes(get_device) -> APIRouter:
+    """
+    Endpoint device yang sama dipasang dua kali:
+    - tanpa prefix (kompatibel, device default atau ?device=<nama>)
+    - /devices/{device}/...
+    """
+    router = APIRouter()
+
+    @router.get("/sources", response_model=List[SourceItem])
+    async def get_sources(dev: Device = Depends(get_device)):
+        # LIVE: baca langsung dari device (HTTP API jika dipetakan, selain itu browser warm)
         try:
-            data = _run_with_page(lambda p: list_sources(p))
-            return data
+            return await dev.queue.call("list_sources")
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to list sources: {e}")
 
-@app.post("/layout")
-def set_layout(req: LayoutReq):
-    with _device_lock:
+    @router.post("/layout")
+    async def set_layout(req: LayoutReq, dev: Device = Depends(get_device)):
         try:
-            def _do(page):
-                select_layout(page, req.cells, confirm=req.confirm_shift)
-                return {"ok": True, "cells": req.cells, "confirm_shift": req.confirm_shift}
-            return _run_with_page(_do)
+            await dev.queue.call("select_layout", req.cells, confirm=req.confirm_shift)
+            return {"ok": True, "cells": req.cells, "confirm_shift": req.confirm_shift}
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to set layout: {e}")
 
-@app.post("/assign")
-def assign_one(req: AssignOne):
-    with _device_lock:
+    @router.post("/assign")
+    async def assign_one(req: AssignOne, dev: Device = Depends(get_device)):
         try:
-            def _do(page):
-                assign_source_to_grid(page, req.grid, req.name)
-                return {"ok": True, "grid": req.grid, "name": req.name}
-            return _run_with_page(_do)
+            await dev.queue.call("assign_source_to_grid", req.grid, req.name)
+            return {"ok": True, "grid": req.grid, "name": req.name}
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to assign: {e}")
 
-@app.post("/assign/bulk")
-def assign_bulk(req: AssignBulkReq):
-    with _device_lock:
+    @router.post("/assign/bulk")
+    async def assign_bulk(req: AssignBulkReq, dev: Device = Depends(get_device)):
         try:
-            def _do(page):
-                for item in req.assigns:
-                    assign_source_to_grid(page, item.grid, item.name)
-                return {"ok": True, "count": len(req.assigns)}
-            return _run_with_page(_do)
+            mode = req.mode or ASSIGN_MODE
+            if mode == "pipelined":
+                assigns = {a.grid: a.name for a in req.assigns}
+                res = await dev.queue.call("assign_grid_pipelined", assigns, pages=req.pages or ASSIGN_PAGES)
+                return {"ok": True, "count": len(req.assigns), "mode": mode, **res}
+            await dev.queue.run([("assign_source_to_grid", (a.grid, a.name), {}) for a in req.assigns])
+            return {"ok": True, "count": len(req.assigns), "mode": "sequential"}
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to assign bulk: {e}")
 
-@app.post("/set-url")
-def set_url_bulk(req: SetUrlBulkReq):
-    with _device_lock:
+    @router.post("/set-url")
+    async def set_url_bulk(req: SetUrlBulkReq, dev: Device = Depends(get_device)):
         try:
-            def _do(page):
-                for it in req.items:
-                    set_source_url(page, it.name, it.url)
-                return {"ok": True, "count": len(req.items)}
-            return _run_with_page(_do)
+            results = await dev.queue.call(
+                "set_source_urls",
+                [(it.name, it.url) for it in req.items],
+                skip_unchanged=req.skip_unchanged,
+                atomic=req.atomic,
+            )
+            _raise_if_set_url_failed(results)
+            return {"ok": True, "count": len(req.items), **_count_set_url_results(results), "results": results}
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to set url(s): {e}")
 
-@app.post("/run")
-def run_combined(req: RunCombinedReq):
-    """
-    - (opsional) set layout
-    - (opsional) set URL beberapa source
-    - (opsional) assign beberapa source ke grid
-    """
-    with _device_lock:
+    @router.post("/run")
+    async def run_combined(req: RunCombinedReq, dev: Device = Depends(get_device)):
+        """
+        - (opsional) set layout
+        - (opsional) set URL beberapa source
+        - (opsional) assign beberapa source ke grid
+        """
         try:
-            def _do(page):
-                result = {}
-                if req.layout_cells:
-                    select_layout(page, req.layout_cells, confirm=req.confirm_shift)
-                    result["layout_cells"] = req.layout_cells
-                    result["confirm_shift"] = req.confirm_shift
-
-                if req.set_urls:
-                    for it in req.set_urls:
-                        set_source_url(page, it.name, it.url)
-                    result["set_urls"] = len(req.set_urls)
-
-                if req.assigns:
-                    for a in req.assigns:
-                        assign_source_to_grid(page, a.grid, a.name)
-                    result["assigns"] = len(req.assigns)
-
-                result["sources"] = list_sources(page)
-                return result
-
-            return _run_with_page(_do)
+            return await _run_combined(dev, req)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to run combined: {e}")
 
+    @router.put("/grid/state")
+    async def put_grid_state(req: GridStateReq, dev: Device = Depends(get_device)):
+        """
+        Terapkan kondisi grid secara idempoten: grid dibaca sekali, lalu hanya
+        langkah yang perlu (ganti layout / cell yang berbeda) yang dijalankan.
+        """
+        try:
+            result = await dev.queue.call(
+                "apply_grid_state", req.layout_cells, req.assigns, confirm=req.confirm_shift, dry_run=req.dry_run,
+            )
+            return {"ok": True, **result}
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to apply grid state: {e}")
+
+    @router.get("/queue")
+    def get_queue_stats(dev: Device = Depends(get_device)):
+        """Kedalaman antrean, jumlah request yang digabung & waktu tunggu operasi device."""
+        return dev.queue.stats()
+
+    # ===== Endpoint konsumsi cache (non-breaking) =====
+    # body JSON sudah diserialisasi sekali per revisi di SourceCache; If-None-Match -> 304
+    @router.get("/sources_cached", response_model=List[SourceItem])
+    def get_sources_cached(request: Request, dev: Device = Depends(get_device)):
+        snap = dev.cache.snapshot()
+        if snap["etag"] is None:
+            raise HTTPException(status_code=503, detail="Cache belum tersedia. Coba lagi beberapa detik.")
+        return _etag_response(request, f'"{snap["etag"]}"', snap["data_json"], revision=snap["revision"])
+
+    @router.get("/sources/cache", response_model=SourcesCacheResp)
+    def get_sources_cache_meta(request: Request, dev: Device = Depends(get_device)):
+        snap = dev.cache.snapshot()
+        return _etag_response(request, snap["meta_etag"], snap["meta_json"], revision=snap["revision"])
+
+    @router.get("/sources/changes", response_model=SourcesChangesResp)
+    def get_sources_changes(since: int = Query(0, ge=0), dev: Device = Depends(get_device)):
+        """
+        Source yang berubah (status/url/baru) & yang hilang setelah revisi `since`
+        (dari /sources/cache, header X-Cache-Revision, atau respons ini sebelumnya).
+        """
+        return dev.cache.changes_since(since)
+
+    @router.get("/sources/stream")
+    async def stream_sources(
+        request: Request, since: Optional[int] = Query(None, ge=0), dev: Device = Depends(get_device),
+    ):
+        """
+        Server-Sent Events perubahan source. Event pertama `snapshot` (data lengkap)
+        atau `changes` (jika `since` / Last-Event-ID masih dalam riwayat), lalu
+        `changes` setiap revisi baru; format data sama dengan /sources/changes,
+        `id` = revisi. Komentar `: ping` sebagai heartbeat.
+        """
+        return StreamingResponse(
+            _sse_source_events(request, dev, _last_event_id(request, since)),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    return router
+
+# =========================
+# Endpoint umum & fleet
+# =========================
+@app.get("/health")
+def health():
+    dev = FLEET.default
+    return {
+        "ok": True,
+        "base_url": BASE_URL,
+        "session": dev.session.info() if SETTINGS.warm_session else None,
+        "backend": dev.backend.info(),
+        "watcher": dev.watcher.info() if dev.watcher is not None else None,
+        "queue": dev.queue.stats(),
+        "chromium": chromium_stats(),
+        "devices": sorted(FLEET.devices),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Metrik format teks Prometheus (histogram operasi/antrean/launch/login/poll, staleness, status source)."""
+    chrome = chromium_stats()
+    with metrics.SCRAPE_LOCK:
+        now = time.time()
+        metrics.SOURCE_STATUS.clear()
+        metrics.SOURCES_BY_STATUS.clear()
+        for dev in FLEET.devices.values():
+            metrics.QUEUE_DEPTH.set(dev.queue.stats()["depth"], device=dev.name)
+            metrics.SESSION_READY.set(int(dev.session.is_ready), device=dev.name)
+            metrics.SSE_SUBSCRIBERS.set(_SSE_SUBSCRIBERS.get(dev.name, 0), device=dev.name)
+            if dev.cache.data_at is not None:
+                metrics.CACHE_AGE.set(now - dev.cache.data_at, device=dev.name)
+            counts: Dict[str, int] = {}
+            for it in dev.cache.data or []:
+                status = it.get("status") or "unknown"
+                counts[status] = counts.get(status, 0) + 1
+                metrics.SOURCE_STATUS.set(1, device=dev.name, source=it.get("name") or it.get("stream_id"), status=status)
+            for status, n in counts.items():
+                metrics.SOURCES_BY_STATUS.set(n, device=dev.name, status=status)
+        if chrome is not None:
+            metrics.CHROMIUM_PROCESSES.set(chrome["processes"])
+            metrics.CHROMIUM_RSS.set(chrome["rss_bytes"])
+            metrics.CHROMIUM_CPU.set(chrome["cpu_sec"])
+        text = metrics.REGISTRY.render()
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+@app.get("/devices")
+def list_devices():
+    return [dev.info() for dev in FLEET.devices.values()]
+
+@app.post("/fleet/layout")
+async def fleet_layout(req: FleetLayoutReq):
+    """Set layout di banyak device sekaligus (paralel)."""
+    async def _do(dev: Device):
+        await dev.queue.call("select_layout", req.cells, confirm=req.confirm_shift)
+        return {"cells": req.cells}
+    return await _fan_out(_fleet_devices(req.devices), _do)
+
+@app.post("/fleet/run")
+async def fleet_run(req: FleetRunReq):
+    """Langkah gabungan /run yang sama di banyak device sekaligus (paralel)."""
+    return await _fan_out(_fleet_devices(req.devices), lambda dev: _run_combined(dev, req))
+
+@app.put("/fleet/grid/state")
+async def fleet_grid_state(req: FleetGridStateReq):
+    """PUT /grid/state yang sama di banyak device sekaligus (paralel)."""
+    async def _do(dev: Device):
+        return await dev.queue.call(
+            "apply_grid_state", req.layout_cells, req.assigns, confirm=req.confirm_shift, dry_run=req.dry_run,
+        )
+    return await _fan_out(_fleet_devices(req.devices), _do)
+
 class AndroidRtmpResp(BaseModel):
     ok: bool
     rtmp: Optional[str] = None
@@ -484,7 +837,9 @@ def android_get_rtmp(
     max_retries: int = 5,
     scroll_attempts: int = 3,
 ):
+    t0 = time.perf_counter()
     with _device_lock:
+        metrics.LOCK_WAIT.observe(time.perf_counter() - t0, lock="device")
         try:
             link = android_fetch_rtmp(
                 package=package,
@@ -500,94 +855,19 @@ def android_get_rtmp(
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to fetch RTMP: {e}")
 
+app.include_router(_device_routes(_default_device))
+app.include_router(_device_routes(_path_device), prefix="/devices/{device}")
+
 # =========================
-# ======== TAMBAHAN: Worker cache setiap 20 detik ========
+# Worker cache (poller per device)
 # =========================
-POLL_INTERVAL_SEC = int(os.getenv("SOURCES_POLL_INTERVAL", "20"))
-CACHE_PATH = OUT_DIR / "sources_cache.json"
-
-_cache = {
-    "updated_at": None,  # ISO string UTC
-    "error": None,       # pesan error polling terakhir (jika ada)
-    "data": None         # List[SourceItem] atau None
-}
-
-_stop_event = Event()
-_worker_thread: Optional[Thread] = None
-
-def _write_cache_to_disk():
-    try:
-        with open(CACHE_PATH, "w", encoding="utf-8") as f:
-            json.dump(_cache, f, ensure_ascii=False, indent=2)
-    except Exception:
-        pass
-
-def _load_cache_from_disk_if_any():
-    if CACHE_PATH.exists():
-        try:
-            data = json.load(open(CACHE_PATH, "r", encoding="utf-8"))
-            # Validasi ringan
-            if isinstance(data, dict):
-                _cache.update({
-                    "updated_at": data.get("updated_at"),
-                    "error": data.get("error"),
-                    "data": data.get("data"),
-                })
-        except Exception:
-            pass
-
-def _poll_sources_once():
-    global _cache
-    with _device_lock:
-        data = _run_with_page(lambda p: list_sources(p))
-    _cache = {
-        "updated_at": datetime.now(timezone.utc).isoformat(),
-        "error": None,
-        "data": data
-    }
-    _write_cache_to_disk()
-
-def _poller_loop():
-    _load_cache_from_disk_if_any()
-    # seed awal (tidak blocking kalau error)
-    try:
-        _poll_sources_once()
-    except Exception as e:
-        _cache["error"] = f"initial poll failed: {e}"
-        _cache["updated_at"] = datetime.now(timezone.utc).isoformat()
-        _write_cache_to_disk()
-
-    # loop periodik
-    while not _stop_event.wait(POLL_INTERVAL_SEC):
-        try:
-            _poll_sources_once()
-        except Exception as e:
-            _cache["error"] = f"poll failed: {e}"
-            _cache["updated_at"] = datetime.now(timezone.utc).isoformat()
-            _write_cache_to_disk()
-
 @app.on_event("startup")
 def _on_startup():
-    global _worker_thread
-    _worker_thread = Thread(target=_poller_loop, name="sources-poller", daemon=True)
-    _worker_thread.start()
+    FLEET.start()
 
 @app.on_event("shutdown")
 def _on_shutdown():
-    _stop_event.set()
-    if _worker_thread and _worker_thread.is_alive():
-        _worker_thread.join(timeout=5)
-
-# ===== Endpoint baru untuk konsumsi cache (non-breaking) =====
-@app.get("/sources_cached", response_model=List[SourceItem])
-def get_sources_cached():
-    if _cache["data"] is None:
-        raise HTTPException(status_code=503, detail="Cache belum tersedia. Coba lagi beberapa detik.")
-    return _cache["data"]
-
-@app.get("/sources/cache", response_model=SourcesCacheResp)
-def get_sources_cache_meta():
-    return SourcesCacheResp(**_cache)
+    FLEET.stop()
 
 # =========================
 # Entrypoint
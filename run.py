@@ -1,16 +1,18 @@
 # run.py
-import argparse, yaml
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from core.browser import launch_browser
-from core.auth import login, wait_for_dashboard
-from core import utils
+from core.auth import ensure_logged_in, save_storage_state, saved_state_if_fresh
+from core import tracing, utils
+from core.fleet import load_scenarios
 
 from core.actions.layouts import select_layout
 from core.actions.sources import (
     list_sources,
     assign_source_to_grid,
-    set_source_url,
+    set_source_urls,
 )
 
 def parse_assign_pairs(pairs):
@@ -54,22 +56,32 @@ def run_scenario(
     assign_pairs: list[tuple[int, str]] | None = None,
     list_only: bool = False,
     set_url_pairs: list[tuple[str, str]] | None = None,
+    out_dir: Path = utils.OUT_DIR,
+    restore_state: bool = True,
+    profile: str | None = None,
 ):
-    pw, browser, context, page = launch_browser(headless=headless, record_video=record_video, out_dir=utils.OUT_DIR)
+    base = scn["base_url"]
+    creds = scn["login"]
+    state_path = out_dir / "storage_state.json"
+    state = saved_state_if_fresh(state_path, base) if restore_state else None
+    pw, browser, context, page = launch_browser(
+        headless=headless, record_video=record_video, out_dir=out_dir, storage_state=state, profile=profile,
+    )
     try:
-        base = scn["base_url"]
-        creds = scn["login"]
-        login(page, base, creds["username"], creds["password"])
-        wait_for_dashboard(page)
+        how = ensure_logged_in(page, base, creds["username"], creds["password"], try_restore=state is not None)
 
         # (Opsional) pilih layout
         if layout_cells:
             select_layout(page, layout_cells, confirm=confirm_layout_shift)
 
-        # (Baru) set URL-URL source lebih dulu (jika ada)
-        for (name, url) in set_url_pairs or []:
-            print(f"[INFO] set URL '{name}' -> {url}")
-            set_source_url(page, name, url)
+        # (Baru) set URL-URL source lebih dulu (jika ada), sekaligus dalam satu pass
+        failed_urls = []
+        if set_url_pairs:
+            for res in set_source_urls(page, set_url_pairs):
+                extra = f" ({res['error']})" if res.get("error") else ""
+                print(f"[INFO] set URL '{res['name']}' -> {res['url']}: {res['status']}{extra}")
+                if res["status"] not in ("updated", "unchanged"):
+                    failed_urls.append(f"{res['name']}: {res['status']}")
 
         # (Opsional) assign sumber ke grid
         for (idx, name) in assign_pairs or []:
@@ -85,8 +97,13 @@ def run_scenario(
                 print(f"- {it['name']}: {it['status']} | {it['url']}")
             print("")
 
-        # simpan storage state (biar sesi dipakai lagi)
-        context.storage_state(path=str(utils.OUT_DIR / "storage_state.json"))
+        # simpan storage state (biar sesi dipakai lagi di run berikutnya)
+        if how == "login":
+            save_storage_state(context, state_path, base)
+
+        # edit URL yang gagal / di-revert tetap membuat run gagal (exit code != 0)
+        if failed_urls:
+            raise RuntimeError(f"set URL gagal: {', '.join(failed_urls)}")
 
     finally:
         browser.close()
@@ -95,9 +112,14 @@ def run_scenario(
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
-    ap.add_argument("--scenario", default="scenarios/login_only.yaml")
+    ap.add_argument("--scenario", default="scenarios/login_only.yaml",
+                    help="file YAML, direktori berisi *.yaml, atau beberapa path dipisah koma (fleet)")
+    ap.add_argument("--parallel", type=int, default=4, help="jumlah device yang dijalankan bersamaan (fleet)")
     ap.add_argument("--headed", action="store_true", help="jalankan dengan UI (non-headless)")
     ap.add_argument("--record-video", action="store_true")
+    ap.add_argument("--fresh-login", action="store_true", help="abaikan storage_state tersimpan, selalu login ulang")
+    ap.add_argument("--profile", choices=["full", "lean"],
+                    help="profil browser; lean = blokir preview video/gambar/font (default env BROWSER_PROFILE)")
 
     # Layout
     ap.add_argument("--layout-cells", type=int, help="jumlah cell grid (1=Single, 4=2x2, 9=3x3, 16=4x4, dst.)")
@@ -114,19 +136,40 @@ if __name__ == "__main__":
 
     args = ap.parse_args()
 
-    with open(args.scenario, "r", encoding="utf-8") as f:
-        scn = yaml.safe_load(f)
+    scenarios = load_scenarios(args.scenario)
 
     assign_pairs = parse_assign_pairs(args.assign)
     set_url_pairs = parse_set_url_pairs(args.set_url)
 
-    run_scenario(
-        scn,
-        headless=not args.headed,
-        record_video=args.record_video,
-        layout_cells=args.layout_cells,
-        confirm_layout_shift=args.confirm_layout_shift,
-        assign_pairs=assign_pairs,
-        list_only=args.list_sources,
-        set_url_pairs=set_url_pairs,
-    )
+    def _run(name, scn):
+        # satu device -> out/ langsung; fleet -> out/devices/<nama>/
+        out_dir = utils.OUT_DIR if len(scenarios) == 1 else utils.OUT_DIR / "devices" / name
+        # satu trace per device (diekspor jika TRACE_JSONL / TRACE_OTEL di-set)
+        with tracing.span("run.scenario", device=name):
+            run_scenario(
+                scn,
+                headless=not args.headed,
+                record_video=args.record_video,
+                layout_cells=args.layout_cells,
+                confirm_layout_shift=args.confirm_layout_shift,
+                assign_pairs=assign_pairs,
+                list_only=args.list_sources,
+                set_url_pairs=set_url_pairs,
+                out_dir=out_dir,
+                restore_state=not args.fresh_login,
+                profile=args.profile,
+            )
+
+    if len(scenarios) == 1:
+        _run(*next(iter(scenarios.items())))
+    else:
+        # setiap thread punya instance Playwright sendiri
+        with ThreadPoolExecutor(max_workers=max(1, args.parallel)) as pool:
+            futures = {name: pool.submit(_run, name, scn) for name, scn in scenarios.items()}
+        failed = 0
+        for name, fut in futures.items():
+            err = fut.exception()
+            print(f"[{'OK' if err is None else 'ERR'}] {name}" + (f": {err}" if err else ""))
+            failed += err is not None
+        if failed:
+            raise SystemExit(1)